@@ -0,0 +1,76 @@
+# admin_stats.py
+# Admin dashboard statistics, aggregated by SQL Server in one round trip instead of loading
+# every game (descriptions included) into Python.
+
+# Genres charted on the dashboard (case-sensitive substring match on the genre column, as before)
+DASHBOARD_GENRES = ['Action', 'RPG', 'Strategy', 'Indie', 'Adventure']
+# Rating buckets as (label, lower bound, upper bound, upper bound inclusive)
+RATING_BUCKETS = [
+    ('9-10', 9, 10, True),
+    ('8-9', 8, 9, False),
+    ('7-8', 7, 8, False),
+    ('6-7', 6, 7, False),
+    ('0-6', 0, 6, False),
+]
+TOP_N = 5
+
+
+def _stats_batch():
+    # A binary collation keeps the old Python `genre in game['genre']` semantics: the column's
+    # default collation is case-insensitive, so a plain LIKE would also count 'action' or 'ACTION'
+    genre_cols = ",\n".join(
+        f"    SUM(CASE WHEN genre COLLATE Latin1_General_BIN2 LIKE '%{genre}%' THEN 1 ELSE 0 END)"
+        for genre in DASHBOARD_GENRES
+    )
+    bucket_cols = ",\n".join(
+        f"    SUM(CASE WHEN rating >= {low} AND rating {'<=' if inclusive else '<'} {high} THEN 1 ELSE 0 END)"
+        for _, low, high, inclusive in RATING_BUCKETS
+    )
+    # Zero/NULL prices are ignored for the price figures, like the old Python version
+    return f"""
+SET NOCOUNT ON;
+SELECT
+    COUNT(*),
+    SUM(NULLIF(price, 0)), AVG(NULLIF(price, 0)), MAX(NULLIF(price, 0)), MIN(NULLIF(price, 0)),
+    AVG(CASE WHEN rating BETWEEN 0 AND 10 THEN CAST(rating AS float) END),
+{genre_cols},
+{bucket_cols}
+FROM dbo.games;
+
+SELECT TOP {TOP_N} title, price FROM dbo.games WHERE price IS NOT NULL ORDER BY price DESC, id;
+
+SELECT TOP {TOP_N} title, rating FROM dbo.games WHERE rating IS NOT NULL ORDER BY rating DESC, id;
+"""
+
+
+STATS_BATCH = _stats_batch()
+
+
+def load_admin_stats(cur):
+    """Return the dict the admin dashboard renders (same keys as before)."""
+    cur.execute(STATS_BATCH)
+    row = cur.fetchone()
+    total_games, total_value, avg_price, max_price, min_price, avg_rating = row[:6]
+    genre_counts = list(row[6:6 + len(DASHBOARD_GENRES)])
+    bucket_counts = list(row[6 + len(DASHBOARD_GENRES):])
+
+    cur.nextset()
+    top_games = [{'title': title, 'price': price} for title, price in cur.fetchall()]
+    cur.nextset()
+    top_rated_games = [{'title': title, 'rating': float(rating)} for title, rating in cur.fetchall()]
+
+    genre_stats = dict(zip(DASHBOARD_GENRES, (count or 0 for count in genre_counts)))
+    return {
+        'total_games': total_games,
+        'action_games': genre_stats['Action'],
+        'rpg_games': genre_stats['RPG'],
+        'total_value': total_value or 0,
+        'avg_price': avg_price or 0,
+        'max_price': max_price or 0,
+        'min_price': min_price or 0,
+        'genre_stats': genre_stats,
+        'top_games': top_games,
+        'avg_rating': avg_rating or 0,
+        'rating_dist': {label: count or 0 for (label, _, _, _), count in zip(RATING_BUCKETS, bucket_counts)},
+        'top_rated_games': top_rated_games,
+    }
@@ -1,16 +1,42 @@
 # app.py
 import datetime
-
-import random
-import string
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import mimetypes
+
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g, stream_with_context, send_from_directory, send_file, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
 import google.generativeai as genai
 
 import os
-from werkzeug.utils import secure_filename
+import threading
+import time
+from contextlib import contextmanager
 import pyodbc
 
+try:
+    import brotli  # in requirements.txt; enables Content-Encoding: br (gzip-only without it)
+except ImportError:
+    brotli = None
+
+from db_pool import ConnectionPool
+from catalog_cache import CatalogCache
+from categories import sync_game_categories
+from recommendations import inputs_changed as recommendation_inputs_changed, refresh_recommendations
+from search_index import SearchIndex
+from chat_context import ChatReplyCache, InventoryContext, history_text, sse_event, stream_chat_reply
+from checkout import MAX_CART_ITEMS, place_order
+from key_pool import KeyPoolMetrics, pool_depths, refill as refill_key_pool
+from cart_store import make_cart_store, new_cart_id
+from admin_stats import load_admin_stats
+from db_metrics import InstrumentedConnection, MetricsRegistry, RequestStats
+from avatars import FILE_NAME as AVATAR_FILE_NAME, AvatarPipeline, InvalidImage, inspect as inspect_image, variant_file
+from image_proxy import DEFAULT_ALLOWED_HOSTS, VARIANTS as IMAGE_VARIANTS, ImageProxy, UpstreamError
+from static_assets import AssetManifest
+
 app = Flask(__name__)
 app.secret_key = 'gamerz_secret_key_2025'
 
@@ -43,8 +69,16 @@ DB_CONFIG = {
     "PWD": "GamerZ_Password123",
 }
 
-def get_db_connection():
-    # Build and return a pyodbc connection to SQL Server
+# Connection pool sizing (overridable through the environment)
+DB_POOL_CONFIG = {
+    "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+    "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+    "MAX_AGE": int(os.environ.get("DB_POOL_MAX_AGE", 1800)),   # seconds before a connection is recycled
+    "TIMEOUT": int(os.environ.get("DB_POOL_TIMEOUT", 10)),     # seconds to wait for a free connection
+}
+
+def create_db_connection():
+    # Build and return a new pyodbc connection to SQL Server
     conn_str = (
         f"DRIVER={DB_CONFIG['DRIVER']};"
         f"SERVER={DB_CONFIG['SERVER']};"
@@ -55,6 +89,318 @@ def get_db_connection():
     )
     return pyodbc.connect(conn_str)
 
+db_pool = ConnectionPool(
+    create_db_connection,
+    min_size=DB_POOL_CONFIG['MIN_SIZE'],
+    max_size=DB_POOL_CONFIG['MAX_SIZE'],
+    max_age=DB_POOL_CONFIG['MAX_AGE'],
+    timeout=DB_POOL_CONFIG['TIMEOUT'],
+)
+
+# ---------- METRICS ----------
+# Per-request query count/latency/rows and pool wait, per-route histograms on /metrics,
+# and a slow-query log (logger 'gamerz.db'). METRICS_ENABLED=0 turns all of it off.
+METRICS_CONFIG = {
+    "ENABLED": os.environ.get("METRICS_ENABLED", "1") != "0",
+    "SLOW_QUERY_MS": float(os.environ.get("SLOW_QUERY_MS", 250)),
+    # Scrapers send "Authorization: Bearer <token>"; without a token only admins can read /metrics
+    "TOKEN": os.environ.get("METRICS_TOKEN", ""),
+}
+
+metrics = MetricsRegistry() if METRICS_CONFIG['ENABLED'] else None
+
+if metrics:
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = g.get('request_stats')
+        started = g.get('request_started')
+        if stats is not None and started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            duration = time.perf_counter() - started
+            metrics.record(route, request.method, response.status_code, duration, stats)
+            if stats.queries:
+                response.headers['Server-Timing'] = (
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                    f'db-acquire;dur={stats.acquire_time * 1000:.1f}'
+                )
+        return response
+
+def get_db_connection():
+    # Borrow one pooled connection per request; it is handed back in close_db_connection()
+    if 'db_conn' not in g:
+        stats = g.get('request_stats')
+        if stats is None:
+            g.db_conn = db_pool.acquire()
+        else:
+            started = time.perf_counter()
+            conn = db_pool.acquire()
+            stats.acquire_time += time.perf_counter() - started
+            g.db_conn = InstrumentedConnection(conn, stats, METRICS_CONFIG['SLOW_QUERY_MS'] / 1000)
+    return g.db_conn
+
+@app.teardown_appcontext
+def close_db_connection(exc):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        # Broken connections are dropped instead of going back to the pool
+        db_pool.release(getattr(conn, 'raw', conn), discard=isinstance(exc, pyodbc.Error))
+
+@contextmanager
+def pooled_connection(job):
+    # A connection of its own, for work outside get_db_connection(): indexes built lazily and
+    # background threads. Inside a request its statements and pool wait count towards the
+    # request; elsewhere they are recorded on /metrics under the job name
+    stats = g.get('request_stats') if has_app_context() else None
+    own_stats = stats is None and metrics is not None
+    if own_stats:
+        stats = RequestStats()
+    started = time.perf_counter()
+    conn = db_pool.acquire()
+    error = None
+    try:
+        if stats is None:
+            yield conn
+        else:
+            stats.acquire_time += time.perf_counter() - started
+            yield InstrumentedConnection(conn, stats, METRICS_CONFIG['SLOW_QUERY_MS'] / 1000)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        db_pool.release(conn, discard=isinstance(error, pyodbc.Error))
+        if own_stats:
+            metrics.record_job(job, time.perf_counter() - started, stats, failed=error is not None)
+
+# ---------- CATALOG CACHE ----------
+# Storefront shelves only change through the admin routes or import_steam.py,
+# both of which bump the shared catalog version stamp.
+CATALOG_CACHE_CONFIG = {
+    "MAX_ENTRIES": int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", 1024)),
+    "TTL": int(os.environ.get("CATALOG_CACHE_TTL", 300)),   # seconds
+    # How often the shared version stamp is checked (seconds); other workers' edits show up within this
+    "VERSION_CHECK_INTERVAL": float(os.environ.get("CATALOG_VERSION_CHECK_INTERVAL", 1.0)),
+}
+
+catalog_cache = CatalogCache(max_entries=CATALOG_CACHE_CONFIG['MAX_ENTRIES'], ttl=CATALOG_CACHE_CONFIG['TTL'],
+                             check_interval=CATALOG_CACHE_CONFIG['VERSION_CHECK_INTERVAL'])
+
+# ---------- RECOMMENDATIONS ----------
+# dbo.game_recommendations is refreshed off the request thread: only the rows the edited games
+# can affect are recomputed, and bursts of admin edits coalesce into one rerun
+_recs_lock = threading.Lock()
+# 'previous' holds each changed game's row from before the first pending edit (new games have none)
+_recs_state = {'running': False, 'full': False, 'changed': set(), 'extra': set(), 'previous': {}}
+
+def _take_recommendation_work():
+    # Called with _recs_lock held
+    work = (_recs_state['full'], _recs_state['changed'], _recs_state['extra'], _recs_state['previous'])
+    _recs_state.update(full=False, changed=set(), extra=set(), previous={})
+    return work
+
+def _run_recommendation_refresh():
+    with _recs_lock:
+        full, changed, extra, previous = _take_recommendation_work()
+    while True:
+        try:
+            with pooled_connection('recommendations') as conn:
+                if full:
+                    refresh_recommendations(conn)
+                else:
+                    refresh_recommendations(conn, changed_ids=changed, extra_ids=extra, previous=previous)
+            # Detail pages cached before the rebuild hold the old list
+            invalidate_catalog(titles_changed=False)
+        except Exception as e:
+            print(f"Recommendation refresh failed: {e}")
+
+        with _recs_lock:
+            if not (_recs_state['full'] or _recs_state['changed'] or _recs_state['extra']):
+                _recs_state['running'] = False
+                return
+            full, changed, extra, previous = _take_recommendation_work()
+
+def schedule_recommendation_refresh(changed_ids=None, extra_ids=(), previous=None):
+    # changed_ids: games added/edited/deleted (None rebuilds everything);
+    # extra_ids: games to recompute regardless, e.g. ones that listed a deleted game;
+    # previous: {game_id: title/genre/rating row before the write} for games that existed before
+    with _recs_lock:
+        if changed_ids is None:
+            _recs_state['full'] = True
+        else:
+            _recs_state['changed'].update(changed_ids)
+            _recs_state['extra'].update(extra_ids)
+            for game_id, row in (previous or {}).items():
+                _recs_state['previous'].setdefault(game_id, row)
+        if _recs_state['running']:
+            return
+        _recs_state['running'] = True
+    threading.Thread(target=_run_recommendation_refresh, daemon=True).start()
+
+# ---------- PRODUCT KEY POOL ----------
+# Checkout claims pre-generated keys from dbo.product_keys; this tops the pool up off the request path
+KEY_POOL_CONFIG = {
+    "LOW_WATERMARK": int(os.environ.get("KEY_POOL_LOW_WATERMARK", 5)),
+    "TARGET": int(os.environ.get("KEY_POOL_TARGET", 20)),
+    "MIN_INTERVAL": int(os.environ.get("KEY_POOL_MIN_INTERVAL", 30)),   # seconds between routine refills
+}
+
+key_pool_metrics = KeyPoolMetrics()
+_key_pool_lock = threading.Lock()
+_key_pool_state = {'running': False, 'pending': False, 'last_run': 0.0}
+
+def _run_key_pool_refill():
+    while True:
+        try:
+            with pooled_connection('key_pool_refill') as conn:
+                added = refill_key_pool(conn, KEY_POOL_CONFIG['LOW_WATERMARK'], KEY_POOL_CONFIG['TARGET'])
+            key_pool_metrics.record_refill(added)
+        except Exception as e:
+            print(f"Key pool refill failed: {e}")
+            key_pool_metrics.record_refill(error=e)
+
+        with _key_pool_lock:
+            _key_pool_state['last_run'] = time.monotonic()
+            if not _key_pool_state['pending']:
+                _key_pool_state['running'] = False
+                return
+            _key_pool_state['pending'] = False
+
+def schedule_key_pool_refill(urgent=False):
+    # Routine calls (after each checkout) are throttled; urgent ones (an empty pool, new games) are not
+    with _key_pool_lock:
+        if _key_pool_state['running']:
+            _key_pool_state['pending'] = _key_pool_state['pending'] or urgent
+            return
+        if not urgent and time.monotonic() - _key_pool_state['last_run'] < KEY_POOL_CONFIG['MIN_INTERVAL']:
+            return
+        _key_pool_state['running'] = True
+    threading.Thread(target=_run_key_pool_refill, daemon=True).start()
+
+# ---------- CART STORE ----------
+# Carts live server-side; the session cookie only carries a short cart id
+CART_STORE_CONFIG = {
+    # sqlite | redis | memory; memory is per process, so only for a single worker (carts vanish across workers)
+    "BACKEND": os.environ.get("CART_STORE", "sqlite"),
+    "PATH": os.environ.get("CART_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "carts.sqlite3")),
+    "REDIS_URL": os.environ.get("CART_REDIS_URL", "redis://localhost:6379/0"),
+    "TTL": int(os.environ.get("CART_TTL", 7 * 86400)),   # seconds a cart survives without changes
+}
+
+cart_store = make_cart_store(CART_STORE_CONFIG['BACKEND'], CART_STORE_CONFIG['PATH'],
+                             CART_STORE_CONFIG['REDIS_URL'], CART_STORE_CONFIG['TTL'])
+
+def get_cart_id(create=False):
+    cart_id = session.get('cart_id')
+    legacy = session.pop('cart') if 'cart' in session else None   # carts from before the server-side store
+    if cart_id is None and (create or legacy):
+        cart_id = session['cart_id'] = new_cart_id()
+    if legacy:
+        cart_store.replace(cart_id, legacy)
+    return cart_id
+
+def get_cart():
+    cart_id = get_cart_id()
+    return cart_store.items(cart_id) if cart_id else []
+
+def clear_cart_items():
+    cart_id = get_cart_id()
+    if cart_id:
+        cart_store.clear(cart_id)
+
+def get_stock_levels():
+    # {game_id: stock_quantity} for the whole catalog in one query, cached until the catalog
+    # changes (checkout bumps the version when a game sells out). Checkout re-checks stock itself.
+    def load():
+        cur = get_db_connection().cursor()
+        cur.execute('SELECT id, stock_quantity FROM dbo.games')
+        return {row[0]: row[1] for row in cur.fetchall()}
+    return catalog_cache.get_or_load('stock_levels', load)
+
+# ---------- SEARCH INDEX ----------
+# Built lazily from dbo.games and rebuilt whenever the catalog version moves
+search_index = SearchIndex()
+_search_build_lock = threading.Lock()
+
+def get_search_index():
+    version = catalog_cache.version
+    if search_index.version != version:
+        with _search_build_lock:
+            if search_index.version != version:
+                with pooled_connection('search_index') as conn:
+                    cur = conn.cursor()
+                    cur.execute('SELECT id, title, image, rating FROM dbo.games')
+                    search_index.build(fetch_all_dicts(cur), version)
+    return search_index
+
+def invalidate_catalog(search_doc=None, deleted_id=None, titles_changed=True):
+    # Bump the shared catalog version. An up-to-date search index is patched in place
+    # (or simply carried over when no titles changed) instead of being rebuilt.
+    index_was_current = search_index.version == catalog_cache.version
+    version = catalog_cache.invalidate()
+    if not index_was_current:
+        return
+    if search_doc is not None:
+        search_index.upsert(search_doc)
+    elif deleted_id is not None:
+        search_index.remove(deleted_id)
+    elif titles_changed:
+        return
+    search_index.version = version
+
+def catalog_changed(search_doc=None, deleted_id=None, previous=None, current=None, recommendation_ids=()):
+    # Call after committing any write to dbo.games or its child tables.
+    # previous/current: the game's id/title/genre/rating before and after the write (previous is
+    # None for a new game); recommendation_ids: games whose stored recommendations had to be
+    # deleted along with the write
+    invalidate_catalog(search_doc, deleted_id)
+    game_id = search_doc['id'] if search_doc is not None else deleted_id
+    if game_id is None:
+        schedule_recommendation_refresh()
+    elif previous is None or current is None or recommendation_ids or recommendation_inputs_changed(previous, current):
+        # Price, stock or description edits can't move any recommendation
+        schedule_recommendation_refresh([game_id], recommendation_ids, {game_id: previous} if previous else None)
+    schedule_key_pool_refill(urgent=search_doc is not None)
+
+# ---------- CACHED JSON RESPONSES ----------
+# Serialized + compressed bodies are kept in catalog_cache, so repeat calls skip both
+# the database and json.dumps; clients revalidate with the ETag and get a 304.
+def encode_json_payload(payload):
+    body = json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': hashlib.sha1(body).hexdigest(),
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=6),
+        'br': brotli.compress(body) if brotli else None,
+    }
+
+def cached_json_response(cache_key, build_payload, max_age=60):
+    entry = catalog_cache.get_or_load(('json', cache_key), lambda: encode_json_payload(build_payload()))
+
+    cache_control = f'public, max-age={max_age}'
+    if request.if_none_match.contains_weak(entry['etag']):
+        resp = app.response_class(status=304)
+    else:
+        accepted = request.accept_encodings
+        if entry['br'] is not None and accepted['br']:
+            encoding = 'br'
+        elif accepted['gzip']:
+            encoding = 'gzip'
+        else:
+            encoding = 'identity'
+        resp = app.response_class(entry[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            resp.headers['Content-Encoding'] = encoding
+
+    # Weak ETag: the same payload is served under several encodings
+    resp.set_etag(entry['etag'], weak=True)
+    resp.headers['Cache-Control'] = cache_control
+    resp.vary.add('Accept-Encoding')
+    return resp
+
 # ---------- UTILS: convert cursor results to dicts ----------
 def fetch_all_dicts(cursor):
     # Convert cursor.fetchall() tuples into list of dicts using cursor.description
@@ -75,92 +421,214 @@ def allowed_file(filename):
     # Check extension whitelist
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# ---------- PROFILE PHOTOS ----------
+# Uploads are turned into small content-hashed WebP/JPEG thumbnails on a worker pool (avatars.py)
+AVATAR_CONFIG = {
+    "WORKERS": int(os.environ.get("AVATAR_WORKERS", 2)),
+    "MAX_BYTES": int(os.environ.get("AVATAR_MAX_BYTES", 10 * 1024 * 1024)),
+}
+
+avatar_pipeline = AvatarPipeline(os.path.join(UPLOAD_FOLDER, 'avatars'), workers=AVATAR_CONFIG['WORKERS'])
+# Newest upload per user, so a slow earlier upload finishing late can't overwrite it
+_latest_avatar = {}
+_latest_avatar_lock = threading.Lock()
+
+def save_profile_photo(user_id, photo):
+    # Runs on an avatar worker once the thumbnails exist: point the user at them, then drop
+    # the files of the photo they replaced unless someone else has the same picture. Names are
+    # content hashes, so that includes uploads not saved to the DB yet: they stay in _latest_avatar
+    # until their UPDATE commits, and the lock is held from the check to the delete
+    with _latest_avatar_lock, pooled_connection('avatar_save') as conn:
+        cur = conn.cursor()
+        if _latest_avatar.get(user_id) != photo:
+            # A newer upload replaced this one while it was being processed
+            superseded = [photo]
+        else:
+            cur.execute('SELECT profile_photo FROM dbo.users WHERE id = ?', (user_id,))
+            row = cur.fetchone()
+            superseded = [row[0]] if row and row[0] and row[0] != photo else []
+            cur.execute('UPDATE dbo.users SET profile_photo = ? WHERE id = ?', (photo, user_id))
+            conn.commit()
+            _latest_avatar.pop(user_id, None)
+        in_flight = set(_latest_avatar.values())
+        for old in superseded:
+            if old in in_flight:
+                continue
+            cur.execute('SELECT COUNT(*) FROM dbo.users WHERE profile_photo = ?', (old,))
+            if cur.fetchone()[0] == 0:
+                avatar_pipeline.delete(old)
+
+def discard_profile_photo(user_id, photo):
+    # Processing failed: stop treating the upload as the user's newest one
+    with _latest_avatar_lock:
+        if _latest_avatar.get(user_id) == photo:
+            _latest_avatar.pop(user_id, None)
+
+def avatar_url(photo, size='sm', fmt='jpg'):
+    # size: 'sm' (navbar) or 'lg' (profile page); older uploads are served from static/uploads as before
+    name = variant_file(photo, size, fmt)
+    if name is None:
+        return url_for('static', filename=f'uploads/{photo}')
+    return url_for('avatar_file', name=name)
+
+@app.context_processor
+def avatar_helpers():
+    return {'avatar_url': avatar_url}
+
+# ---------- IMAGE PROXY ----------
+# Steam/IGDB art is served through /img/<variant>/<id>: fetched once, cached on disk (LRU),
+# resized per use and sent with immutable cache headers (image_proxy.py)
+IMAGE_PROXY_CONFIG = {
+    "ENABLED": os.environ.get("IMAGE_PROXY_ENABLED", "1") != "0",
+    "CACHE_DIR": os.environ.get("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_cache")),
+    "MAX_MB": int(os.environ.get("IMAGE_CACHE_MAX_MB", 1024)),
+    "ALLOWED_HOSTS": os.environ.get("IMAGE_PROXY_HOSTS", ",".join(DEFAULT_ALLOWED_HOSTS)).split(","),
+    "ORIGIN": os.environ.get("IMAGE_PROXY_ORIGIN") or None,   # e.g. a local stub CDN for testing
+}
+
+image_proxy = ImageProxy(
+    IMAGE_PROXY_CONFIG['CACHE_DIR'],
+    app.secret_key,
+    max_bytes=IMAGE_PROXY_CONFIG['MAX_MB'] * 1024 * 1024,
+    allowed_hosts=IMAGE_PROXY_CONFIG['ALLOWED_HOSTS'],
+    origin=IMAGE_PROXY_CONFIG['ORIGIN'],
+) if IMAGE_PROXY_CONFIG['ENABLED'] else None
+
+def img_url(url, variant='card'):
+    # Proxied URL for upstream art; local/unknown URLs (and None) come back unchanged
+    if image_proxy is None:
+        return url
+    image_id = image_proxy.image_id(url)
+    return f"/img/{variant}/{image_id}" if image_id else url
+
+@app.context_processor
+def image_helpers():
+    return {'img_url': img_url}
+
+# ---------- STATIC ASSETS ----------
+# script.js/style.css/icons are minified, content-hashed and precompressed into static/dist
+# (static_assets.py); templates link them through asset_url() and /dist/<name> serves them
+ASSETS_CONFIG = {
+    "AUTO_BUILD": os.environ.get("ASSETS_AUTO_BUILD", "1") != "0",   # rebuild on start when sources changed
+}
+
+asset_manifest = AssetManifest.load(app.static_folder, auto_build=ASSETS_CONFIG['AUTO_BUILD'])
+
+def asset_url(name):
+    # Fingerprinted URL for a file under static/; plain /static/ URL when there is no build
+    path = asset_manifest.path(name)
+    if path is None:
+        return url_for('static', filename=name)
+    return url_for('dist_asset', name=path)
+
+@app.context_processor
+def asset_helpers():
+    return {'asset_url': asset_url}
+
 # ---------- GLOBAL GAME EXTRAS ----------
 
 
+# Formatted chat inventory, rebuilt only when the catalog version moves (see chat_context.py)
+inventory_context = None
+_inventory_build_lock = threading.Lock()
+
+def get_inventory_context():
+    global inventory_context
+    version = catalog_cache.version
+    if inventory_context is None or inventory_context.version != version:
+        with _inventory_build_lock:
+            if inventory_context is None or inventory_context.version != version:
+                with pooled_connection('chat_inventory') as conn:
+                    cur = conn.cursor()
+                    cur.execute('SELECT id, title, price, genre, rating FROM dbo.games')
+                    inventory_context = InventoryContext(fetch_all_dicts(cur), version)
+    return inventory_context
+
 def get_all_game_specs():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT title, description, price, genre, rating FROM dbo.games')
-    rows = fetch_all_dicts(cur)
-    conn.close()
+    return get_inventory_context().render()
+
+# Replies to first-turn questions, reused until the catalog version moves
+CHAT_CACHE_CONFIG = {
+    "MAX_ENTRIES": int(os.environ.get("CHAT_CACHE_MAX_ENTRIES", 512)),
+    "TTL": int(os.environ.get("CHAT_CACHE_TTL", 3600)),   # seconds
+}
 
-    spec_list = []
-    for game in rows:
-        info = f"Title: {game['title']} | Genre: {game.get('genre')} | Price: ${game.get('price')} | Rating: {game.get('rating')}"
-        spec_list.append(info)
-    return "\n".join(spec_list)
+chat_reply_cache = ChatReplyCache(max_entries=CHAT_CACHE_CONFIG['MAX_ENTRIES'], ttl=CHAT_CACHE_CONFIG['TTL'])
 
 # ---------- ADMIN CHECK ----------
 def is_admin():
     return session.get('user_id') == 1
 
+# Rows per page in the admin inventory grid
+ADMIN_PAGE_SIZE = 50
+
 # ---------- ROUTES ----------
+def load_home_shelves():
+    # Build every home page shelf in one go (cached by catalog_cache)
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    # Main Games (Base Games) - Fetch landscape image from game_editions (header)
+    cur.execute("""
+        SELECT g.*
+        FROM dbo.games g 
+        WHERE g.genre NOT IN ('DLC', 'Edition') 
+        ORDER BY g.title ASC
+    """)
+    games = fetch_all_dicts(cur)
+    
+    # DLCs
+    cur.execute("""
+        SELECT g.*
+        FROM dbo.games g 
+        WHERE g.genre = 'DLC' 
+        ORDER BY g.title ASC
+    """)
+    dlcs = fetch_all_dicts(cur)
+    
+    # Editions
+    cur.execute("""
+        SELECT g.*
+        FROM dbo.games g 
+        WHERE g.genre = 'Edition' 
+        ORDER BY g.title ASC
+    """)
+    editions = fetch_all_dicts(cur)
+    
+    # Survival Horror Query
+    horror_query = """
+        SELECT g.*
+        FROM dbo.games g 
+        JOIN dbo.game_categories c ON c.game_id = g.id
+        WHERE c.category = 'Survival Horror'
+    """
+    cur.execute(horror_query)
+    survival_horror = fetch_all_dicts(cur)
+
+    return {'games': games, 'dlcs': dlcs, 'editions': editions, 'survival_horror': survival_horror}
+
 @app.route('/')
 def home():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Main Games (Base Games) - Fetch landscape image from game_editions (header)
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre NOT IN ('DLC', 'Edition') 
-            ORDER BY g.title ASC
-        """)
-        games = fetch_all_dicts(cur)
-        
-        # DLCs
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre = 'DLC' 
-            ORDER BY g.title ASC
-        """)
-        dlcs = fetch_all_dicts(cur)
-        
-        # Editions
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre = 'Edition' 
-            ORDER BY g.title ASC
-        """)
-        editions = fetch_all_dicts(cur)
-        
-        # Survival Horror Query
-        horror_query = """
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE 
-            (g.genre LIKE '%Horror%' OR g.genre LIKE '%Survival%' OR g.title IN ('Outlast', 'Amnesia', 'Dead Space', 'Silent Hill', 'Phasmophobia', 'The Forest', 'Resident Evil', 'Alien: Isolation', 'Evil Within', 'Five Nights at Freddy''s', 'Until Dawn', 'Soma', 'Dying Light', 'Left 4 Dead'))
-            AND g.genre NOT IN ('DLC', 'Edition')
-        """
-        cur.execute(horror_query)
-        survival_horror = fetch_all_dicts(cur)
-
-        # Refresh user session photo if logged in
-        if 'user_id' in session:
+        shelves = catalog_cache.get_or_load('home_shelves', load_home_shelves)
+
+        # Refresh user session photo if logged in (login/profile keep it current afterwards)
+        if 'user_id' in session and 'profile_photo' not in session:
+            cur = get_db_connection().cursor()
             cur.execute('SELECT profile_photo FROM dbo.users WHERE id = ?', (session['user_id'],))
             user_row = cur.fetchone()
             if user_row and user_row[0]:
                 session['profile_photo'] = user_row[0]
 
-        conn.close()
-
         featured_slides = [
             { 'id': 1, 'title': "Monster Hunter Wilds", 'subtitle': "Pre-Order Available: February 28, 2025", 'tagline': "The next generation of the hunt.", 'image': "/static/assets/featured/featured_mh.jpg", 'link': "/game/mh-wilds" },
             { 'id': 2, 'title': "GTA VI: Postponed!", 'subtitle': "Pre-order now for Nov 2026 delivery.", 'tagline': "The ultimate open-world delay is confirmed.", 'image': "/static/assets/featured/featured_gta.jpg", 'link': "/preorder-gta6" },
             { 'id': 3, 'title': "RTX 5090 Launch", 'subtitle': "The Blackwall Beast is Here.", 'tagline': "Experience 8K gaming and run local AI models on 32GB GDDR7 VRAM.", 'image': "/static/assets/featured/featured_rtx.jpg", 'link': "/hardware/5090" }
         ]
 
-        return render_template('index.html', games=games, dlcs=dlcs, editions=editions, survival_horror=survival_horror, featured_slides=featured_slides)
+        return render_template('index.html', games=shelves['games'], dlcs=shelves['dlcs'], editions=shelves['editions'], survival_horror=shelves['survival_horror'], featured_slides=featured_slides)
     except Exception as e:
+        app.logger.exception("home() failed")
         return f"Database Error: {e}"
 
 @app.route('/profile', methods=['GET', 'POST'])
@@ -170,6 +638,7 @@ def profile():
 
     conn = get_db_connection()
     cur = conn.cursor()
+    uploaded = None
 
     if request.method == 'POST':
         # File upload handling for profile photo
@@ -183,22 +652,35 @@ def profile():
             return redirect(request.url)
 
         if file and allowed_file(file.filename):
-            import time
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            timestamp = int(time.time())
-            filename = secure_filename(f"user_{session['user_id']}_{timestamp}.{ext}")
-            save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(save_path)
+            data = file.read(AVATAR_CONFIG['MAX_BYTES'] + 1)
+            if len(data) > AVATAR_CONFIG['MAX_BYTES']:
+                flash(f"Photo is too large (max {AVATAR_CONFIG['MAX_BYTES'] // (1024 * 1024)} MB)")
+                return redirect(request.url)
 
-            cur.execute('UPDATE dbo.users SET profile_photo = ? WHERE id = ?', (filename, session['user_id']))
-            conn.commit()
-            session['profile_photo'] = filename
+            # Resizing happens on the avatar workers; the DB row is updated when they finish
+            user_id = session['user_id']
+            ext = file.filename.rsplit('.', 1)[1].lower()
+            try:
+                inspected = inspect_image(data)
+            except InvalidImage:
+                flash('That file is not a valid image.')
+                return redirect(request.url)
+            # Recorded before queueing so a fast worker already sees it as the newest upload
+            photo = avatar_pipeline.photo_key(data, ext)
+            with _latest_avatar_lock:
+                _latest_avatar[user_id] = photo
+            avatar_pipeline.submit(data, ext, on_done=lambda key: save_profile_photo(user_id, key),
+                                   on_failed=lambda key: discard_profile_photo(user_id, key), inspected=inspected)
+            session['profile_photo'] = uploaded = photo
             flash('Profile photo updated!')
         else:
             flash('Invalid file type. Allowed: png, jpg, jpeg, gif')
 
     cur.execute('SELECT * FROM dbo.users WHERE id = ?', (session['user_id'],))
     user = fetch_one_dict(cur)
+    if user and uploaded:
+        # The worker may not have saved the new photo to the DB yet
+        user['profile_photo'] = uploaded
 
     # Get user library (orders join games)
     cur.execute('''
@@ -211,50 +693,71 @@ def profile():
     ''', (session['user_id'],))
     library = fetch_all_dicts(cur)
 
-    conn.close()
     return render_template('profile.html', user=user, library=library)
 
-@app.route('/game/<int:game_id>')
-def game_details(game_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM dbo.games WHERE id = ?', (game_id,))
+# All data for the game page in one round trip: each statement is its own result set
+GAME_DETAIL_BATCH = """
+    SET NOCOUNT ON;
+    DECLARE @game_id int = ?, @user_id int = ?;
+
+    -- 1. Game
+    SELECT * FROM dbo.games WHERE id = @game_id;
+    -- 2. Specs
+    SELECT * FROM dbo.game_specs WHERE game_id = @game_id;
+    -- 3. Screenshots
+    SELECT image_url FROM dbo.game_screenshots WHERE game_id = @game_id;
+    -- 4. DLCs
+    SELECT title, price, original_price, image FROM dbo.game_dlcs WHERE game_id = @game_id;
+    -- 5. Editions
+    SELECT title, price, original_price, description, image FROM dbo.game_editions WHERE game_id = @game_id;
+    -- 6. Does the current user own it
+    SELECT COUNT(*) FROM dbo.orders WHERE user_id = @user_id AND game_id = @game_id;
+
+    -- 7. Recommended Games (precomputed by recommendations.py)
+    SELECT g.*
+    FROM dbo.game_recommendations r
+    JOIN dbo.games g ON g.id = r.recommended_id
+    WHERE r.game_id = @game_id
+    ORDER BY r.rank;
+"""
+
+def load_game_detail(game_id, user_id=None):
+    # Returns (detail, owned); detail is None when the game doesn't exist
+    cur = get_db_connection().cursor()
+    cur.execute(GAME_DETAIL_BATCH, (game_id, user_id))
+
     game = fetch_one_dict(cur)
+    cur.nextset()
+    specs_row = fetch_one_dict(cur)
+    cur.nextset()
+    shot_rows = cur.fetchall()
+    cur.nextset()
+    dlc_rows = cur.fetchall()
+    cur.nextset()
+    edition_rows = cur.fetchall()
+    cur.nextset()
+    owned = cur.fetchone()[0] > 0
+    cur.nextset()
+    recommended_games = fetch_all_dicts(cur)
 
     if game is None:
-        conn.close()
-        return "Game not found", 404
-
-
+        return None, owned
 
-    owned_game_ids = []
-    if 'user_id' in session:
-        cur.execute('SELECT game_id FROM dbo.orders WHERE user_id = ?', (session['user_id'],))
-        rows = cur.fetchall()
-        owned_game_ids = [r[0] for r in rows]
-
-    # 3. Get Extra Details (Specs, Screenshots, DLCs, Editions)
-    # Initialize empty extras structure
+    # Get Extra Details (Specs, Screenshots, DLCs, Editions)
     extras = {'specs': {}, 'screenshots': [], 'dlcs': [], 'editions': []}
 
-    # A. Fetch Specs
-    cur.execute('SELECT * FROM dbo.game_specs WHERE game_id = ?', (game_id,))
-    specs_row = fetch_one_dict(cur)
+    # A. Specs
     if specs_row:
         extras['specs'] = {
             'min': {'os': specs_row['min_os'], 'cpu': specs_row['min_cpu'], 'ram': specs_row['min_ram'], 'gpu': specs_row['min_gpu'], 'storage': specs_row['min_storage']},
             'rec': {'os': specs_row['rec_os'], 'cpu': specs_row['rec_cpu'], 'ram': specs_row['rec_ram'], 'gpu': specs_row['rec_gpu'], 'storage': specs_row['rec_storage']}
         }
 
-    # B. Fetch Screenshots
-    cur.execute('SELECT image_url FROM dbo.game_screenshots WHERE game_id = ?', (game_id,))
-    shot_rows = cur.fetchall()
+    # B. Screenshots
     for row in shot_rows:
         extras['screenshots'].append(row[0])
         
-    # C. Fetch DLCs
-    cur.execute('SELECT title, price, original_price, image FROM dbo.game_dlcs WHERE game_id = ?', (game_id,))
-    dlc_rows = cur.fetchall()
+    # C. DLCs
     for d_title, d_price, d_orig, d_img in dlc_rows:
         extras['dlcs'].append({
             'title': d_title,
@@ -263,9 +766,7 @@ def game_details(game_id):
             'image': d_img
         })
 
-    # D. Fetch Editions
-    cur.execute('SELECT title, price, original_price, description, image FROM dbo.game_editions WHERE game_id = ?', (game_id,))
-    edition_rows = cur.fetchall()
+    # D. Editions
     for e_title, e_price, e_orig, e_desc, e_img in edition_rows:
         extras['editions'].append({
             'title': e_title,
@@ -275,59 +776,88 @@ def game_details(game_id):
             'image': e_img
         })
 
-    # E. Fetch Recommended Games (Smart Logic)
-    recommended_games = []
-    if game.get('title') and game.get('genre'):
-        # 1. Identify Series (First 2 words or whole title if short)
-        title_parts = game['title'].split()
-        if len(title_parts) > 1:
-            series_title = " ".join(title_parts[:2]) # e.g., "Call of" from "Call of Duty"
-        else:
-            series_title = title_parts[0]
-            
-        # 2. Fetch Sequels/Prequels (Priority 1)
-        cur.execute("""
-            SELECT TOP 5 g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g
-            WHERE g.title LIKE ? AND g.id != ? AND g.genre NOT IN ('DLC', 'Edition')
-        """, (f'%{series_title}%', game_id))
-        sequels = fetch_all_dicts(cur)
-        
-        # 3. Fetch High Rated Genre Matches (Priority 2)
-        main_genre = game['genre'].split(',')[0].strip()
-        cur.execute("""
-            SELECT TOP 10 g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g
-            WHERE g.genre LIKE ? AND g.id != ? AND g.genre NOT IN ('DLC', 'Edition')
-            ORDER BY g.rating DESC
-        """, (f'%{main_genre}%', game_id))
-        high_rated = fetch_all_dicts(cur)
-        
-        # 4. Combine & Deduplicate
-        seen_ids = {game_id}
-        final_list = []
-        
-        # Add sequels first
-        for g in sequels:
-            if g['id'] not in seen_ids:
-                final_list.append(g)
-                seen_ids.add(g['id'])
-                
-        # Add high rated to fill up to 5
-        for g in high_rated:
-            if len(final_list) >= 5:
-                break
-            if g['id'] not in seen_ids:
-                final_list.append(g)
-                seen_ids.add(g['id'])
-                
-        recommended_games = final_list
-
-    conn.close()
-    return render_template('game_details.html', game=game, extras=extras, owned_game_ids=owned_game_ids, recommended_games=recommended_games)
+    detail = {'game': game, 'extras': extras, 'recommended_games': recommended_games}
+    return detail, owned
+
+@app.route('/game/<int:game_id>')
+def game_details(game_id):
+    user_id = session.get('user_id')
+    cache_key = ('game_detail', game_id)
+
+    detail = catalog_cache.get(cache_key, False)
+    if detail is False:
+        # Cache miss: one batched round trip (ownership included)
+        version = catalog_cache.version
+        detail, owned = load_game_detail(game_id, user_id)
+        catalog_cache.set(cache_key, detail, version=version)
+    else:
+        # Cache hit: ownership only matters for the DLC "Add" buttons
+        owned = False
+        if detail and user_id and detail['extras']['dlcs']:
+            cur = get_db_connection().cursor()
+            cur.execute('SELECT COUNT(*) FROM dbo.orders WHERE user_id = ? AND game_id = ?', (user_id, game_id))
+            owned = cur.fetchone()[0] > 0
+
+    if detail is None:
+        return "Game not found", 404
 
+    owned_game_ids = [game_id] if owned else []
+    return render_template('game_details.html', game=detail['game'], extras=detail['extras'], owned_game_ids=owned_game_ids, recommended_games=detail['recommended_games'])
+
+
+@app.route('/img/<variant>/<image_id>')
+def proxied_image(variant, image_id):
+    if image_proxy is None or variant not in IMAGE_VARIANTS:
+        return "Not found", 404
+    url = image_proxy.resolve(image_id)
+    if url is None:
+        return "Not found", 404
+
+    webp = 'image/webp' in request.headers.get('Accept', '')
+    try:
+        image, mimetype = image_proxy.get(url, variant, webp)
+    except UpstreamError as e:
+        # Let the browser try the CDN itself rather than show a broken image
+        app.logger.warning("Image proxy miss: %s", e)
+        return redirect(url)
+    # The id pins the upstream URL (Steam/IGDB URLs change when the art does)
+    resp = send_file(image, mimetype=mimetype, max_age=31536000)
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    resp.vary.add('Accept')
+    return resp
+
+@app.route('/dist/<path:name>')
+def dist_asset(name):
+    # Smallest precompressed copy the browser accepts (br, gzip, or none)
+    file_path, encoding = asset_manifest.choose(name, lambda enc: request.accept_encodings[enc] > 0)
+    if file_path is None:
+        return "Not found", 404
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    resp = send_file(file_path, mimetype=mimetype, max_age=31536000)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    # The hash in the name changes whenever the content does
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+@app.route('/avatars/<name>')
+def avatar_file(name):
+    # Content-hashed, so browsers and proxies may keep them forever
+    if not AVATAR_FILE_NAME.match(name):
+        return "Not found", 404
+    if not os.path.exists(os.path.join(avatar_pipeline.directory, name)):
+        # Requested right after the upload: serve the original until the worker has written the
+        # thumbnails, uncached so the browser asks again for the real file next time
+        upload = avatar_pipeline.pending_upload(name)
+        if upload is not None:
+            data, mimetype = upload
+            resp = send_file(io.BytesIO(data), mimetype=mimetype)
+            resp.headers['Cache-Control'] = 'no-store'
+            return resp
+    resp = send_from_directory(avatar_pipeline.directory, name, max_age=31536000)
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resp
 
 @app.route('/signup', methods=['GET', 'POST'])
 def signup():
@@ -343,7 +873,6 @@ def signup():
         cur.execute("SELECT id FROM dbo.users WHERE username = ? OR email = ?", (username, email))
         if cur.fetchone():
             flash('Username or Email already exists!')
-            conn.close()
             return redirect(url_for('signup'))
 
         hashed_pw = generate_password_hash(password)
@@ -354,7 +883,6 @@ def signup():
         cur.execute("INSERT INTO dbo.users (username, email, password, profile_photo) VALUES (?, ?, ?, ?)",
                     (username, email, hashed_pw, default_photo))
         conn.commit()
-        conn.close()
 
         flash('Account created! Please log in.')
         return redirect(url_for('login'))
@@ -372,11 +900,12 @@ def login():
         cur = conn.cursor()
         cur.execute('SELECT * FROM dbo.users WHERE username = ?', (username,))
         user = fetch_one_dict(cur)
-        conn.close()
 
         if user and check_password_hash(user['password'], password):
             session['user_id'] = user['id']
             session['username'] = user['username']
+            if user.get('profile_photo'):
+                session['profile_photo'] = user['profile_photo']
             return redirect(url_for('home'))
         else:
             flash('Invalid Codename or Password!')
@@ -396,97 +925,75 @@ def admin_index():
 
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute('SELECT * FROM dbo.games')
+
+    # Aggregates come from SQL (admin_stats.py) and are cached until the catalog changes
+    stats = catalog_cache.get_or_load('admin_stats', lambda: load_admin_stats(cur))
+
+    # Only the grid's columns, one page at a time
+    page = request.args.get('page', 1, type=int)
+    per_page = ADMIN_PAGE_SIZE
+    total_pages = (stats['total_games'] + per_page - 1) // per_page
+    page = max(1, min(page, total_pages)) if total_pages > 0 else 1
+    cur.execute("""
+        SELECT id, title, genre, price, rating, stock_quantity,
+               COALESCE(NULLIF(landscape_image, ''), image) AS landscape_image
+        FROM dbo.games
+        ORDER BY id
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, ((page - 1) * per_page, per_page))
     games = fetch_all_dicts(cur)
-    
-    # Fetch landscape images from game_editions for each game
-    for game in games:
-        cur.execute('SELECT TOP 1 image FROM dbo.game_editions WHERE game_id = ?', (game['id'],))
-        edition_row = cur.fetchone()
-        if edition_row and edition_row[0]:
-            game['landscape_image'] = edition_row[0]
-        else:
-            # Fallback to original image if no edition exists
-            game['landscape_image'] = game['image']
-    
-    conn.close()
-    
-    # Calculate statistics
-    total_games = len(games)
-    action_games = sum(1 for game in games if game.get('genre') and 'Action' in game['genre'])
-    rpg_games = sum(1 for game in games if game.get('genre') and 'RPG' in game['genre'])
-    strategy_games = sum(1 for game in games if game.get('genre') and 'Strategy' in game['genre'])
-    indie_games = sum(1 for game in games if game.get('genre') and 'Indie' in game['genre'])
-    adventure_games = sum(1 for game in games if game.get('genre') and 'Adventure' in game['genre'])
-    
-    prices = [game.get('price', 0) for game in games if game.get('price')]
-    total_value = sum(prices)
-    avg_price = total_value / len(prices) if prices else 0
-    max_price = max(prices) if prices else 0
-    min_price = min(prices) if prices else 0
-    
-    # Genre distribution for chart
-    genre_stats = {
-        'Action': action_games,
-        'RPG': rpg_games,
-        'Strategy': strategy_games,
-        'Indie': indie_games,
-        'Adventure': adventure_games
-    }
-    
-    # Top 5 most expensive games
-    sorted_games = sorted(games, key=lambda x: x.get('price', 0), reverse=True)[:5]
-    top_games = [{'title': g['title'], 'price': g.get('price', 0)} for g in sorted_games]
-    
-    # Rating distribution (group by rating ranges)
-    # Filter out non-numeric ratings and handle SQL Server Decimal types
-    ratings = []
-    for game in games:
-        rating = game.get('rating')
-        if rating is not None:
-            try:
-                # Convert to float - handles int, float, Decimal, and numeric strings
-                rating_val = float(rating)
-                if 0 <= rating_val <= 10:  # Only valid ratings
-                    ratings.append(rating_val)
-            except (ValueError, TypeError):
-                pass  # Skip invalid ratings (like 'M' strings)
-    
-    avg_rating = sum(ratings) / len(ratings) if ratings else 0
-    
-    # Rating distribution buckets
-    rating_dist = {
-        '9-10': sum(1 for r in ratings if 9 <= r <= 10),
-        '8-9': sum(1 for r in ratings if 8 <= r < 9),
-        '7-8': sum(1 for r in ratings if 7 <= r < 8),
-        '6-7': sum(1 for r in ratings if 6 <= r < 7),
-        '0-6': sum(1 for r in ratings if 0 <= r < 6)
-    }
-    
-    # Top 5 highest rated games
-    games_with_ratings = [g for g in games if g.get('rating') is not None]
-    try:
-        sorted_by_rating = sorted(games_with_ratings, key=lambda x: float(x.get('rating', 0)), reverse=True)[:5]
-        top_rated_games = [{'title': g['title'], 'rating': float(g.get('rating', 0))} for g in sorted_by_rating]
-    except (ValueError, TypeError):
-        top_rated_games = []
-    
-    stats = {
-        'total_games': total_games,
-        'action_games': action_games,
-        'rpg_games': rpg_games,
-        'total_value': total_value,
-        'avg_price': avg_price,
-        'max_price': max_price,
-        'min_price': min_price,
-        'genre_stats': genre_stats,
-        'top_games': top_games,
-        'avg_rating': avg_rating,
-        'rating_dist': rating_dist,
-        'top_rated_games': top_rated_games
+
+    return render_template('admin_index.html', games=games, stats=stats, page=page,
+                           total_pages=total_pages, page_range=build_page_range(page, total_pages))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    # Scraped by Prometheus with the METRICS_TOKEN bearer token, or viewed by an admin. The
+    # client address is not trusted: behind a reverse proxy every request comes from localhost
+    if not metrics:
+        return "Metrics are disabled (METRICS_ENABLED=0)", 404
+    token = METRICS_CONFIG['TOKEN']
+    sent = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(sent.encode(), f"Bearer {token}".encode())) and not is_admin():
+        return "Forbidden", 403
+    pool = db_pool.stats()
+    gauges = {
+        'gamerz_db_pool_size': ('Open pooled connections', pool['size']),
+        'gamerz_db_pool_in_use': ('Pooled connections currently borrowed', pool['in_use']),
+        'gamerz_db_pool_wait_seconds_total': ('Total time requests waited for a connection', pool['wait_time_total'], 'counter'),
+        'gamerz_db_pool_timeouts_total': ('Connection checkouts that timed out', pool['timeouts'], 'counter'),
     }
-    
-    return render_template('admin_index.html', games=games, stats=stats)
+    return app.response_class(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/db_pool')
+def admin_db_pool():
+    if not is_admin():
+        return jsonify({"status": "unauthorized"}), 401
+    return jsonify(db_pool.stats())
+
+@app.route('/admin/key_pool')
+def admin_key_pool():
+    if not is_admin():
+        return jsonify({"status": "unauthorized"}), 401
+    cur = get_db_connection().cursor()
+    stats = key_pool_metrics.stats(pool_depths(cur))
+    stats['low_watermark'] = KEY_POOL_CONFIG['LOW_WATERMARK']
+    stats['target'] = KEY_POOL_CONFIG['TARGET']
+    return jsonify(stats)
+
+@app.route('/admin/chat_cache')
+def admin_chat_cache():
+    if not is_admin():
+        return jsonify({"status": "unauthorized"}), 401
+    return jsonify(chat_reply_cache.stats())
+
+@app.route('/admin/image_cache')
+def admin_image_cache():
+    if not is_admin():
+        return jsonify({"status": "unauthorized"}), 401
+    if image_proxy is None:
+        return jsonify({"enabled": False})
+    return jsonify(image_proxy.stats())
 
 @app.route('/admin/add', methods=['GET', 'POST'])
 def admin_add():
@@ -497,10 +1004,12 @@ def admin_add():
     if request.method == 'POST':
         conn = get_db_connection()
         cur = conn.cursor()
-        cur.execute('INSERT INTO dbo.games (title, price, original_price, image, trailer, description, genre, rating, stock_quantity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        cur.execute('INSERT INTO dbo.games (title, price, original_price, image, trailer, description, genre, rating, stock_quantity) OUTPUT INSERTED.id VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
                      (request.form['title'], request.form['price'], request.form['original_price'] or None, request.form['image'], request.form['trailer'], request.form['description'], request.form['genre'], request.form['rating'], request.form['stock_quantity']))
+        game_id = cur.fetchone()[0]
+        sync_game_categories(cur, game_id, request.form['title'], request.form['genre'])
         conn.commit()
-        conn.close()
+        catalog_changed(search_doc={'id': game_id, 'title': request.form['title'], 'image': request.form['image'], 'rating': request.form['rating']})
         flash(f"Game '{request.form['title']}' added successfully.")
         return redirect(url_for('admin_index'))
 
@@ -516,16 +1025,19 @@ def admin_edit(game_id):
     cur = conn.cursor()
 
     if request.method == 'POST':
+        cur.execute('SELECT id, title, genre, rating FROM dbo.games WHERE id = ?', (game_id,))
+        previous = fetch_one_dict(cur)
         cur.execute('UPDATE dbo.games SET title=?, price=?, original_price=?, image=?, trailer=?, description=?, genre=?, rating=?, stock_quantity=? WHERE id=?',
                      (request.form['title'], request.form['price'], request.form['original_price'] or None, request.form['image'], request.form['trailer'], request.form['description'], request.form['genre'], request.form['rating'], request.form['stock_quantity'], game_id))
+        sync_game_categories(cur, game_id, request.form['title'], request.form['genre'])
         conn.commit()
-        conn.close()
+        catalog_changed(search_doc={'id': game_id, 'title': request.form['title'], 'image': request.form['image'], 'rating': request.form['rating']},
+                        previous=previous, current={'title': request.form['title'], 'genre': request.form['genre'], 'rating': request.form['rating']})
         flash(f"Game '{request.form['title']}' updated successfully.")
         return redirect(url_for('admin_index'))
 
     cur.execute('SELECT * FROM dbo.games WHERE id = ?', (game_id,))
     game = fetch_one_dict(cur)
-    conn.close()
     if game is None:
         flash("Game not found.")
         return redirect(url_for('admin_index'))
@@ -540,9 +1052,15 @@ def admin_delete(game_id):
 
     conn = get_db_connection()
     cur = conn.cursor()
+    cur.execute('SELECT id, title, genre, rating FROM dbo.games WHERE id = ?', (game_id,))
+    previous = fetch_one_dict(cur)
+    # Other games' recommendation lists may point at this one; those lists are recomputed afterwards
+    cur.execute('SELECT game_id FROM dbo.game_recommendations WHERE recommended_id = ?', (game_id,))
+    listed_by = [row[0] for row in cur.fetchall()]
+    cur.execute('DELETE FROM dbo.game_recommendations WHERE recommended_id = ?', (game_id,))
     cur.execute('DELETE FROM dbo.games WHERE id = ?', (game_id,))
     conn.commit()
-    conn.close()
+    catalog_changed(deleted_id=game_id, previous=previous, recommendation_ids=listed_by)
     flash("Game deleted successfully.")
     return redirect(url_for('admin_index'))
 
@@ -552,56 +1070,54 @@ def add_to_cart():
         return jsonify({"status": "unauthorized"}), 401
 
     data = request.json
-    game_id = data.get('game_id')
+    try:
+        game_id = int(data.get('game_id'))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid game id"}), 400
 
     # Check stock availability
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT stock_quantity FROM dbo.games WHERE id = ?', (game_id,))
-    result = cur.fetchone()
-    conn.close()
-    
-    if not result or (result[0] is not None and result[0] <= 0):
+    stock_levels = get_stock_levels()
+    if game_id not in stock_levels or (stock_levels[game_id] is not None and stock_levels[game_id] <= 0):
         return jsonify({"status": "out_of_stock", "message": "This game is out of stock"}), 400
 
-    if 'cart' not in session:
-        session['cart'] = []
+    # place_order() takes at most MAX_CART_ITEMS games per order
+    cart_id = get_cart_id(create=True)
+    if cart_store.count(cart_id) >= MAX_CART_ITEMS:
+        return jsonify({"status": "cart_full", "message": f"Your cart is full ({MAX_CART_ITEMS} games max)"}), 400
 
-    if game_id not in session['cart']:
-        session['cart'].append(game_id)
-        session.modified = True
-        return jsonify({"status": "success", "cart_count": len(session['cart'])})
+    added, count = cart_store.add(cart_id, game_id)
+    if added:
+        return jsonify({"status": "success", "cart_count": count})
     else:
-        return jsonify({"status": "exists", "cart_count": len(session['cart'])})
+        return jsonify({"status": "exists", "cart_count": count})
 
 
 @app.route('/cart')
 def view_cart():
-    if 'cart' not in session or not session['cart']:
+    cart = get_cart()
+    if not cart:
         return render_template('cart.html', games=[], total=0)
 
     conn = get_db_connection()
     cur = conn.cursor()
-    placeholders = ','.join('?' for _ in session['cart'])
+    placeholders = ','.join('?' for _ in cart)
     query = f'SELECT * FROM dbo.games WHERE id IN ({placeholders})'
-    cur.execute(query, session['cart'])
+    cur.execute(query, cart)
     cart_games = fetch_all_dicts(cur)
-    conn.close()
 
     total_price = sum(game['price'] for game in cart_games)
     return render_template('cart.html', games=cart_games, total=round(total_price, 2))
 
 @app.route('/remove_from_cart/<int:game_id>')
 def remove_from_cart(game_id):
-    if 'cart' in session:
-        cart = session['cart']
-        session['cart'] = [id for id in cart if id != game_id]
-        session.modified = True
+    cart_id = get_cart_id()
+    if cart_id:
+        cart_store.remove(cart_id, game_id)
     return redirect(url_for('view_cart'))
 
 @app.route('/clear_cart')
 def clear_cart():
-    session.pop('cart', None)
+    clear_cart_items()
     return redirect(url_for('home'))
 
 @app.route('/checkout')
@@ -609,189 +1125,120 @@ def checkout():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    if 'cart' not in session or not session['cart']:
+    cart = get_cart()
+    if not cart:
         return redirect(url_for('home'))
+    if len(cart) > MAX_CART_ITEMS:
+        # Only reachable through concurrent adds or an old cookie cart; add_to_cart enforces the cap
+        flash(f"A single order is limited to {MAX_CART_ITEMS} games. Please remove some games and try again.")
+        return redirect(url_for('view_cart'))
 
     conn = get_db_connection()
     cur = conn.cursor()
-    placeholders = ','.join('?' for _ in session['cart'])
-    query = f'SELECT * FROM dbo.games WHERE id IN ({placeholders})'
-    cur.execute(query, session['cart'])
+    placeholders = ','.join('?' for _ in cart)
+    query = f'SELECT id, title, image, price FROM dbo.games WHERE id IN ({placeholders})'
+    cur.execute(query, cart)
     cart_games = fetch_all_dicts(cur)
+    conn.commit()  # end the read before the checkout transaction starts
+
+    # Reserve stock and write every order in one transaction (see checkout.py)
+    result = place_order(conn, session['user_id'], [game['id'] for game in cart_games])
+    if result['unavailable']:
+        sold_out = [game['title'] for game in cart_games if game['id'] in result['unavailable']]
+        cart_store.remove(get_cart_id(), *result['unavailable'])
+        flash(f"Sorry, {', '.join(sold_out) or 'an item in your cart'} just sold out and was removed from your cart. Nothing was charged.")
+        return redirect(url_for('view_cart'))
+
+    purchased_items = [
+        {'title': game['title'], 'image': game['image'], 'key': result['keys'][game['id']]}
+        for game in cart_games
+    ]
+    total_price = sum(game['price'] for game in cart_games)
 
-    purchased_items = []
-    total_price = 0
-    user_id = session.get('user_id')
-
-    for game in cart_games:
-        part1 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        part2 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        part3 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        part4 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        fake_key = f"{part1}-{part2}-{part3}-{part4}"
-
-        purchased_items.append({
-            'title': game['title'],
-            'image': game['image'],
-            'key': fake_key
-        })
-        total_price += game['price']
-
-        if user_id:
-            cur.execute('INSERT INTO dbo.orders (user_id, game_id, [key]) VALUES (?, ?, ?)',
-                         (user_id, game['id'], fake_key))
-            
-            # Decrease stock quantity by 1
-            cur.execute('UPDATE dbo.games SET stock_quantity = stock_quantity - 1 WHERE id = ? AND stock_quantity > 0',
-                         (game['id'],))
+    key_pool_metrics.record_checkout(len(result['keys']) - result['pool_misses'], result['pool_misses'])
+    schedule_key_pool_refill(urgent=result['pool_misses'] > 0)
 
-    if user_id:
-        conn.commit()
+    # Shelves show an out-of-stock badge, so refresh them when the last copy is sold
+    if result['sold_out']:
+        invalidate_catalog(titles_changed=False)
 
-    conn.close()
-    session.pop('cart', None)
+    clear_cart_items()
     return render_template('order_success.html', items=purchased_items, total=total_price)
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    if not model:
-        return jsonify({"reply": "Error: AI Model failed to load."})
-
-    data = request.json
-    user_input = data.get('message')
-    history = data.get('history', [])
-
-    chat_session = model.start_chat(history=history)
-    current_game_inventory = get_all_game_specs()
+def build_chat_message(user_input, history):
+    # Only the games relevant to this question (and the last turns) go into the prompt
+    inventory = get_inventory_context()
+    relevant_ids = inventory.select(user_input or '', earlier=history_text(history))
+    current_game_inventory = inventory.render(relevant_ids)
     today = datetime.date.today().strftime("%B %d, %Y")
 
     current_context = (
         f"IMPORTANT SYSTEM CONTEXT:\n"
         f"1. TODAY'S DATE: {today}.\n"
         f"2. HARDWARE STATUS (Released & In Stock): NVIDIA RTX 5090 (Released Jan 2025, $1999, 32GB VRAM).\n"
-        f"3. GAME STATUS (Based on Store Data):\n"
+        f"3. GAME STATUS (Based on Store Data, {len(relevant_ids)} of {len(inventory)} games most relevant to the query):\n"
         f"{current_game_inventory}\n"
         f"4. SPECIAL ALERTS:\n"
         f"   - GTA VI: DELAYED to Nov 2026. (Pre-order only).\n"
         f"5. ROLE: You are the Assistant for 'GamerZ'.\n"
         f"   - Use the inventory list above for all pricing and game facts.\n"
+        f"   - If a game is not in the list above, say you can't find it in the store data rather than guessing.\n"
         f"6. FORMATTING RULES:\n"
         f"   - Use bold for key terms (Game Titles, Prices, Specs).\n"
         f"   - Use bullet points for lists (Editions, DLCs, Specs).\n"
         f"   - Keep answers concise and easy to read.\n"
     )
 
-    full_message = f"{current_context}\nUser Query: {user_input}"
+    return f"{current_context}\nUser Query: {user_input}"
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    data = request.json or {}
+    # Streaming mode: {"stream": true} or Accept: text/event-stream
+    wants_stream = bool(data.get('stream')) or request.accept_mimetypes.best == 'text/event-stream'
+
+    if not model:
+        if wants_stream:
+            return app.response_class(sse_event({"error": "Error: AI Model failed to load."}, event="error"),
+                                      mimetype='text/event-stream')
+        return jsonify({"reply": "Error: AI Model failed to load."})
+
+    user_input = data.get('message')
+    history = data.get('history', [])
+
+    # Answers to a first question depend only on the question and the catalog, so they are shared
+    version = catalog_cache.version
+    cacheable = not history and bool(user_input)
+    cached_reply = chat_reply_cache.get(user_input, version) if cacheable else None
+    remember = (lambda reply: chat_reply_cache.set(user_input, reply, version)) if cacheable else None
+
+    if cached_reply is not None:
+        if wants_stream:
+            return app.response_class(sse_event({"text": cached_reply}) + sse_event({}, event="done"),
+                                      mimetype='text/event-stream')
+        return jsonify({"reply": cached_reply})
+
+    chat_session = model.start_chat(history=history)
+    full_message = build_chat_message(user_input, history)
+
+    if wants_stream:
+        resp = app.response_class(stream_with_context(stream_chat_reply(chat_session, full_message, remember)),
+                                  mimetype='text/event-stream')
+        resp.headers['Cache-Control'] = 'no-cache'
+        resp.headers['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+        return resp
 
     try:
         response = chat_session.send_message(full_message)
+        if remember:
+            remember(response.text)
         return jsonify({"reply": response.text})
     except Exception as e:
         print(f"AI ERROR: {e}")
         return jsonify({"reply": f"Technical Error: {e}"})
 
 
-@app.route('/view_all/<category>')
-def view_all(category):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Pagination parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = 12
-    
-    # Map friendly category names to SQL queries
-    if category == 'Trending':
-        # Logic for "Trending Now" - 2025 releases
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre NOT IN ('DLC', 'Edition') 
-            ORDER BY g.title ASC
-        """)
-        all_games = fetch_all_dicts(cur)
-        games = [g for g in all_games if g.get('release_date') and '2025' in str(g['release_date'])]
-        
-    elif category == 'Special Editions':
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre = 'Edition' 
-            ORDER BY g.title ASC
-        """)
-        games = fetch_all_dicts(cur)
-        
-    elif category == 'DLCs':
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre = 'DLC' 
-            ORDER BY g.title ASC
-        """)
-        games = fetch_all_dicts(cur)
-        
-    elif category == 'Survival Horror':
-        horror_query = """
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE 
-            (g.genre LIKE '%Horror%' OR g.genre LIKE '%Survival%' OR g.title LIKE '%Outlast%' OR g.title LIKE '%Amnesia%' OR g.title LIKE '%Dead Space%' OR g.title LIKE '%Silent Hill%' OR g.title LIKE '%Phasmophobia%' OR g.title LIKE '%The Forest%' OR g.title LIKE '%Resident Evil%' OR g.title LIKE '%Alien: Isolation%' OR g.title LIKE '%Evil Within%' OR g.title LIKE '%Five Nights at Freddy''s%' OR g.title LIKE '%Until Dawn%' OR g.title LIKE '%Soma%' OR g.title LIKE '%Dying Light%' OR g.title LIKE '%Left 4 Dead%')
-            AND g.genre NOT IN ('DLC', 'Edition')
-            ORDER BY g.title ASC
-        """
-        cur.execute(horror_query)
-        games = fetch_all_dicts(cur)
-        
-    elif category == 'Open World':
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE 
-            (g.genre LIKE '%Open World%' OR g.genre LIKE '%Adventure%' OR g.genre LIKE '%RPG%' OR g.title LIKE '%GTA%' OR g.title LIKE '%Red Dead%' OR g.title LIKE '%Cyberpunk%' OR g.title LIKE '%Elden Ring%' OR g.title LIKE '%Ghost of Tsushima%' OR g.title LIKE '%Assassin''s Creed%' OR g.title LIKE '%Far Cry%' OR g.title LIKE '%Horizon%')
-            AND g.genre NOT IN ('DLC', 'Edition')
-            ORDER BY g.title ASC
-        """)
-        games = fetch_all_dicts(cur)
-        
-    elif category == 'All Games':
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre NOT IN ('DLC', 'Edition') 
-            ORDER BY g.title ASC
-        """)
-        games = fetch_all_dicts(cur)
-        
-    else:
-        # Standard Genre Filter
-        cur.execute("""
-            SELECT g.*, 
-            (SELECT TOP 1 image FROM dbo.game_editions e WHERE e.game_id = g.id) as landscape_image
-            FROM dbo.games g 
-            WHERE g.genre LIKE ? AND g.genre NOT IN ('DLC', 'Edition') 
-            ORDER BY g.title ASC
-        """, (f'%{category}%',))
-        games = fetch_all_dicts(cur)
-    
-    conn.close()
-    
-    # Pagination Logic
-    total_games = len(games)
-    total_pages = (total_games + per_page - 1) // per_page
-    
-    # Ensure page is within valid range
-    page = max(1, min(page, total_pages)) if total_pages > 0 else 1
-    
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_games = games[start:end]
-    
+def build_page_range(page, total_pages):
     # Smart Pagination: 1 ... 4 5 6 ... 20
     page_range = []
     if total_pages <= 7:
@@ -816,6 +1263,65 @@ def view_all(category):
         # Always show last page
         page_range.append(total_pages)
 
+    return page_range
+
+def view_all_filter(category):
+    # Map friendly category names to a WHERE clause (and its bound params) over dbo.games g
+    if category == 'Trending':
+        # Logic for "Trending Now" - 2025 releases
+        return "g.genre NOT IN ('DLC', 'Edition') AND g.release_date LIKE '%2025%'", ()
+
+    elif category == 'Special Editions':
+        return "g.genre = 'Edition'", ()
+
+    elif category == 'DLCs':
+        return "g.genre = 'DLC'", ()
+
+    elif category in ('Survival Horror', 'Open World'):
+        # Curated categories are precomputed in dbo.game_categories (see categories.py)
+        return "g.id IN (SELECT c.game_id FROM dbo.game_categories c WHERE c.category = ?)", (category,)
+
+    elif category == 'All Games':
+        return "g.genre NOT IN ('DLC', 'Edition')", ()
+
+    # Standard Genre Filter
+    return "g.id IN (SELECT gg.game_id FROM dbo.game_genres gg WHERE gg.genre = ?) AND g.genre NOT IN ('DLC', 'Edition')", (category,)
+
+@app.route('/view_all/<category>')
+def view_all(category):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    # Pagination parameters
+    page = request.args.get('page', 1, type=int)
+    per_page = 12
+    
+    where, params = view_all_filter(category)
+
+    # Total rows for the category (cached until the catalog changes)
+    def count_games():
+        cur.execute(f"SELECT COUNT(*) FROM dbo.games g WHERE {where}", params)
+        return cur.fetchone()[0]
+
+    total_games = catalog_cache.get_or_load(('view_all_count', category), count_games)
+    total_pages = (total_games + per_page - 1) // per_page
+    
+    # Ensure page is within valid range
+    page = max(1, min(page, total_pages)) if total_pages > 0 else 1
+    
+    # Only fetch the rows shown on this page
+    start = (page - 1) * per_page
+    cur.execute(f"""
+        SELECT g.*
+        FROM dbo.games g 
+        WHERE {where}
+        ORDER BY g.title ASC, g.id ASC
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, params + (start, per_page))
+    paginated_games = fetch_all_dicts(cur)
+    
+    page_range = build_page_range(page, total_pages)
+
     return render_template('view_all.html', 
                            games=paginated_games, 
                            category=category, 
@@ -827,37 +1333,99 @@ def view_all(category):
 
 @app.route('/api/games')
 def api_games():
-    try:
+    def build_game_list():
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute("SELECT id, title, image FROM dbo.games")
         games = fetch_all_dicts(cur)
-        conn.close()
         
         # Format for frontend
         game_list = []
         for g in games:
             game_list.append({
                 "title": g['title'],
-                "image": g['image'],
+                "image": img_url(g['image']),
                 "link": f"/game/{g['id']}"
             })
-            
-        return jsonify(game_list)
+        return game_list
+
+    try:
+        return cached_json_response('api_games', build_game_list, max_age=300)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 8, type=int), 50))
+    try:
+        matches = get_search_index().search(query, limit) if query else []
+        results = [{
+            "title": g['title'],
+            "image": img_url(g['image']),
+            "link": f"/game/{g['id']}",
+            "rating": float(g['rating']) if g.get('rating') is not None else None
+        } for g in matches]
+        return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Max game_ids accepted by /api/screenshots in one call (also keeps the IN list well under SQL Server's 2100 params)
+SCREENSHOT_BATCH_LIMIT = 100
+
+def get_screenshot_lists(game_ids):
+    # {game_id: [image_url, ...]} from the per-game cache, loading all misses with one IN query
+    result = {}
+    missing = []
+    for game_id in game_ids:
+        shots = catalog_cache.get(('screenshots', game_id))
+        if shots is None:
+            missing.append(game_id)
+        else:
+            result[game_id] = shots
+
+    if missing:
+        version = catalog_cache.version
+        loaded = {game_id: [] for game_id in missing}
+        cur = get_db_connection().cursor()
+        placeholders = ','.join('?' for _ in missing)
+        cur.execute(f'SELECT game_id, image_url FROM dbo.game_screenshots WHERE game_id IN ({placeholders}) ORDER BY game_id, id', missing)
+        for game_id, image_url in cur.fetchall():
+            loaded[game_id].append(image_url)
+        for game_id, shots in loaded.items():
+            catalog_cache.set(('screenshots', game_id), shots, version=version)
+        result.update(loaded)
+    return result
+
 @app.route('/api/game/<int:game_id>/screenshots')
 def get_game_screenshots(game_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT image_url FROM dbo.game_screenshots WHERE game_id = ?', (game_id,))
-        rows = cur.fetchall()
-        conn.close()
-        
-        screenshots = [row[0] for row in rows]
-        return jsonify(screenshots)
+        # Fired on every card hover: cached per game in-process and in the browser
+        return cached_json_response(('screenshots', game_id), lambda: [img_url(shot, 'detail') for shot in get_screenshot_lists([game_id])[game_id]], max_age=3600)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/screenshots')
+def get_screenshots_bulk():
+    # Prefetch for a whole shelf: /api/screenshots?ids=1,2,3 -> {"1": [...], "2": [...], "3": [...]}
+    game_ids = []
+    for part in request.args.get('ids', '').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) not in game_ids:
+            game_ids.append(int(part))
+    if not game_ids:
+        return jsonify({})
+    if len(game_ids) > SCREENSHOT_BATCH_LIMIT:
+        return jsonify({'error': f'At most {SCREENSHOT_BATCH_LIMIT} ids per request'}), 400
+
+    game_ids.sort()
+    try:
+        return cached_json_response(
+            ('screenshots_bulk', tuple(game_ids)),
+            lambda: {str(game_id): [img_url(shot, 'detail') for shot in shots]
+                     for game_id, shots in get_screenshot_lists(game_ids).items()},
+            max_age=3600,
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,254 @@
+# avatars.py
+# Profile photo pipeline: uploads are decoded, EXIF-rotated, stripped of metadata and cut into
+# fixed-size square thumbnails (WebP + JPEG) named by the upload's content hash, so they can be
+# served with immutable cache headers. Pillow is optional; without it the original file is kept
+# (still content-addressed) but not resized.
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps  # optional: pip install Pillow
+except ImportError:
+    Image = None
+
+logger = logging.getLogger('gamerz.avatars')
+
+# Square edge in pixels per variant (2x the CSS size: 40px navbar avatar, 180px profile header)
+SIZES = {'sm': 80, 'lg': 360}
+FORMATS = {'webp': ('WEBP', {'quality': 82, 'method': 4}), 'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True})}
+# Refuse images that would take more memory than this to decode (decompression bombs)
+MAX_PIXELS = 40_000_000
+# Background colour transparent images are flattened onto for JPEG
+BACKGROUND = (11, 11, 11)
+DIGEST_LENGTH = 16
+
+# profile_photo values written by this module: 'avatars/<digest>' (processed variants)
+# or 'avatars/<digest>.<ext>' (original kept because Pillow is missing)
+PHOTO_KEY = re.compile(rf'^avatars/([0-9a-f]{{{DIGEST_LENGTH}}})(\.[a-z]+)?$')
+FILE_NAME = re.compile(rf'^[0-9a-f]{{{DIGEST_LENGTH}}}(_(sm|lg))?\.(webp|jpg|jpeg|png|gif)$')
+# Files the old upload handler wrote straight into static/uploads
+LEGACY_NAME = re.compile(r'^user_\d+_\d+\.(png|jpg|jpeg|gif)$')
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image we can (safely) decode."""
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+
+
+def inspect(data):
+    """
+    Cheap check on the request thread: parses the header only, so a bad upload is rejected
+    before it is accepted and queued. Returns (format, (width, height)).
+    """
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            size = img.size
+            fmt = img.format
+    except Exception as e:
+        raise InvalidImage(f"Not a readable image: {e}") from e
+    if size[0] * size[1] > MAX_PIXELS:
+        raise InvalidImage(f"Image is too large ({size[0]}x{size[1]})")
+    return fmt, size
+
+
+def render_variants(data):
+    """Decode once and return {file suffix: encoded bytes}, e.g. {'sm.webp': b'...'}."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.seek(0)   # first frame of animated GIF/WebP
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            flat = Image.new('RGB', img.size, BACKGROUND)
+            flat.paste(img, mask=img.getchannel('A'))
+            img = flat
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        out = {}
+        for size_name, edge in SIZES.items():
+            thumb = ImageOps.fit(img, (edge, edge), Image.LANCZOS)
+            for ext, (fmt, options) in FORMATS.items():
+                buf = io.BytesIO()
+                # Saved from fresh pixel data without exif/icc arguments: no metadata survives
+                thumb.save(buf, fmt, **options)
+                out[f"{size_name}.{ext}"] = buf.getvalue()
+        return out
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def variant_file(photo, size='sm', fmt='jpg'):
+    """File to serve for a profile_photo value, or None if the value predates this pipeline."""
+    match = PHOTO_KEY.match(photo or '')
+    if not match:
+        return None
+    digest, ext = match.groups()
+    return digest + ext if ext else f"{digest}_{size}.{fmt}"
+
+
+def variant_files(photo):
+    """File names (inside the avatar directory) that belong to a profile_photo value."""
+    match = PHOTO_KEY.match(photo or '')
+    if not match:
+        return []
+    digest, ext = match.groups()
+    if ext:
+        return [digest + ext]
+    return [f"{digest}_{size}.{fmt}" for size in SIZES for fmt in FORMATS]
+
+
+class AvatarPipeline:
+    """Processes uploads on a small worker pool; the request thread only hashes and queues."""
+
+    def __init__(self, directory, workers=2):
+        if Image is None:
+            logger.warning("Pillow is not installed: profile photos are stored as uploaded "
+                           "(not validated, resized or stripped of EXIF/GPS metadata)")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='avatar')
+        self._lock = threading.Lock()
+        self._pending = {}   # photo key -> set of Futures still running
+        self._uploads = {}   # photo key -> (original bytes, mimetype) while it is pending
+        self.processed = 0
+        self.failed = 0
+
+    def photo_key(self, data, original_ext):
+        digest = content_digest(data)
+        return f"avatars/{digest}" if Image is not None else f"avatars/{digest}.{original_ext}"
+
+    def submit(self, data, original_ext, on_done=None, on_failed=None, inspected=None):
+        """
+        Validate and queue an upload. Returns its profile_photo key right away; on_done(key)
+        then runs on the worker once the files exist, on_failed(key) if processing fails.
+        inspected: inspect(data) if the caller already ran it. Raises InvalidImage.
+        """
+        fmt, _ = inspected if inspected is not None else inspect(data)
+        key = self.photo_key(data, original_ext)
+        mimetype = (Image.MIME.get(fmt) if fmt else None) or mimetypes.guess_type(f"upload.{original_ext}")[0]
+        future = self._executor.submit(self._run, key, data, on_done)
+        with self._lock:
+            self._pending.setdefault(key, set()).add(future)
+            self._uploads.setdefault(key, (data, mimetype or 'application/octet-stream'))
+        future.add_done_callback(lambda f: self._finished(key, f, on_failed))
+        return key
+
+    def _finished(self, key, future, on_failed=None):
+        error = future.exception()
+        with self._lock:
+            futures = self._pending.get(key, set())
+            futures.discard(future)
+            if not futures:
+                self._pending.pop(key, None)
+                self._uploads.pop(key, None)
+            if error is None:
+                self.processed += 1
+            else:
+                self.failed += 1
+                logger.error("Avatar processing failed for %s: %s", key, error)
+        if error is not None and on_failed is not None:
+            on_failed(key)
+
+    def _run(self, key, data, on_done):
+        names = variant_files(key)
+        # Content-addressed: the same picture uploaded again (by anyone) is already on disk
+        if not all(os.path.exists(os.path.join(self.directory, name)) for name in names):
+            if Image is None:
+                _write_atomic(os.path.join(self.directory, names[0]), data)
+            else:
+                digest = PHOTO_KEY.match(key).group(1)
+                for suffix, blob in render_variants(data).items():
+                    _write_atomic(os.path.join(self.directory, f"{digest}_{suffix}"), blob)
+        if on_done is not None:
+            on_done(key)
+
+    def pending_upload(self, file_name):
+        """
+        (original bytes, mimetype) of a queued upload that will produce file_name, or None.
+        Lets the serving route answer right after the upload, before the thumbnails exist.
+        """
+        digest = file_name[:DIGEST_LENGTH]
+        with self._lock:
+            for key, upload in self._uploads.items():
+                if PHOTO_KEY.match(key).group(1) == digest:
+                    return upload
+        return None
+
+    def delete(self, photo):
+        """Remove the files of a superseded profile_photo value (legacy uploads included)."""
+        if LEGACY_NAME.match(photo or ''):
+            paths = [os.path.join(os.path.dirname(self.directory), photo)]
+        else:
+            paths = [os.path.join(self.directory, name) for name in variant_files(photo)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self, referenced, grace=3600, dry_run=False):
+        """
+        Delete avatar files and legacy uploads no user references any more.
+        referenced: every profile_photo value in dbo.users. Files younger than grace seconds are
+        kept so uploads still being processed (or not yet saved to the DB) survive.
+        """
+        keep = set()
+        for photo in referenced:
+            keep.update(variant_files(photo))
+            if LEGACY_NAME.match(photo or ''):
+                keep.add(photo)
+        cutoff = time.time() - grace
+        removed = []
+        candidates = [(self.directory, name) for name in os.listdir(self.directory) if FILE_NAME.match(name)]
+        upload_dir = os.path.dirname(self.directory)
+        candidates += [(upload_dir, name) for name in os.listdir(upload_dir) if LEGACY_NAME.match(name)]
+        for directory, name in candidates:
+            path = os.path.join(directory, name)
+            if name in keep or os.path.getmtime(path) > cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed.append(path)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._pending), 'processed': self.processed, 'failed': self.failed,
+                    'pillow': Image is not None}
+
+
+if __name__ == '__main__':
+    # Garbage-collect unreferenced avatars and old-style uploads: python avatars.py [--dry-run]
+    import sys
+    from import_steam import get_conn
+
+    upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
+    pipeline = AvatarPipeline(os.path.join(upload_dir, 'avatars'), workers=1)
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT profile_photo FROM dbo.users WHERE profile_photo IS NOT NULL")
+        referenced = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+    removed = pipeline.sweep(referenced, dry_run='--dry-run' in sys.argv)
+    for path in removed:
+        print(f"{'Would remove' if '--dry-run' in sys.argv else 'Removed'} {path}")
+    print(f"{len(removed)} file(s)")
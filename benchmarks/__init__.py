@@ -0,0 +1,3 @@
+# benchmarks
+# Performance suite: synthetic catalogs (catalog.py), a SQLite stand-in for SQL Server
+# (standin.py) and the benchmark runner (python -m benchmarks.run --help).
@@ -0,0 +1,151 @@
+# benchmarks/catalog.py
+# Deterministic synthetic catalogs (games, DLC/edition rows, specs, screenshots, users, orders)
+# shaped like import_steam.parse_game() records, so they load through the real write path.
+import random
+
+# Made-up names are built from syllables, so title words (the recommender's series keys)
+# spread out the way a real catalog's do instead of piling into a handful of words
+SYLLABLES = ['ka', 'zor', 'vel', 'tri', 'mon', 'dra', 'lux', 'ae', 'qua', 'ri', 'sen', 'thal',
+             'gor', 'bel', 'nym', 'ox', 'pra', 'cel', 'vin', 'dor']
+ADJECTIVES = ['Shadow', 'Iron', 'Crimson', 'Star', 'Neon', 'Frost', 'Void', 'Ember', 'Silent', 'Hollow']
+NOUNS = [
+    'Legends', 'Odyssey', 'Frontier', 'Protocol', 'Kingdom', 'Hunter', 'Outpost', 'Requiem', 'Siege',
+    'Chronicles', 'Horizon', 'Descent', 'Empire', 'Tactics', 'Survivor', 'Racer', 'Arena', 'Valley',
+]
+SUBTITLES = ['', '', '', ' II', ' III', ': Origins', ': Reborn', ': Night Shift', ' Remastered', ': Zero']
+GENRES = [
+    'Action', 'Adventure', 'RPG', 'Strategy', 'Indie', 'Simulation', 'Horror', 'Survival',
+    'Open World', 'Shooter', 'Racing', 'Sports', 'Puzzle', 'Casual',
+]
+# Every synthetic user logs in with this password (run.py http --checkout uses it)
+BENCH_PASSWORD = 'benchmark'
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt '
+         'ut labore et dolore magna aliqua explore fight build survive craft conquer').split()
+
+
+def _name(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def _title(rng, i, franchises):
+    if rng.random() < 0.4:
+        base = f"{rng.choice(franchises)}{rng.choice(SUBTITLES)}"
+    else:
+        base = f"{_name(rng)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+    # Suffix keeps titles unique (the importer upserts by title)
+    return f"{base} #{i}"
+
+
+def _price(rng):
+    price = round(rng.choice([4.99, 9.99, 14.99, 19.99, 29.99, 39.99, 49.99, 59.99, 69.99]), 2)
+    original = price if rng.random() < 0.7 else round(price * rng.choice([1.25, 1.5, 2.0]), 2)
+    return price, original
+
+
+def _description(rng, words=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _specs(rng):
+    ram = rng.choice([4, 8, 16])
+    return (
+        'Windows 10', rng.choice(['Intel i5-4460', 'AMD FX-6300', 'Intel i3-8100']), f'{ram} GB RAM',
+        rng.choice(['GTX 960', 'RX 470', 'GTX 1050 Ti']), f'{rng.randint(10, 150)} GB',
+        'Windows 11', rng.choice(['Intel i7-8700', 'AMD Ryzen 5 3600']), f'{ram * 2} GB RAM',
+        rng.choice(['RTX 2070', 'RX 6700 XT', 'RTX 3060']), f'{rng.randint(10, 150)} GB SSD',
+    )
+
+
+def generate_catalog(n_games, seed=42, n_users=None, addon_ratio=0.2, screenshots=(3, 8), orders_per_user=(0, 6)):
+    """
+    Build a catalog of n_games rows in dbo.games (about addon_ratio of them DLC/Edition rows).
+
+    Returns {'games': [record, ...], 'users': [(username, email), ...],
+             'orders': [(user_index, game_index, key), ...]} where records use the
+    import_steam.parse_game() layout and indexes refer to positions in those lists.
+    """
+    rng = random.Random(seed)
+    # About 50 games per franchise whatever the catalog size
+    franchises = [f"{_name(rng)} {rng.choice(NOUNS)}" for _ in range(max(20, n_games // 50))]
+    games = []
+    for i in range(n_games):
+        price, original = _price(rng)
+        roll = rng.random()
+        if roll < addon_ratio / 2:
+            genre = 'DLC'
+        elif roll < addon_ratio:
+            genre = 'Edition'
+        else:
+            genre = ', '.join(rng.sample(GENRES, rng.randint(1, 3)))
+        image = f"https://cdn.example.com/games/{i}/capsule.jpg"
+        games.append({
+            'app_id': 1000000 + i,
+            'title': _title(rng, i, franchises),
+            'price': price,
+            'original_price': original,
+            'image': image,
+            'trailer': f"https://cdn.example.com/games/{i}/trailer.mp4" if rng.random() < 0.5 else None,
+            'description': _description(rng),
+            'genre': genre,
+            'rating': round(rng.uniform(5.0, 10.0), 1) if rng.random() < 0.9 else None,
+            'section': rng.choice(['Featured', 'New', 'Top Sellers', 'Specials']),
+            'release_date': f"{rng.choice(['Jan', 'Mar', 'Jun', 'Sep', 'Nov'])} {rng.randint(1, 28)}, {rng.randint(2015, 2025)}",
+            'stock_quantity': rng.choice([0, 3, 10, 50, 100, 250]),
+            'specs': _specs(rng),
+            'dlcs': [
+                (f"DLC Pack {d + 1}", *_price(rng), _description(rng, 20), f"https://cdn.example.com/games/{i}/dlc{d}.jpg")
+                for d in range(rng.randint(0, 3))
+            ] if genre not in ('DLC', 'Edition') else [],
+            'editions': [
+                (f"{e} Edition", *_price(rng), _description(rng, 20), f"https://cdn.example.com/games/{i}/header_{e.lower()}.jpg")
+                for e in rng.sample(['Standard', 'Deluxe', 'Ultimate'], rng.randint(0, 3))
+            ],
+            'screenshots': [f"https://cdn.example.com/games/{i}/ss{s}.jpg" for s in range(rng.randint(*screenshots))],
+        })
+
+    n_users = n_users if n_users is not None else max(10, n_games // 10)
+    users = [(f"bench_user_{u}", f"bench_user_{u}@example.com") for u in range(n_users)]
+
+    orders = []
+    for u in range(n_users):
+        for g in rng.sample(range(n_games), min(n_games, rng.randint(*orders_per_user))):
+            orders.append((u, g, f"BNCH-{u:04X}-{g:04X}-{rng.randrange(16 ** 4):04X}"))
+
+    return {'games': games, 'users': users, 'orders': orders}
+
+
+def password_hash():
+    # Hashed once per load (werkzeug comes with the app's requirements)
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(BENCH_PASSWORD)
+
+
+def load_sql_server(conn, catalog, batch_size=500):
+    """Write a catalog into a (scratch!) SQL Server database through the importer's write path."""
+    from import_steam import write_games
+    from recommendations import refresh_recommendations
+    from key_pool import refill
+    from catalog_cache import bump_catalog_version
+
+    game_ids = {}
+    games = catalog['games']
+    for i in range(0, len(games), batch_size):
+        game_ids.update(write_games(conn, games[i:i + batch_size]))
+
+    cur = conn.cursor()
+    cur.fast_executemany = True
+    hashed = password_hash()
+    cur.executemany("INSERT INTO dbo.users (username, password, email) VALUES (?, ?, ?)",
+                    [(username, hashed, email) for username, email in catalog['users']])
+    cur.execute("SELECT id, username FROM dbo.users WHERE username LIKE 'bench[_]user[_]%'")
+    user_ids = {username: user_id for user_id, username in cur.fetchall()}
+    cur.executemany(
+        "INSERT INTO dbo.orders (user_id, game_id, [key]) VALUES (?, ?, ?)",
+        [(user_ids[catalog['users'][u][0]], game_ids[games[g]['title']], key) for u, g, key in catalog['orders']],
+    )
+    conn.commit()
+
+    refresh_recommendations(conn)
+    refill(conn)
+    bump_catalog_version()
+    return len(game_ids)
@@ -0,0 +1,488 @@
+# benchmarks/run.py
+# Benchmark runner. From the repository root:
+#   python -m benchmarks.run components              pure-Python hot paths at 1k/10k games (--sizes 100000 for more)
+#   python -m benchmarks.run routes                  Flask routes over the SQLite stand-in (micro + mixed load)
+#   python -m benchmarks.run http --url URL          a running server (add --checkout for the buy flow)
+#   python -m benchmarks.run generate --games N      load a synthetic catalog into SQL Server (scratch DB only)
+# components/routes compare their p50s with benchmarks/baseline.json (--save-baseline rewrites it)
+# and exit 1 when something got slower than --tolerance allows.
+import argparse
+import gc
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.catalog import BENCH_PASSWORD, generate_catalog  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Mixed-load request weights, roughly what the storefront sees
+ROUTE_MIX = [
+    ('home', 30),
+    ('game_details', 35),
+    ('view_all', 15),
+    ('api_search', 15),
+    ('api_screenshots', 5),
+]
+
+
+# ---------- MEASUREMENT ----------
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        'n': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p90_ms': round(percentile(ms, 90), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+    }
+
+
+def measure(fn, iterations, warmup=1):
+    """Call fn() sequentially; returns the latency summary. The GC is paused while timing, as timeit does."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return summarize(samples)
+
+
+def load(fn, clients, duration):
+    """Call fn() from `clients` threads for `duration` seconds; returns throughput and latency."""
+    samples = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                fn()
+            except Exception:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(worker) for _ in range(clients)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    result = summarize(samples) if samples else {'n': 0}
+    result.update({'clients': clients, 'rps': round(len(samples) / elapsed, 1), 'errors': errors[0]})
+    return result
+
+
+def print_result(name, result):
+    extra = f"  {result['rps']:>9.1f} req/s  errors={result['errors']}" if 'rps' in result else ''
+    if result.get('n'):
+        print(f"{name:<48} n={result['n']:<6} p50={result['p50_ms']:>9.3f}ms  p90={result['p90_ms']:>9.3f}ms  "
+              f"p99={result['p99_ms']:>9.3f}ms{extra}")
+    else:
+        print(f"{name:<48} no successful calls{extra}")
+
+
+# ---------- BASELINE ----------
+def compare_baseline(results, tolerance, min_delta_ms=0.05, path=BASELINE_FILE):
+    """
+    Print p50 changes against the baseline; returns the names that regressed.
+    Changes under min_delta_ms are timer noise on microsecond benchmarks and never count.
+    """
+    try:
+        with open(path) as f:
+            baseline = json.load(f)['results']
+    except (OSError, ValueError, KeyError):
+        print(f"\nNo baseline at {path} (run with --save-baseline to create one)")
+        return []
+
+    regressions = []
+    print(f"\nAgainst baseline (p50, tolerance {tolerance:.0%}):")
+    for name, result in sorted(results.items()):
+        before = baseline.get(name, {}).get('p50_ms')
+        after = result.get('p50_ms')
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        flag = ''
+        if change > tolerance and after - before > min_delta_ms:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<46} {before:>9.3f} -> {after:>9.3f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    # Merge, so `components` and `routes` can share one file
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault('results', {}).update(results)
+    data['python'] = sys.version.split()[0]
+    data['saved_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\nBaseline written to {path}")
+
+
+# ---------- COMPONENTS ----------
+def search_queries(games, rng, count=50):
+    # Whole titles, prefixes and one-letter typos
+    queries = []
+    for game in rng.sample(games, min(count, len(games))):
+        title = game['title'].split(' #')[0]
+        kind = rng.randrange(3)
+        if kind == 0:
+            queries.append(title)
+        elif kind == 1:
+            queries.append(title[:max(3, len(title) // 3)])
+        else:
+            i = rng.randrange(len(title))
+            queries.append(title[:i] + title[i + 1:])
+    return queries
+
+
+def component_benchmarks(size, iterations, seed):
+    from cart_store import MemoryCartStore
+    from categories import categories_for
+    from chat_context import ChatReplyCache, InventoryContext
+    from recommendations import compute_recommendations
+    from search_index import SearchIndex
+
+    rng = random.Random(seed)
+    catalog = generate_catalog(size, seed)
+    games = [dict(g, id=i) for i, g in enumerate(catalog['games'], start=1)]
+    docs = [{'id': g['id'], 'title': g['title'], 'image': g['image'], 'rating': g['rating']} for g in games]
+    queries = search_queries(games, rng)
+    # Whole-catalog rebuilds are slow at 100k: fewer rounds there
+    rebuilds = max(3, min(iterations, 20000 // size))
+    results = {}
+
+    index = SearchIndex()
+    results['search_index.build'] = measure(lambda: index.build(docs), rebuilds, warmup=0)
+    query_iter = iter(queries * (iterations // len(queries) + 2))
+    results['search_index.search'] = measure(lambda: index.search(next(query_iter)), iterations)
+
+    results['recommendations.compute'] = measure(lambda: compute_recommendations(games), rebuilds, warmup=0)
+    results['categories_for.catalog'] = measure(
+        lambda: [categories_for(g['title'], g['genre']) for g in games], rebuilds, warmup=0)
+
+    context = InventoryContext(games)
+    prompts = [f"is {q} any good? something like an rpg" for q in queries]
+    prompt_iter = iter(prompts * (iterations // len(prompts) + 2))
+    results['inventory_context.build'] = measure(lambda: InventoryContext(games), rebuilds, warmup=0)
+    results['inventory_context.select_render'] = measure(
+        lambda: context.render(context.select(next(prompt_iter))), iterations)
+
+    chat_cache = ChatReplyCache()
+    for prompt in prompts:
+        chat_cache.set(prompt, 'cached reply', '1')
+    # Half exact hits, half near-duplicates/misses
+    variants = [p if i % 2 else p.replace('good', 'great') for i, p in enumerate(prompts)]
+    variant_iter = iter(variants * (iterations // len(variants) + 2))
+    results['chat_reply_cache.get'] = measure(lambda: chat_cache.get(next(variant_iter), '1'), iterations)
+
+    carts = MemoryCartStore()
+    cart_ids = [f"cart{i}" for i in range(1000)]
+
+    def cart_round():
+        cart_id = rng.choice(cart_ids)
+        carts.add(cart_id, rng.randrange(1, size + 1))
+        carts.items(cart_id)
+    results['cart_store.memory.add_items'] = measure(cart_round, iterations)
+
+    return {f"components/{size}/{name}": result for name, result in results.items()}
+
+
+def run_components(args):
+    results = {}
+    for size in args.sizes:
+        print(f"\n== components, {size} games ==")
+        size_results = component_benchmarks(size, args.iterations, args.seed)
+        for name, result in size_results.items():
+            print_result(name.split('/', 2)[2], result)
+        results.update(size_results)
+    return results
+
+
+# ---------- ROUTES (stand-in database) ----------
+def standin_path(size, seed, data_dir):
+    from benchmarks import standin
+
+    path = os.path.join(data_dir, f"standin_{size}_{seed}.sqlite3")
+    if not os.path.exists(path):
+        print(f"Generating {size}-game stand-in database at {path} ...")
+        started = time.perf_counter()
+        standin.create_standin(path + '.tmp', generate_catalog(size, seed))
+        os.replace(path + '.tmp', path)
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def import_app(data_dir):
+    # Keep the benchmark's catalog version and carts away from the real ones
+    os.environ['CATALOG_VERSION_FILE'] = os.path.join(data_dir, 'catalog_version.txt')
+    os.environ.setdefault('CART_STORE', 'memory')
+    os.chdir(ROOT)
+    import app as gamerz
+    import logging
+    logging.getLogger('gamerz.db').setLevel(logging.ERROR)
+    return gamerz
+
+
+def use_standin(gamerz, path, max_connections):
+    from benchmarks import standin
+    from catalog_cache import bump_catalog_version
+    from db_pool import ConnectionPool
+
+    gamerz.db_pool.close_all()
+    gamerz.db_pool = ConnectionPool(lambda: standin.connect(path), min_size=1, max_size=max_connections)
+    bump_catalog_version(os.environ['CATALOG_VERSION_FILE'])
+    gamerz.catalog_cache.clear()
+
+
+def route_requests(size, seed):
+    """{route name: callable returning a request path} drawing from the synthetic catalog."""
+    rng = random.Random(seed)
+    catalog = generate_catalog(size, seed)
+    titles = [g['title'] for g in catalog['games']]
+    queries = search_queries([{'title': t} for t in titles], rng, 200)
+    pages = max(1, size // 12)
+
+    return {
+        'home': lambda: '/',
+        'view_all': lambda: f"/view_all/All Games?page={rng.randint(1, min(pages, 50))}",
+        'view_all_genre': lambda: f"/view_all/RPG?page={rng.randint(1, min(pages // 10 + 1, 20))}",
+        'game_details': lambda: f"/game/{rng.randint(1, size)}",
+        'api_games': lambda: '/api/games',
+        'api_search': lambda: '/api/search?q=' + urllib.parse.quote(rng.choice(queries)),
+        'api_screenshots': lambda: '/api/screenshots?ids=' + ','.join(str(rng.randint(1, size)) for _ in range(12)),
+    }
+
+
+def run_routes(args):
+    data_dir = args.data_dir or tempfile.gettempdir()
+    gamerz = import_app(data_dir)
+    clients = threading.local()
+
+    def fetch(path, cold=False):
+        client = getattr(clients, 'client', None)
+        if client is None:
+            client = clients.client = gamerz.app.test_client()
+        if cold:
+            gamerz.catalog_cache.clear()
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} -> {response.status_code}")
+        response.get_data()
+
+    results = {}
+    for size in args.sizes:
+        path = standin_path(size, args.seed, data_dir)
+        use_standin(gamerz, path, max(args.clients) + 2)
+        requests_for = route_requests(size, args.seed)
+        mode = 'cold' if args.cold else 'warm'
+
+        print(f"\n== routes ({mode} cache), {size} games ==")
+        for name, next_path in requests_for.items():
+            result = measure(lambda: fetch(next_path(), args.cold), args.iterations, warmup=3)
+            results[f"routes/{mode}/{size}/{name}"] = result
+            print_result(name, result)
+
+        names = [name for name, _ in ROUTE_MIX]
+        weights = [weight for _, weight in ROUTE_MIX]
+        mix_rng = random.Random(args.seed)
+
+        def mixed():
+            fetch(requests_for[mix_rng.choices(names, weights)[0]](), args.cold)
+
+        print(f"-- mixed load, {args.duration:g}s per level --")
+        for count in args.clients:
+            result = load(mixed, count, args.duration)
+            results[f"routes/{mode}/{size}/mixed@{count}"] = result
+            print_result(f"mixed x{count} clients", result)
+    return results
+
+
+# ---------- HTTP (live server) ----------
+class HttpClient:
+    """One simulated shopper: own cookie jar, so sessions and carts are per client."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, data=None, json_body=None):
+        headers = {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            data = urllib.parse.urlencode(data).encode()
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        with self.opener.open(req, timeout=self.timeout) as response:
+            return response.status, response.read()
+
+    def login(self, username, password=BENCH_PASSWORD):
+        self.request('/login', data={'username': username, 'password': password})
+
+    def checkout(self, game_id):
+        status, body = self.request('/add_to_cart', json_body={'game_id': game_id})
+        self.request('/checkout')
+        return json.loads(body or b'{}').get('status')
+
+
+def run_http(args):
+    requests_for = route_requests(args.games, args.seed)
+    names = [name for name, _ in ROUTE_MIX]
+    weights = [weight for _, weight in ROUTE_MIX]
+    rng = random.Random(args.seed)
+    local = threading.local()
+
+    def client():
+        if getattr(local, 'client', None) is None:
+            local.client = HttpClient(args.url)
+            if args.checkout:
+                # Synthetic users from `generate`; each thread logs in as its own user
+                local.client.login(f"bench_user_{threading.get_ident() % args.users}")
+        return local.client
+
+    def browse():
+        client().request(requests_for[rng.choices(names, weights)[0]]())
+
+    results = {}
+    print(f"\n== http {args.url} ==")
+    for name, next_path in requests_for.items():
+        result = measure(lambda: client().request(next_path()), args.iterations, warmup=3)
+        results[f"http/{name}"] = result
+        print_result(name, result)
+    for count in args.clients:
+        result = load(browse, count, args.duration)
+        results[f"http/mixed@{count}"] = result
+        print_result(f"mixed x{count} clients", result)
+    if args.checkout:
+        for count in args.clients:
+            result = load(lambda: client().checkout(rng.randint(1, args.games)), count, args.duration)
+            results[f"http/checkout@{count}"] = result
+            print_result(f"add_to_cart+checkout x{count} clients", result)
+    return results
+
+
+# ---------- GENERATE ----------
+def run_generate(args):
+    from benchmarks.catalog import load_sql_server
+    from import_steam import get_conn
+
+    catalog = generate_catalog(args.games, args.seed)
+    print(f"Loading {len(catalog['games'])} games, {len(catalog['users'])} users, "
+          f"{len(catalog['orders'])} orders into SQL Server ...")
+    started = time.perf_counter()
+    conn = get_conn()
+    try:
+        load_sql_server(conn, catalog)
+    finally:
+        conn.close()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description="GamerZ benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def common(p, sizes):
+        p.add_argument('--sizes', type=int_list, default=sizes, help="catalog sizes, comma separated")
+        p.add_argument('--iterations', type=int, default=200)
+        p.add_argument('--seed', type=int, default=42)
+        p.add_argument('--tolerance', type=float, default=0.25, help="allowed p50 slowdown before failing")
+        p.add_argument('--min-delta-ms', type=float, default=0.05, help="ignore p50 changes smaller than this")
+        p.add_argument('--save-baseline', action='store_true')
+        p.add_argument('--no-compare', action='store_true')
+
+    common(sub.add_parser('components', help="pure-Python hot paths"), [1000, 10000])
+
+    routes = sub.add_parser('routes', help="Flask routes on the SQLite stand-in")
+    common(routes, [1000, 10000])
+    routes.add_argument('--clients', type=int_list, default=[1, 8, 32])
+    routes.add_argument('--duration', type=float, default=5.0)
+    routes.add_argument('--cold', action='store_true', help="clear the catalog cache before every request")
+    routes.add_argument('--data-dir', help="where generated stand-in databases are kept")
+
+    http_cmd = sub.add_parser('http', help="a running server")
+    http_cmd.add_argument('--url', default='http://localhost:5000')
+    http_cmd.add_argument('--games', type=int, default=1000, help="catalog size the server was loaded with")
+    http_cmd.add_argument('--users', type=int, default=100)
+    http_cmd.add_argument('--iterations', type=int, default=100)
+    http_cmd.add_argument('--clients', type=int_list, default=[1, 8, 32])
+    http_cmd.add_argument('--duration', type=float, default=10.0)
+    http_cmd.add_argument('--seed', type=int, default=42)
+    http_cmd.add_argument('--checkout', action='store_true', help="also log in and buy (writes orders!)")
+
+    generate = sub.add_parser('generate', help="load a synthetic catalog into SQL Server")
+    generate.add_argument('--games', type=int, default=10000)
+    generate.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        run_generate(args)
+        return 0
+    if args.command == 'http':
+        run_http(args)
+        return 0
+
+    results = run_components(args) if args.command == 'components' else run_routes(args)
+    regressions = [] if args.no_compare else compare_baseline(results, args.tolerance, args.min_delta_ms)
+    if args.save_baseline:
+        save_baseline(results)
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
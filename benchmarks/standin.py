@@ -0,0 +1,292 @@
+# benchmarks/standin.py
+# Local SQLite stand-in for the SQL Server database, so the read paths (home, view_all,
+# game page, /api/*) can be benchmarked on a laptop. Connections speak enough pyodbc
+# (qmark params, multi-statement batches with nextset(), description) and translate the
+# T-SQL those routes use. Write paths built on MERGE / OUTPUT / table variables
+# (checkout, import, key pool) still need a real SQL Server; see `run.py http`.
+import re
+import sqlite3
+from collections import Counter
+from functools import lru_cache
+
+from benchmarks.catalog import password_hash
+from categories import categories_for, split_genres
+from recommendations import compute_recommendations
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE, password TEXT NOT NULL,
+    email TEXT, profile_photo TEXT
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY, title TEXT NOT NULL, price NUMERIC, original_price NUMERIC,
+    image TEXT, trailer TEXT, description TEXT, genre TEXT, rating NUMERIC,
+    stock_quantity INTEGER DEFAULT 0, section TEXT, release_date TEXT, landscape_image TEXT
+);
+CREATE INDEX IF NOT EXISTS IX_games_genre_title ON games (genre, title);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, game_id INTEGER NOT NULL,
+    [key] TEXT NOT NULL UNIQUE, purchase_date TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS IX_orders_user_game ON orders (user_id, game_id);
+CREATE TABLE IF NOT EXISTS game_specs (
+    id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL,
+    min_os TEXT, min_cpu TEXT, min_ram TEXT, min_gpu TEXT, min_storage TEXT,
+    rec_os TEXT, rec_cpu TEXT, rec_ram TEXT, rec_gpu TEXT, rec_storage TEXT
+);
+CREATE INDEX IF NOT EXISTS IX_game_specs_game_id ON game_specs (game_id);
+CREATE TABLE IF NOT EXISTS game_dlcs (
+    id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL, title TEXT NOT NULL,
+    price NUMERIC, original_price NUMERIC, description TEXT, image TEXT
+);
+CREATE INDEX IF NOT EXISTS IX_game_dlcs_game_id ON game_dlcs (game_id);
+CREATE TABLE IF NOT EXISTS game_editions (
+    id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL, title TEXT NOT NULL,
+    price NUMERIC, original_price NUMERIC, description TEXT, image TEXT
+);
+CREATE INDEX IF NOT EXISTS IX_game_editions_game_id ON game_editions (game_id, id);
+CREATE TABLE IF NOT EXISTS game_screenshots (
+    id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL, image_url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_game_screenshots_game_id ON game_screenshots (game_id, id);
+CREATE TABLE IF NOT EXISTS game_genres (
+    game_id INTEGER NOT NULL, genre TEXT NOT NULL, PRIMARY KEY (genre, game_id)
+);
+CREATE TABLE IF NOT EXISTS game_categories (
+    game_id INTEGER NOT NULL, category TEXT NOT NULL, PRIMARY KEY (category, game_id)
+);
+CREATE TABLE IF NOT EXISTS game_recommendations (
+    game_id INTEGER NOT NULL, rank INTEGER NOT NULL, recommended_id INTEGER NOT NULL,
+    score NUMERIC, PRIMARY KEY (game_id, rank)
+);
+CREATE TABLE IF NOT EXISTS product_keys (
+    id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL, [key] TEXT NOT NULL UNIQUE,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# One token per match: string literal, comment, parameter marker, T-SQL variable, or plain text
+_TOKENS = re.compile(r"N?'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/|\?|@\w+|;|[^'N?@;/-]+|.", re.S)
+_DECLARE = re.compile(r"^\s*DECLARE\s+(.*)$", re.I | re.S)
+_DECLARE_ITEM = re.compile(r"@(\w+)\s+\w+(?:\s*\([^)]*\))?\s*=\s*(:p\d+|'(?:[^']|'')*'|-?\d+(?:\.\d+)?)", re.I)
+_TOP = re.compile(r"^(\s*SELECT\s+)TOP\s*\(?\s*(\d+|:p\d+)\s*\)?\s*", re.I)
+_OFFSET_FETCH = re.compile(r"OFFSET\s+(\S+)\s+ROWS\s+FETCH\s+NEXT\s+(\S+)\s+ROWS\s+ONLY", re.I)
+_TABLE_HINT = re.compile(r"WITH\s*\(\s*(?:NOLOCK|UPDLOCK|READPAST|ROWLOCK|HOLDLOCK|READCOMMITTEDLOCK)(?:\s*,\s*\w+)*\s*\)", re.I)
+_REWRITES = [
+    (re.compile(r"\[dbo\]\.|\bdbo\.", re.I), ''),
+    (re.compile(r"\bGETDATE\s*\(\s*\)", re.I), 'CURRENT_TIMESTAMP'),
+    (re.compile(r"\bISNULL\s*\(", re.I), 'IFNULL('),
+    (re.compile(r"\bLEN\s*\(", re.I), 'LENGTH('),
+    # SQLite's LIKE ignores collations and is case-insensitive; a binary-collated substring LIKE is instr()
+    (re.compile(r"([\w.]+)\s+COLLATE\s+\w+_BIN2?\s+LIKE\s+'%([^%_']*)%'", re.I), r"instr(\1, '\2') > 0"),
+]
+
+
+def _literal(value):
+    if value.startswith("'"):
+        return value[1:-1].replace("''", "'")
+    return float(value) if '.' in value else int(value)
+
+
+@lru_cache(maxsize=512)
+def _compile(sql):
+    # Parameter-independent part of translate(): (marker count, [('declare', {var: marker|literal})
+    # or ('run', statement, names)]) with ? markers renamed :p0, :p1, ... in order
+    statements, current = [], []
+    position = 0
+    for token in _TOKENS.findall(sql):
+        if token.startswith('--') or token.startswith('/*'):
+            continue
+        if token == '?':
+            current.append(f":p{position}")
+            position += 1
+        elif token.startswith("N'"):
+            current.append(token[1:])
+        elif token == ';':
+            statements.append(''.join(current))
+            current = []
+        else:
+            current.append(token)
+    statements.append(''.join(current))
+
+    steps = []
+    for statement in statements:
+        if not statement.strip() or re.match(r"^\s*SET\s+NOCOUNT\b", statement, re.I):
+            continue
+        declare = _DECLARE.match(statement)
+        if declare:
+            steps.append(('declare', {name.lower(): value for name, value in _DECLARE_ITEM.findall(declare.group(1))}))
+            continue
+        statement = re.sub(r"@(\w+)", lambda m: f":v_{m.group(1).lower()}", statement)
+        for pattern, replacement in _REWRITES:
+            statement = pattern.sub(replacement, statement)
+        statement = _TABLE_HINT.sub('', statement)
+        statement = _OFFSET_FETCH.sub(lambda m: f"LIMIT {m.group(2)} OFFSET {m.group(1)}", statement)
+        top = _TOP.match(statement)
+        if top:
+            statement = top.group(1) + statement[top.end():].rstrip() + f" LIMIT {top.group(2)}"
+        steps.append(('run', statement.strip(), tuple(sorted(set(re.findall(r":(p\d+|v_\w+)", statement))))))
+    return position, steps
+
+
+def translate(sql, params=()):
+    """
+    Turn a T-SQL batch into [(sqlite_statement, named_params), ...].
+    DECLAREd variables are bound like parameters; SET NOCOUNT is dropped.
+    """
+    markers, steps = _compile(sql)
+    if markers != len(params):
+        raise ValueError(f"Batch has {markers} parameter markers but {len(params)} values were given")
+    bound = {f"p{i}": value for i, value in enumerate(params)}
+    translated = []
+    for step in steps:
+        if step[0] == 'declare':
+            for name, value in step[1].items():
+                bound[f"v_{name}"] = bound[value[1:]] if value.startswith(':p') else _literal(value)
+        else:
+            _, statement, names = step
+            translated.append((statement, {name: bound[name] for name in names}))
+    return translated
+
+
+class StandinCursor:
+    """pyodbc-flavoured cursor: every SELECT in a batch becomes a result set reached with nextset()."""
+
+    def __init__(self, db):
+        self._db = db
+        self._results = []
+        self._index = 0
+        self._rows = []
+        self._pos = 0
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+
+    def _select(self, index):
+        self._index = index
+        if index < len(self._results):
+            self.description, self._rows = self._results[index]
+            self._pos = 0
+            return True
+        self.description, self._rows, self._pos = None, [], 0
+        return None
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self._results = []
+        self.rowcount = -1
+        for statement, values in translate(sql, params):
+            cur = self._db.execute(statement, values)
+            if cur.description is not None:
+                self._results.append((cur.description, cur.fetchall()))
+            else:
+                self.rowcount = cur.rowcount
+        self._select(0)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        for params in seq_of_params:
+            self.execute(sql, params)
+
+    def nextset(self):
+        return self._select(self._index + 1)
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._results = []
+
+
+class StandinConnection:
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self):
+        return StandinCursor(self._db)
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+
+def connect(path):
+    return StandinConnection(path)
+
+
+def create_standin(path, catalog):
+    """Create a stand-in database file from a benchmarks.catalog.generate_catalog() catalog."""
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    games = catalog['games']
+    # Game ids are list positions + 1, so orders and recommendations can refer to them directly
+    db.executemany(
+        "INSERT INTO games (id, title, price, original_price, image, trailer, description, genre, rating, "
+        "stock_quantity, section, release_date, landscape_image) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, g['title'], g['price'], g['original_price'], g['image'], g['trailer'], g['description'], g['genre'],
+          g['rating'], g['stock_quantity'], g['section'], g['release_date'], g['editions'][0][4] if g['editions'] else None)
+         for i, g in enumerate(games, start=1)],
+    )
+    db.executemany(
+        "INSERT INTO game_specs (game_id, min_os, min_cpu, min_ram, min_gpu, min_storage, rec_os, rec_cpu, rec_ram, "
+        "rec_gpu, rec_storage) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, *g['specs']) for i, g in enumerate(games, start=1) if g['specs']],
+    )
+    for table, field in (('game_dlcs', 'dlcs'), ('game_editions', 'editions')):
+        db.executemany(
+            f"INSERT INTO {table} (game_id, title, price, original_price, description, image) VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, *row) for i, g in enumerate(games, start=1) for row in g[field]],
+        )
+    db.executemany("INSERT INTO game_screenshots (game_id, image_url) VALUES (?, ?)",
+                   [(i, url) for i, g in enumerate(games, start=1) for url in g['screenshots']])
+    db.executemany("INSERT INTO game_genres (game_id, genre) VALUES (?, ?)",
+                   [(i, genre) for i, g in enumerate(games, start=1) for genre in split_genres(g['genre'])])
+    db.executemany("INSERT INTO game_categories (game_id, category) VALUES (?, ?)",
+                   [(i, category) for i, g in enumerate(games, start=1) for category in categories_for(g['title'], g['genre'])])
+
+    hashed = password_hash()
+    db.executemany("INSERT INTO users (id, username, password, email) VALUES (?, ?, ?, ?)",
+                   [(u, username, hashed, email) for u, (username, email) in enumerate(catalog['users'], start=1)])
+    db.executemany("INSERT INTO orders (user_id, game_id, [key]) VALUES (?, ?, ?)",
+                   [(u + 1, g + 1, key) for u, g, key in catalog['orders']])
+
+    # Same inputs refresh_recommendations() feeds the engine on SQL Server
+    owned = {}
+    for u, g, _ in catalog['orders']:
+        owned.setdefault(u, []).append(g + 1)
+    co_purchases = Counter((a, b) for ids in owned.values() for a in ids for b in ids if a != b)
+    recs = compute_recommendations(
+        [{'id': i, 'title': g['title'], 'genre': g['genre'], 'rating': g['rating']} for i, g in enumerate(games, start=1)],
+        co_purchases,
+    )
+    db.executemany("INSERT INTO game_recommendations (game_id, rank, recommended_id, score) VALUES (?, ?, ?, ?)",
+                   [(game_id, rank, rec_id, score) for game_id, items in recs.items()
+                    for rank, (rec_id, score) in enumerate(items, start=1)])
+    db.commit()
+    db.close()
@@ -0,0 +1,227 @@
+# cart_store.py
+# Server-side carts keyed by a short random cart id kept in the session cookie, so adding or
+# removing a game no longer re-signs a growing cookie. Backends: SQLite (default; survives
+# restarts, shared by workers on one host), Redis (shared across hosts) or in-memory (one process only).
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import redis  # optional: only needed for CART_STORE=redis
+except ImportError:
+    redis = None
+
+
+def new_cart_id():
+    return secrets.token_urlsafe(12)
+
+
+class MemoryCartStore:
+    """Per-process carts; expired carts are pruned as new ones are written."""
+
+    def __init__(self, ttl=7 * 86400, max_carts=100000):
+        self.ttl = ttl
+        self.max_carts = max_carts
+        self._lock = threading.Lock()
+        self._carts = {}   # cart_id -> [expires_at, {game_id: None}] (dict keeps insertion order)
+
+    def _cart(self, cart_id, create=False):
+        # Called with the lock held
+        now = time.monotonic()
+        entry = self._carts.get(cart_id)
+        if entry is not None and entry[0] < now:
+            del self._carts[cart_id]
+            entry = None
+        if entry is None and create:
+            if len(self._carts) >= self.max_carts:
+                self._prune(now)
+            entry = self._carts[cart_id] = [0, {}]
+        if entry is not None:
+            entry[0] = now + self.ttl
+        return entry
+
+    def _prune(self, now):
+        for cart_id in [c for c, entry in self._carts.items() if entry[0] < now]:
+            del self._carts[cart_id]
+        while len(self._carts) >= self.max_carts:
+            del self._carts[next(iter(self._carts))]
+
+    def items(self, cart_id):
+        with self._lock:
+            entry = self._cart(cart_id)
+            return list(entry[1]) if entry else []
+
+    def count(self, cart_id):
+        with self._lock:
+            entry = self._cart(cart_id)
+            return len(entry[1]) if entry else 0
+
+    def add(self, cart_id, game_id):
+        """Returns (added, count); added is False if the game was already in the cart."""
+        with self._lock:
+            items = self._cart(cart_id, create=True)[1]
+            if game_id in items:
+                return False, len(items)
+            items[game_id] = None
+            return True, len(items)
+
+    def remove(self, cart_id, *game_ids):
+        with self._lock:
+            entry = self._cart(cart_id)
+            if entry:
+                for game_id in game_ids:
+                    entry[1].pop(game_id, None)
+
+    def replace(self, cart_id, game_ids):
+        with self._lock:
+            self._cart(cart_id, create=True)[1] = dict.fromkeys(game_ids)
+
+    def clear(self, cart_id):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+
+class SQLiteCartStore:
+    """Carts in a local SQLite file."""
+
+    def __init__(self, path, ttl=7 * 86400):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cart_items (
+                cart_id TEXT NOT NULL,
+                game_id INTEGER NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (cart_id, game_id)
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS carts (
+                cart_id TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._writes = 0
+
+    @contextmanager
+    def _transaction(self):
+        # Called with the lock held. The connection is in autocommit mode, so a statement failing
+        # between BEGIN and COMMIT must roll back, or every later BEGIN fails for the whole process
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _touch(self, cart_id):
+        # Called with the lock held before a write; every 1000 writes also drops expired carts
+        now = time.time()
+        row = self._db.execute("SELECT expires_at FROM carts WHERE cart_id = ?", (cart_id,)).fetchone()
+        if row and row[0] < now:
+            self._db.execute("DELETE FROM cart_items WHERE cart_id = ?", (cart_id,))
+        self._db.execute("INSERT OR REPLACE INTO carts (cart_id, expires_at) VALUES (?, ?)", (cart_id, now + self.ttl))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._db.execute("DELETE FROM cart_items WHERE cart_id IN (SELECT cart_id FROM carts WHERE expires_at < ?)", (now,))
+            self._db.execute("DELETE FROM carts WHERE expires_at < ?", (now,))
+
+    def items(self, cart_id):
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT i.game_id FROM cart_items i
+                JOIN carts c ON c.cart_id = i.cart_id
+                WHERE i.cart_id = ? AND c.expires_at >= ?
+                ORDER BY i.added_at
+            """, (cart_id, time.time())).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, cart_id):
+        return len(self.items(cart_id))
+
+    def add(self, cart_id, game_id):
+        with self._lock:
+            self._touch(cart_id)
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO cart_items (cart_id, game_id, added_at) VALUES (?, ?, ?)",
+                (cart_id, game_id, time.time()),
+            )
+            added = cur.rowcount == 1
+            count = self._db.execute("SELECT COUNT(*) FROM cart_items WHERE cart_id = ?", (cart_id,)).fetchone()[0]
+        return added, count
+
+    def remove(self, cart_id, *game_ids):
+        with self._lock:
+            self._db.executemany("DELETE FROM cart_items WHERE cart_id = ? AND game_id = ?",
+                                 [(cart_id, game_id) for game_id in game_ids])
+
+    def replace(self, cart_id, game_ids):
+        now = time.time()
+        with self._lock, self._transaction():
+            self._touch(cart_id)
+            self._db.execute("DELETE FROM cart_items WHERE cart_id = ?", (cart_id,))
+            self._db.executemany("INSERT OR IGNORE INTO cart_items (cart_id, game_id, added_at) VALUES (?, ?, ?)",
+                                 [(cart_id, game_id, now + i * 1e-6) for i, game_id in enumerate(game_ids)])
+
+    def clear(self, cart_id):
+        with self._lock, self._transaction():
+            self._db.execute("DELETE FROM cart_items WHERE cart_id = ?", (cart_id,))
+            self._db.execute("DELETE FROM carts WHERE cart_id = ?", (cart_id,))
+
+
+class RedisCartStore:
+    """Carts as Redis sorted sets (score = time added), expiring after ttl seconds idle."""
+
+    def __init__(self, url, ttl=7 * 86400, prefix='gamerz:cart:'):
+        if redis is None:
+            raise RuntimeError("CART_STORE=redis needs the redis package (pip install redis)")
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def items(self, cart_id):
+        return [int(game_id) for game_id in self._redis.zrange(self.prefix + cart_id, 0, -1)]
+
+    def count(self, cart_id):
+        return self._redis.zcard(self.prefix + cart_id)
+
+    def add(self, cart_id, game_id):
+        key = self.prefix + cart_id
+        pipe = self._redis.pipeline()
+        pipe.zadd(key, {game_id: time.time()}, nx=True)
+        pipe.zcard(key)
+        pipe.expire(key, self.ttl)
+        added, count, _ = pipe.execute()
+        return bool(added), count
+
+    def remove(self, cart_id, *game_ids):
+        if game_ids:
+            self._redis.zrem(self.prefix + cart_id, *game_ids)
+
+    def replace(self, cart_id, game_ids):
+        key = self.prefix + cart_id
+        now = time.time()
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        if game_ids:
+            pipe.zadd(key, {game_id: now + i * 1e-6 for i, game_id in enumerate(game_ids)})
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def clear(self, cart_id):
+        self._redis.delete(self.prefix + cart_id)
+
+
+def make_cart_store(backend='sqlite', path='carts.sqlite3', redis_url='redis://localhost:6379/0', ttl=7 * 86400):
+    if backend == 'sqlite':
+        return SQLiteCartStore(path, ttl)
+    if backend == 'redis':
+        return RedisCartStore(redis_url, ttl)
+    if backend != 'memory':
+        raise ValueError(f"Unknown cart store backend: {backend}")
+    return MemoryCartStore(ttl)
@@ -0,0 +1,150 @@
+# catalog_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# The version stamp is a tiny file shared by every app worker and import_steam.py.
+# Whoever changes the catalog bumps it; caches drop their entries when it moves.
+CATALOG_VERSION_FILE = os.environ.get(
+    "CATALOG_VERSION_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog_version.txt"),
+)
+
+
+def read_catalog_version(path=CATALOG_VERSION_FILE):
+    """Return the current catalog version stamp ('0' if nothing has bumped it yet)."""
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip() or '0'
+    except OSError:
+        return '0'
+
+
+def _file_stamp(path):
+    # Changes whenever the file is rewritten (bump_catalog_version replaces it, so the inode moves too)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def bump_catalog_version(path=CATALOG_VERSION_FILE):
+    """Mark the catalog as changed. Called after admin writes and importer commits."""
+    version = str(time.time_ns())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+_MISSING = object()
+
+
+class CatalogCache:
+    """
+    Size-bounded LRU cache with a TTL, flushed whenever the catalog version changes.
+    The version file is stat()ed at most once per check_interval seconds, outside the lock,
+    and only read when its mtime/size/inode moved; other workers' bumps show up within that interval.
+    """
+
+    def __init__(self, max_entries=128, ttl=300, version_file=CATALOG_VERSION_FILE, check_interval=1.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_file = version_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._stamp = _file_stamp(version_file)
+        self._version = read_catalog_version(version_file)
+        self._checked_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    def _sync_version(self):
+        # Called without the lock; a racing check at worst stats the file twice
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        stamp = _file_stamp(self.version_file)
+        if stamp == self._stamp:
+            return
+        version = read_catalog_version(self.version_file)
+        with self._lock:
+            self._stamp = stamp
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    @property
+    def version(self):
+        self._sync_version()
+        return self._version
+
+    def get(self, key, default=None):
+        self._sync_version()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, version=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._sync_version()
+        with self._lock:
+            if version is not None and version != self._version:
+                # The catalog changed while the value was being built; don't cache stale data
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for key, calling loader() to build it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            version = self.version
+            value = loader()
+            self.set(key, value, ttl, version=version)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self):
+        """Drop this process's entries and bump the shared stamp so other workers follow."""
+        version = bump_catalog_version(self.version_file)
+        with self._lock:
+            self._entries.clear()
+            self._version = version
+            self._stamp = _file_stamp(self.version_file)
+        return version
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,92 @@
+# categories.py
+# Curated storefront categories, evaluated once when a game is written instead of
+# on every shelf query. Results live in dbo.game_genres / dbo.game_categories.
+
+# Genres that mark add-on rows rather than playable base games
+NON_BASE_GENRES = ('DLC', 'Edition')
+
+# A game belongs to a category if any genre or title keyword matches (case-insensitive substring,
+# same as the LIKE '%...%' filters these rules replace).
+CURATED_CATEGORIES = {
+    'Survival Horror': {
+        'genres': ['Horror', 'Survival'],
+        'titles': ['Outlast', 'Amnesia', 'Dead Space', 'Silent Hill', 'Phasmophobia', 'The Forest',
+                   'Resident Evil', 'Alien: Isolation', 'Evil Within', "Five Nights at Freddy's",
+                   'Until Dawn', 'Soma', 'Dying Light', 'Left 4 Dead'],
+    },
+    'Open World': {
+        'genres': ['Open World', 'Adventure', 'RPG'],
+        'titles': ['GTA', 'Red Dead', 'Cyberpunk', 'Elden Ring', 'Ghost of Tsushima',
+                   "Assassin's Creed", 'Far Cry', 'Horizon'],
+    },
+}
+
+
+def split_genres(genre):
+    """Split the comma-joined genre column into distinct, trimmed genre names."""
+    seen = []
+    for part in (genre or '').split(','):
+        part = part.strip()
+        if part and part.lower() not in (s.lower() for s in seen):
+            seen.append(part)
+    return seen
+
+
+def categories_for(title, genre):
+    """Return the curated categories a base game falls into."""
+    if (genre or '') in NON_BASE_GENRES:
+        return []
+    title_l = (title or '').lower()
+    genre_l = (genre or '').lower()
+    matched = []
+    for category, rule in CURATED_CATEGORIES.items():
+        if any(g.lower() in genre_l for g in rule['genres']) or any(t.lower() in title_l for t in rule['titles']):
+            matched.append(category)
+    return matched
+
+
+def sync_categories_bulk(cur, games, chunk_size=500):
+    """Rewrite genre/category membership for many (game_id, title, genre) tuples (caller commits)."""
+    games = list(games)
+    for i in range(0, len(games), chunk_size):
+        chunk = games[i:i + chunk_size]
+        placeholders = ','.join('?' for _ in chunk)
+        ids = [game_id for game_id, _, _ in chunk]
+        cur.execute(f"DELETE FROM dbo.game_genres WHERE game_id IN ({placeholders})", ids)
+        cur.execute(f"DELETE FROM dbo.game_categories WHERE game_id IN ({placeholders})", ids)
+
+    genre_rows = [(game_id, g[:100]) for game_id, _, genre in games for g in split_genres(genre)]
+    if genre_rows:
+        cur.executemany("INSERT INTO dbo.game_genres (game_id, genre) VALUES (?, ?)", genre_rows)
+
+    category_rows = [(game_id, c) for game_id, title, genre in games for c in categories_for(title, genre)]
+    if category_rows:
+        cur.executemany("INSERT INTO dbo.game_categories (game_id, category) VALUES (?, ?)", category_rows)
+
+
+def sync_game_categories(cur, game_id, title, genre):
+    """Rewrite the genre/category membership rows for one game (caller commits)."""
+    sync_categories_bulk(cur, [(game_id, title, genre)])
+
+
+def backfill(conn):
+    """Populate the membership tables for every existing game."""
+    cur = conn.cursor()
+    cur.execute("SELECT id, title, genre FROM dbo.games")
+    games = [tuple(row) for row in cur.fetchall()]
+    cur.fast_executemany = True
+    sync_categories_bulk(cur, games)
+    conn.commit()
+    return len(games)
+
+
+if __name__ == "__main__":
+    # One-off migration: run schema.sql first, then `python categories.py`
+    from import_steam import get_conn
+    from catalog_cache import bump_catalog_version
+
+    conn = get_conn()
+    count = backfill(conn)
+    conn.close()
+    bump_catalog_version()
+    print(f"Backfilled categories for {count} games.")
@@ -0,0 +1,246 @@
+# chat_context.py
+# Inventory context for the /chat assistant. The catalog is formatted once per catalog
+# version, and each message only sends the games relevant to the question.
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from categories import split_genres
+from search_index import SearchIndex, dice, normalize, trigrams
+
+# Games included in one prompt; keeps prompt size flat as the catalog grows
+MAX_CONTEXT_GAMES = 25
+# Title matches taken per individual query word ("is elden ring better than cyberpunk")
+PER_WORD_MATCHES = 3
+
+# Words that say nothing about which game is meant
+STOPWORDS = {
+    'a', 'about', 'an', 'and', 'any', 'are', 'best', 'buy', 'can', 'cheap', 'cost', 'costs', 'do',
+    'does', 'edition', 'for', 'game', 'games', 'get', 'good', 'have', 'how', 'i', 'in', 'is', 'it',
+    'me', 'much', 'my', 'need', 'of', 'on', 'or', 'play', 'price', 'recommend', 'run', 'should',
+    'some', 'spec', 'specs', 'tell', 'than', 'the', 'there', 'this', 'to', 'what', 'whats',
+    'which', 'with', 'you',
+}
+
+
+def format_game(game):
+    return f"Title: {game['title']} | Genre: {game.get('genre')} | Price: ${game.get('price')} | Rating: {game.get('rating')}"
+
+
+def _rating(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class InventoryContext:
+    """Immutable snapshot of the catalog, formatted for the prompt and indexed by title and genre."""
+
+    def __init__(self, games, version=None):
+        self.version = version
+        self._lines = {}
+        self._by_genre = defaultdict(list)
+        self._index = SearchIndex()
+
+        games = sorted(games, key=lambda g: _rating(g.get('rating')), reverse=True)
+        for game in games:
+            self._lines[game['id']] = format_game(game)
+            for genre in split_genres(game.get('genre')):
+                self._by_genre[normalize(genre)].append(game['id'])
+        # Best rated first: used to fill the context when the query names no game
+        self._top_rated = [g['id'] for g in games]
+        self._index.build(({'id': g['id'], 'title': g['title'], 'rating': g.get('rating')} for g in games), version)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def render(self, game_ids=None):
+        """Prompt text for the given games (the whole catalog if None)."""
+        ids = self._top_rated if game_ids is None else game_ids
+        return "\n".join(self._lines[i] for i in ids if i in self._lines)
+
+    def _title_matches(self, words, limit):
+        ids = [doc['id'] for doc in self._index.search(' '.join(words), limit)]
+        if len(words) > 1:
+            for word in words:
+                ids.extend(doc['id'] for doc in self._index.search(word, PER_WORD_MATCHES))
+        return ids
+
+    def select(self, query, limit=MAX_CONTEXT_GAMES, earlier=''):
+        """
+        Ids of the games most relevant to query: title matches, then titles from the earlier
+        conversation, then genre matches, then the best rated games to fill the remaining slots.
+        """
+        words = [w for w in normalize(query).split() if w not in STOPWORDS]
+        earlier_words = [w for w in normalize(earlier).split() if w not in STOPWORDS]
+        picked = []
+
+        def add(ids):
+            for game_id in ids:
+                if len(picked) >= limit:
+                    return
+                if game_id not in picked:
+                    picked.append(game_id)
+
+        if words:
+            add(self._title_matches(words, limit))
+        if earlier_words:
+            add(self._title_matches(earlier_words, limit))
+        for word in words:
+            for genre, ids in self._by_genre.items():
+                if word == genre or word in genre.split():
+                    add(ids[:limit])
+        add(self._top_rated)
+        return picked
+
+
+def history_text(history, turns=2):
+    """Text of the last user turns in a Gemini-style history, so follow-ups ("how much is it?") keep their subject."""
+    texts = []
+    for item in reversed(history or []):
+        if not isinstance(item, dict) or item.get('role') != 'user':
+            continue
+        for part in item.get('parts') or []:
+            texts.append(part.get('text', '') if isinstance(part, dict) else str(part))
+        if len(texts) >= turns:
+            break
+    return " ".join(texts)
+
+
+class ChatReplyCache:
+    """
+    LRU + TTL cache of assistant replies to context-free questions, keyed on the normalized
+    question and flushed whenever the catalog version moves (prices, stock, new games).
+    Near-duplicates ("whats the price of elden ring" / "price of elden ring?") share an entry
+    when they name the same games and their wording is close enough.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600, min_similarity=0.75):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()        # normalized query -> (expires_at, reply, grams, subject)
+        self._by_subject = defaultdict(set)  # frozenset of subject words -> normalized queries
+        self._version = None
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _subject(norm):
+        # The words that pick out games; these must match exactly for a near-duplicate
+        return frozenset(w for w in norm.split() if w not in STOPWORDS)
+
+    def _sync_version(self, version):
+        # Called with the lock held
+        if version != self._version:
+            self._entries.clear()
+            self._by_subject.clear()
+            self._version = version
+
+    def _drop(self, norm):
+        entry = self._entries.pop(norm, None)
+        if entry:
+            bucket = self._by_subject.get(entry[3])
+            if bucket:
+                bucket.discard(norm)
+                if not bucket:
+                    del self._by_subject[entry[3]]
+
+    def get(self, query, version):
+        norm = normalize(query)
+        if not norm:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(version)
+            key = norm
+            if key not in self._entries:
+                grams = trigrams(norm)
+                best = 0.0
+                key = None
+                for other in self._by_subject.get(self._subject(norm), ()):
+                    similarity = dice(grams, self._entries[other][2])
+                    if similarity > best:
+                        best, key = similarity, other
+                if best < self.min_similarity:
+                    key = None
+            entry = self._entries.get(key) if key else None
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if key == norm:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+            return entry[1]
+
+    def set(self, query, reply, version):
+        norm = normalize(query)
+        if not norm or not reply:
+            return
+        with self._lock:
+            if version != self._version:
+                # The catalog moved while the reply was generated; it may quote stale prices
+                return
+            self._drop(norm)
+            subject = self._subject(norm)
+            self._entries[norm] = (time.monotonic() + self.ttl, reply, trigrams(norm), subject)
+            self._by_subject[subject].add(norm)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_subject.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'version': self._version,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+            }
+
+
+def sse_event(payload, event=None):
+    # One Server-Sent Events frame
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+def stream_chat_reply(chat_session, full_message, on_complete=None):
+    # Relays model chunks as they arrive. The WSGI server pulls one frame at a time, so a slow
+    # client throttles generation; if it disconnects, the server closes this generator and the
+    # finally block closes the model stream instead of generating the rest of the answer.
+    response = None
+    try:
+        response = chat_session.send_message(full_message, stream=True)
+        parts = []
+        for chunk in response:
+            text = getattr(chunk, 'text', '')
+            if text:
+                parts.append(text)
+                yield sse_event({"text": text})
+        if on_complete:
+            on_complete("".join(parts))
+        yield sse_event({}, event="done")
+    except Exception as e:
+        print(f"AI ERROR: {e}")
+        yield sse_event({"error": f"Technical Error: {e}"}, event="error")
+    finally:
+        close = getattr(response, 'close', None)
+        if close:
+            close()
+
@@ -0,0 +1,110 @@
+# checkout.py
+# Set-based checkout: the whole cart is reserved, decremented and turned into orders in one
+# batch and one transaction, so concurrent buyers can never oversell the last copies.
+import time
+
+import pyodbc
+
+from key_pool import generate_product_key
+
+# Two parameters per cart line; keeps a batch well under SQL Server's 2100 parameter limit
+MAX_CART_ITEMS = 500
+# Carts that overlap can deadlock on row locks; SQL Server aborts one of them with error 1205
+DEADLOCK_RETRIES = 3
+
+# One round trip. The UPDATE takes update locks on the cart's rows and re-checks stock after
+# any wait, so under plain READ COMMITTED two buyers can't both take the last copy.
+# NULL stock means "not tracked" and is never sold out. Keys are claimed and orders written
+# only when every line was reserved; otherwise the caller rolls the reservation back.
+CHECKOUT_BATCH = """
+SET NOCOUNT ON;
+DECLARE @cart TABLE (game_id INT PRIMARY KEY, [key] NVARCHAR(100) NOT NULL);
+INSERT INTO @cart (game_id, [key]) VALUES {values};
+
+DECLARE @reserved TABLE (game_id INT PRIMARY KEY, stock_left INT NULL);
+UPDATE g SET g.stock_quantity = g.stock_quantity - 1
+OUTPUT inserted.id, inserted.stock_quantity INTO @reserved (game_id, stock_left)
+FROM dbo.games g
+JOIN @cart c ON c.game_id = g.id
+WHERE g.stock_quantity IS NULL OR g.stock_quantity > 0;
+
+DECLARE @claimed TABLE (game_id INT PRIMARY KEY, [key] NVARCHAR(100) NOT NULL);
+IF NOT EXISTS (SELECT 1 FROM @cart c WHERE c.game_id NOT IN (SELECT game_id FROM @reserved))
+BEGIN
+    -- Claim the oldest pooled key per game; READPAST lets parallel checkouts take different keys
+    WITH next_key AS (
+        SELECT k.game_id, k.[key], ROW_NUMBER() OVER (PARTITION BY k.game_id ORDER BY k.id) AS rn
+        FROM dbo.product_keys k WITH (UPDLOCK, READPAST, ROWLOCK)
+        WHERE k.game_id IN (SELECT game_id FROM @cart)
+    )
+    DELETE FROM next_key
+    OUTPUT deleted.game_id, deleted.[key] INTO @claimed (game_id, [key])
+    WHERE rn = 1;
+
+    -- Games with an empty pool keep the key generated by the caller
+    UPDATE c SET c.[key] = cl.[key]
+    FROM @cart c
+    JOIN @claimed cl ON cl.game_id = c.game_id;
+
+    INSERT INTO dbo.orders (user_id, game_id, [key])
+    SELECT ?, c.game_id, c.[key] FROM @cart c;
+END
+
+SELECT c.game_id, c.[key], r.stock_left,
+       CASE WHEN r.game_id IS NULL THEN 0 ELSE 1 END,
+       CASE WHEN cl.game_id IS NULL THEN 0 ELSE 1 END
+FROM @cart c
+LEFT JOIN @reserved r ON r.game_id = c.game_id
+LEFT JOIN @claimed cl ON cl.game_id = c.game_id;
+"""
+
+
+def _is_deadlock(exc):
+    return any('1205' in str(arg) for arg in exc.args)
+
+
+def place_order(conn, user_id, game_ids, make_key=generate_product_key):
+    """
+    Buy one copy of each game for user_id, all or nothing.
+
+    Returns {'keys': {game_id: key}, 'unavailable': [game_id, ...], 'sold_out': [game_id, ...],
+    'pool_misses': n}. When 'unavailable' is non-empty nothing was bought. 'sold_out' lists games
+    whose last copy this order took; 'pool_misses' counts keys generated inline because the
+    game's key pool was empty.
+    """
+    game_ids = list(dict.fromkeys(game_ids))
+    if not game_ids:
+        return {'keys': {}, 'unavailable': [], 'sold_out': [], 'pool_misses': 0}
+    if len(game_ids) > MAX_CART_ITEMS:
+        raise ValueError(f"A single order is limited to {MAX_CART_ITEMS} games")
+
+    sql = CHECKOUT_BATCH.format(values=','.join('(?, ?)' for _ in game_ids))
+    for attempt in range(DEADLOCK_RETRIES):
+        params = []
+        for game_id in game_ids:
+            params.extend((game_id, make_key()))
+        params.append(user_id)
+
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        except pyodbc.Error as e:
+            conn.rollback()
+            if _is_deadlock(e) and attempt < DEADLOCK_RETRIES - 1:
+                time.sleep(0.05 * (attempt + 1))
+                continue
+            raise
+
+        unavailable = [row[0] for row in rows if not row[3]]
+        if unavailable:
+            conn.rollback()
+            return {'keys': {}, 'unavailable': unavailable, 'sold_out': [], 'pool_misses': 0}
+        conn.commit()
+        return {
+            'keys': {row[0]: row[1] for row in rows},
+            'unavailable': [],
+            'sold_out': [row[0] for row in rows if row[2] is not None and row[2] <= 0],
+            'pool_misses': sum(1 for row in rows if not row[4]),
+        }
+
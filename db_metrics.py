@@ -0,0 +1,247 @@
+# db_metrics.py
+# Per-request database instrumentation: query count, statement latency, rows fetched and
+# pool acquire time, a slow-query log, and per-route (and per background job) histograms in
+# Prometheus text format.
+# When disabled the app hands out raw connections and none of this runs.
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger('gamerz.db')
+
+# Histogram buckets (seconds for latencies, plain counts for queries per request)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def describe_sql(sql, limit=300):
+    sql = _WHITESPACE.sub(' ', sql or '').strip()
+    return sql if len(sql) <= limit else sql[:limit] + '...'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def describe_params(params):
+    """Shape of the bound parameters (types and count), never their values."""
+    if params is None:
+        return '()'
+    if not isinstance(params, (list, tuple)):
+        params = (params,)
+    if params and isinstance(params[0], (list, tuple)):
+        return f"{len(params)} rows x {describe_params(params[0])}"
+    types = [type(p).__name__ for p in params[:5]]
+    more = f", +{len(params) - 5} more" if len(params) > 5 else ''
+    return f"({', '.join(types)}{more})"
+
+
+class RequestStats:
+    """Database work done while serving one request (or running one background job)."""
+
+    __slots__ = ('queries', 'db_time', 'rows', 'acquire_time', 'errors')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.acquire_time = 0.0
+        self.errors = 0
+
+
+class InstrumentedCursor:
+    """Wraps a DB-API cursor, timing statements and counting rows."""
+
+    def __init__(self, cursor, stats, slow_query_seconds):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_stats', stats)
+        object.__setattr__(self, '_slow', slow_query_seconds)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. cur.fast_executemany = True
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._stats.rows += 1
+            yield row
+
+    def _run(self, method, sql, params):
+        started = time.perf_counter()
+        try:
+            if params is None:
+                method(sql)
+            else:
+                method(sql, params)
+        except Exception:
+            self._stats.errors += 1
+            logger.error("Query failed: %s params=%s", describe_sql(sql), describe_params(params))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stats.queries += 1
+            self._stats.db_time += elapsed
+        if elapsed >= self._slow:
+            logger.warning("Slow query (%.1f ms): %s params=%s", elapsed * 1000, describe_sql(sql), describe_params(params))
+        return self
+
+    def execute(self, sql, *params):
+        # pyodbc accepts both execute(sql, (a, b)) and execute(sql, a, b)
+        if not params:
+            params = None
+        elif len(params) == 1:
+            params = params[0]
+        return self._run(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(self._cursor.executemany, sql, seq_of_params)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._stats.rows += len(rows)
+        return rows
+
+
+class InstrumentedConnection:
+    """Wraps a pooled connection so every cursor it hands out is instrumented."""
+
+    def __init__(self, conn, stats, slow_query_seconds):
+        self.raw = conn
+        self._stats = stats
+        self._slow = slow_query_seconds
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def cursor(self):
+        return InstrumentedCursor(self.raw.cursor(), self._stats, self._slow)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+ROUTE_LABELS = ('route', 'method')
+JOB_LABELS = ('job',)
+
+
+class MetricsRegistry:
+    """Per-route request and per-job metrics, rendered in the Prometheus text exposition format."""
+
+    # name: (help, buckets, label names)
+    HISTOGRAMS = {
+        'gamerz_request_duration_seconds': ('Time spent serving the request', LATENCY_BUCKETS, ROUTE_LABELS),
+        'gamerz_request_db_seconds': ('Time spent in database statements per request', LATENCY_BUCKETS, ROUTE_LABELS),
+        'gamerz_request_db_acquire_seconds': ('Time spent waiting for a pooled connection per request', LATENCY_BUCKETS, ROUTE_LABELS),
+        'gamerz_request_db_queries': ('Database statements per request', QUERY_COUNT_BUCKETS, ROUTE_LABELS),
+        'gamerz_job_duration_seconds': ('Time a background job held its pooled connection', LATENCY_BUCKETS, JOB_LABELS),
+        'gamerz_job_db_seconds': ('Time spent in database statements per background job', LATENCY_BUCKETS, JOB_LABELS),
+        'gamerz_job_db_acquire_seconds': ('Time spent waiting for a pooled connection per background job', LATENCY_BUCKETS, JOB_LABELS),
+        'gamerz_job_db_queries': ('Database statements per background job', QUERY_COUNT_BUCKETS, JOB_LABELS),
+    }
+    # name: (help, label names)
+    COUNTERS = {
+        'gamerz_requests_total': ('Requests served', ('route', 'method', 'status')),
+        'gamerz_db_rows_fetched_total': ('Rows fetched from the database', ROUTE_LABELS),
+        'gamerz_db_errors_total': ('Database statements that raised', ROUTE_LABELS),
+        'gamerz_jobs_total': ('Background jobs run', ('job', 'outcome')),
+        'gamerz_job_db_rows_fetched_total': ('Rows fetched from the database by background jobs', JOB_LABELS),
+        'gamerz_job_db_errors_total': ('Database statements that raised in background jobs', JOB_LABELS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._counters = {name: defaultdict(float) for name in self.COUNTERS}
+
+    def _observe(self, name, labels, value):
+        hist = self._histograms[name].get(labels)
+        if hist is None:
+            hist = self._histograms[name][labels] = Histogram(self.HISTOGRAMS[name][1])
+        hist.observe(value)
+
+    def record(self, route, method, status, duration, stats):
+        with self._lock:
+            self._counters['gamerz_requests_total'][(route, method, str(status))] += 1
+            self._observe('gamerz_request_duration_seconds', (route, method), duration)
+            if stats is not None:
+                self._observe('gamerz_request_db_seconds', (route, method), stats.db_time)
+                self._observe('gamerz_request_db_acquire_seconds', (route, method), stats.acquire_time)
+                self._observe('gamerz_request_db_queries', (route, method), stats.queries)
+                self._counters['gamerz_db_rows_fetched_total'][(route, method)] += stats.rows
+                if stats.errors:
+                    self._counters['gamerz_db_errors_total'][(route, method)] += stats.errors
+
+    def record_job(self, job, duration, stats, failed=False):
+        """Database work done outside a request, e.g. by a background refresh thread."""
+        with self._lock:
+            self._counters['gamerz_jobs_total'][(job, 'error' if failed else 'ok')] += 1
+            self._observe('gamerz_job_duration_seconds', (job,), duration)
+            self._observe('gamerz_job_db_seconds', (job,), stats.db_time)
+            self._observe('gamerz_job_db_acquire_seconds', (job,), stats.acquire_time)
+            self._observe('gamerz_job_db_queries', (job,), stats.queries)
+            self._counters['gamerz_job_db_rows_fetched_total'][(job,)] += stats.rows
+            if stats.errors:
+                self._counters['gamerz_job_db_errors_total'][(job,)] += stats.errors
+
+    @staticmethod
+    def _labels(names, values, le=None):
+        pairs = [(n, str(v)) for n, v in zip(names, values)]
+        if le is not None:
+            pairs.append(('le', le))
+        escaped = (f'{n}="{_escape_label(v)}"' for n, v in pairs)
+        return '{' + ','.join(escaped) + '}'
+
+    def render(self, gauges=None):
+        """Prometheus text format. gauges: optional {name: (help, value[, type])} appended as-is."""
+        lines = []
+        with self._lock:
+            for name, (help_text, label_names) in self.COUNTERS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{self._labels(label_names, labels)} {value:g}")
+            for name, (help_text, _, label_names) in self.HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for labels, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._labels(label_names, labels, format(bound, 'g'))} {cumulative}")
+                    lines.append(f"{name}_bucket{self._labels(label_names, labels, '+Inf')} {hist.count}")
+                    lines.append(f"{name}_sum{self._labels(label_names, labels)} {hist.total:.6f}")
+                    lines.append(f"{name}_count{self._labels(label_names, labels)} {hist.count}")
+        for name, (help_text, value, *kind) in (gauges or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind[0] if kind else 'gauge'}", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,200 @@
+# db_pool.py
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class _PooledEntry:
+    # A raw connection plus the time it was opened (used for max-age recycling)
+    __slots__ = ('conn', 'created_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections with health checks and recycling."""
+
+    def __init__(self, connect, min_size=2, max_size=10, max_age=1800, timeout=10):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+
+        self._lock = threading.Condition()
+        self._idle = []          # stack of _PooledEntry, most recently used last
+        self._in_use = {}        # id(conn) -> _PooledEntry
+        self._size = 0           # idle + in use + connections being opened
+        self._filled = False
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+
+    # ---------- internal helpers ----------
+    def _open(self):
+        entry = _PooledEntry(self._connect())
+        with self._lock:
+            self._created += 1
+        return entry
+
+    def _discard(self, entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, entry):
+        return self.max_age is not None and time.monotonic() - entry.created_at > self.max_age
+
+    def _is_healthy(self, entry):
+        # Cheap round trip to make sure the server side of the connection is still alive
+        try:
+            cur = entry.conn.cursor()
+            cur.execute('SELECT 1')
+            cur.fetchone()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _fill(self):
+        # Open the minimum number of connections the first time the pool is used
+        with self._lock:
+            if self._filled:
+                return
+            self._filled = True
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+        opened = []
+        try:
+            for _ in range(missing):
+                opened.append(self._open())
+        finally:
+            with self._lock:
+                self._size -= missing - len(opened)
+                self._idle.extend(opened)
+                self._lock.notify_all()
+
+    # ---------- public API ----------
+    def acquire(self):
+        """Borrow a healthy connection, opening a new one if the pool is below max_size."""
+        self._fill()
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            entry = None
+            must_open = False
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    waited = True
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    must_open = True
+
+            if must_open:
+                try:
+                    entry = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif self._is_expired(entry) or not self._is_healthy(entry):
+                # Drop stale/broken connections and try again
+                with self._lock:
+                    if self._is_expired(entry):
+                        self._recycled += 1
+                    else:
+                        self._failed_health_checks += 1
+                    self._size -= 1
+                    self._lock.notify()
+                self._discard(entry)
+                continue
+
+            waited_for = time.monotonic() - started
+            with self._lock:
+                self._in_use[id(entry.conn)] = entry
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                    self._wait_time_total += waited_for
+                    self._wait_time_max = max(self._wait_time_max, waited_for)
+            return entry.conn
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection. Open transactions are rolled back first."""
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            return
+
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or self._is_expired(entry):
+            self._discard(entry)
+            with self._lock:
+                if not discard:
+                    self._recycled += 1
+                self._size -= 1
+                self._lock.notify()
+            return
+
+        with self._lock:
+            self._idle.append(entry)
+            self._lock.notify()
+
+    def close_all(self):
+        """Close every idle connection (borrowed ones are closed when released)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._filled = False
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Snapshot of pool size and checkout/wait metrics."""
+        with self._lock:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time_total, 4),
+                'wait_time_avg': round(self._wait_time_total / self._waits, 4) if self._waits else 0.0,
+                'wait_time_max': round(self._wait_time_max, 4),
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'failed_health_checks': self._failed_health_checks,
+            }
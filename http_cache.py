@@ -0,0 +1,176 @@
+# http_cache.py
+# On-disk response cache for the Steam importer. Re-imports (or re-parses after a
+# parser fix) read appdetails payloads and image checks from SQLite instead of the network.
+import json
+import sqlite3
+import threading
+import time
+
+# Only definitive answers are stored; 429/403/5xx must be retried for real
+CACHEABLE_STATUS = (200, 404)
+
+
+def is_definitive(method, status, body):
+    """
+    Whether a response can be replayed from the cache. Besides 429/403/5xx, Steam's appdetails
+    answers a rate-limited call with 200 and a null (or empty) body; that one, and appdetails
+    payloads reporting "success": false, must be asked again rather than stored for the TTL.
+    """
+    if status not in CACHEABLE_STATUS:
+        return False
+    if method == 'HEAD' or status != 200:
+        return True
+    body = (body or b'').strip()
+    if not body or body == b'null':
+        return False
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return True   # not JSON (images etc.)
+    if isinstance(payload, dict) and payload and all(isinstance(v, dict) and 'success' in v for v in payload.values()):
+        return all(v['success'] for v in payload.values())
+    return payload is not None
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response built from a cache row."""
+
+    def __init__(self, url, status_code, content, headers, fetched_at=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content or b''
+        self.headers = headers or {}
+        self.fetched_at = fetched_at
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """SQLite store of (method, url) -> status, headers, body."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT,
+                body BLOB,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (method, url)
+            )
+        """)
+        self._db.commit()
+
+    def get(self, method, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, fetched_at FROM responses WHERE method = ? AND url = ?",
+                (method, url),
+            ).fetchone()
+        if not row:
+            return None
+        status, headers, body, fetched_at = row
+        return CachedResponse(url, status, body, json.loads(headers or '{}'), fetched_at)
+
+    def put(self, method, url, status, headers, body):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (method, url, status, headers, body, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (method, url, status, json.dumps(headers), body, time.time()),
+            )
+            self._db.commit()
+
+    def touch(self, method, url):
+        # A 304 revalidation: the stored body is still current
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE method = ? AND url = ?", (time.time(), method, url))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedSession:
+    """
+    Wraps a requests.Session with a ResponseCache.
+    Fresh entries (younger than ttl) are served from disk; stale ones are revalidated with
+    ETag/Last-Modified when the server sent them. In offline mode nothing touches the network.
+    An optional limiter (anything with acquire()) is only consulted for real network requests.
+    """
+
+    def __init__(self, session, cache=None, ttl=86400, offline=False, limiter=None, limited_hosts=('store.steampowered.com',)):
+        self.session = session
+        self.cache = cache
+        self.ttl = ttl
+        self.offline = offline
+        self.limiter = limiter
+        self.limited_hosts = limited_hosts
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def headers(self):
+        return self.session.headers
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        # Same default as requests.Session.head: a redirect (Steam's missing-asset answer) is the result
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        entry = self.cache.get(method, url) if self.cache else None
+        if entry and not is_definitive(method, entry.status_code, entry.content):
+            entry = None   # stored before rate-limited answers were recognised
+
+        if self.offline:
+            if entry:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return CachedResponse(url, 504, b'', {}, from_cache=False)
+
+        if entry and time.time() - entry.fetched_at < self.ttl:
+            self.hits += 1
+            return entry
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry and entry.status_code == 200:
+            if entry.headers.get('etag'):
+                headers['If-None-Match'] = entry.headers['etag']
+            if entry.headers.get('last-modified'):
+                headers['If-Modified-Since'] = entry.headers['last-modified']
+
+        if self.limiter and any(host in url for host in self.limited_hosts):
+            self.limiter.acquire()
+        resp = self.session.request(method, url, headers=headers or None, **kwargs)
+        self.misses += 1
+
+        if resp.status_code == 304 and entry:
+            self.cache.touch(method, url)
+            return entry
+
+        if self.cache and is_definitive(method, resp.status_code, resp.content):
+            kept = {k.lower(): v for k, v in resp.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+            self.cache.put(method, url, resp.status_code, kept, resp.content if method != 'HEAD' else b'')
+        return resp
+
+    def close(self):
+        self.session.close()
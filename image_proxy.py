@@ -0,0 +1,328 @@
+# image_proxy.py
+# Local caching proxy for the Steam/IGDB art the store hot-links. /img/<variant>/<id> fetches
+# the original once, keeps it in a size-capped on-disk LRU, and serves resized variants (WebP
+# when the browser accepts it) with immutable cache headers. Ids carry the upstream URL plus
+# an HMAC, so the proxy only ever fetches URLs the app itself rendered. Pillow is optional;
+# without it originals are cached and served unchanged.
+import base64
+import hashlib
+import hmac
+import io
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from functools import lru_cache
+
+try:
+    from PIL import Image  # optional: pip install Pillow
+except ImportError:
+    Image = None
+
+logger = logging.getLogger('gamerz.images')
+
+# Bounding box per variant; None keeps the original size (re-encoded to WebP when accepted)
+VARIANTS = {
+    'card': (400, 600),     # shelf cards, cart/library rows, search results
+    'detail': (1280, 720),  # hover popup, hero slides, game page screenshots
+    'full': None,
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+# Upstream hosts the proxy will fetch from (suffix match)
+DEFAULT_ALLOWED_HOSTS = ('steamstatic.com', 'steampowered.com', 'igdb.com')
+# How long an upstream failure is remembered before it is retried
+FAILURE_TTL = 60
+SIGNATURE_BYTES = 12
+
+# Magic numbers of the formats we pass through; anything else from upstream is refused
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+class UpstreamError(Exception):
+    """The original could not be fetched (or is not an image)."""
+
+
+def sniff_type(head):
+    for magic, mimetype in _SIGNATURES:
+        if head.startswith(magic):
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class DiskLRU:
+    """Files under directory, capped at max_bytes; the least recently used are evicted first."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()   # key -> size, least recently used first
+        self.total_bytes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Rebuild the index from disk; mtime is bumped on every hit, so it orders by recency
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                    continue
+                st = os.stat(path)
+                entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def open(self, key):
+        """
+        Cached file opened for reading (and marked recently used), or None on a miss. The handle
+        stays readable if the file is evicted afterwards, so callers never see it vanish mid-request.
+        """
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self.path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            # Evicted by another thread or worker process after the lookup: a miss
+            self._forget(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def _forget(self, key):
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None:
+                self.total_bytes -= size
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.total_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Called with the lock held (or from __init__)
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass   # already gone, or open elsewhere on Windows; rediscovered on the next start
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._index), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                    'evictions': self.evictions}
+
+
+def render_variant(data, box, webp):
+    """Resize original image bytes into box (never upscaling). Returns (bytes, mimetype)."""
+    with Image.open(io.BytesIO(data)) as img:
+        if box:
+            # JPEG decoders can downscale while decoding, far cheaper than a full decode + resize
+            img.draft('RGB', box)
+            img.thumbnail(box, Image.LANCZOS)
+        else:
+            img.load()
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        buf = io.BytesIO()
+        if webp:
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+            img.save(buf, 'WEBP', quality=WEBP_QUALITY, method=4)
+            return buf.getvalue(), 'image/webp'
+        if has_alpha:
+            img.convert('RGBA').save(buf, 'PNG', optimize=True)
+            return buf.getvalue(), 'image/png'
+        img.convert('RGB').save(buf, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return buf.getvalue(), 'image/jpeg'
+
+
+class ImageProxy:
+    """Signs upstream image URLs into ids and serves cached, resized variants of them."""
+
+    def __init__(self, cache_dir, secret, max_bytes=1024 * 1024 * 1024, allowed_hosts=DEFAULT_ALLOWED_HOSTS,
+                 origin=None, timeout=10, max_original_bytes=20 * 1024 * 1024):
+        if Image is None:
+            logger.warning("Pillow is not installed: every image variant is the full-size original (no resizing, no WebP)")
+        self.cache = DiskLRU(cache_dir, max_bytes)
+        self._secret = secret.encode() if isinstance(secret, str) else secret
+        self.allowed_hosts = tuple(h.strip().lower() for h in allowed_hosts if h.strip())
+        # Fetch from here instead of the real CDN (keeps path and query), e.g. a local stub in tests
+        self.origin = origin.rstrip('/') if origin else None
+        self.timeout = timeout
+        self.max_original_bytes = max_original_bytes
+        # Striped locks: concurrent requests for one image fetch and resize it once
+        self._locks = [threading.Lock() for _ in range(64)]
+        self._failures = {}   # url hash -> retry-after timestamp
+        self._stats_lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'fetches': 0, 'fetch_bytes': 0, 'errors': 0}
+        # A home page render signs every card's URLs; the same catalog URLs come back on every render
+        self.image_id = lru_cache(maxsize=65536)(self._image_id)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._counters[name] += amount
+
+    # ---------- ids ----------
+    def is_proxyable(self, url):
+        if not url or not isinstance(url, str):
+            return False
+        if url.startswith('//'):
+            url = 'https:' + url
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.hostname or '').lower()
+        return parts.scheme in ('http', 'https') and any(host == h or host.endswith('.' + h) for h in self.allowed_hosts)
+
+    def _sign(self, raw_url):
+        return _b64(hmac.new(self._secret, raw_url, hashlib.sha256).digest()[:SIGNATURE_BYTES])
+
+    def _image_id(self, url):
+        """Id for an upstream URL, or None if it must not go through the proxy (use self.image_id)."""
+        if not self.is_proxyable(url):
+            return None
+        if url.startswith('//'):
+            url = 'https:' + url
+        raw = url.encode('utf-8')
+        return f"{_b64(raw)}.{self._sign(raw)}"
+
+    def resolve(self, image_id):
+        """Upstream URL of an id the app issued, or None for anything forged or malformed."""
+        encoded, _, signature = image_id.rpartition('.')
+        try:
+            raw = _unb64(encoded)
+        except (ValueError, TypeError):
+            return None
+        if not hmac.compare_digest(signature, self._sign(raw)):
+            return None
+        url = raw.decode('utf-8', errors='replace')
+        return url if self.is_proxyable(url) else None
+
+    # ---------- fetch + render ----------
+    def _fetch(self, url):
+        target = url
+        if self.origin:
+            parts = urllib.parse.urlsplit(url)
+            target = self.origin + parts.path + (f"?{parts.query}" if parts.query else '')
+        req = urllib.request.Request(target, headers={'User-Agent': 'GamerZ-ImageProxy/1.0'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                data = resp.read(self.max_original_bytes + 1)
+        except (urllib.error.URLError, OSError) as e:
+            raise UpstreamError(f"{url}: {e}") from e
+        if len(data) > self.max_original_bytes:
+            raise UpstreamError(f"{url}: larger than {self.max_original_bytes} bytes")
+        if sniff_type(data[:16]) is None:
+            raise UpstreamError(f"{url}: not an image")
+        self._count('fetches')
+        self._count('fetch_bytes', len(data))
+        return data
+
+    def _original(self, url, url_hash):
+        key = f"{url_hash}.orig"
+        f = self.cache.open(key)
+        if f is not None:
+            with f:
+                return f.read()
+        retry_at = self._failures.get(url_hash)
+        if retry_at and retry_at > time.time():
+            raise UpstreamError(f"{url}: recently failed")
+        try:
+            data = self._fetch(url)
+        except UpstreamError:
+            if len(self._failures) > 10000:
+                self._failures.clear()
+            self._failures[url_hash] = time.time() + FAILURE_TTL
+            raise
+        self._failures.pop(url_hash, None)
+        self.cache.put(key, data)
+        return data
+
+    def get(self, url, variant, webp=False):
+        """
+        (file, mimetype) of the variant, fetching/rendering it on a miss. file is a binary file
+        object at offset 0 that the caller closes. Raises UpstreamError if the original can't be had.
+        """
+        box = VARIANTS[variant]
+        url_hash = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        if Image is None:
+            # No resizing available: every variant is the original
+            key = f"{url_hash}.orig"
+        else:
+            key = f"{url_hash}.{variant}.{'webp' if webp else 'img'}"
+
+        f = self.cache.open(key)
+        if f is None:
+            with self._locks[int(url_hash[:4], 16) % len(self._locks)]:
+                f = self.cache.open(key)
+                if f is None:
+                    self._count('misses')
+                    data = self._original(url, url_hash)
+                    if Image is not None:
+                        try:
+                            data, _ = render_variant(data, box, webp)
+                        except Exception as e:
+                            self._count('errors')
+                            logger.warning("Could not resize %s: %s", url, e)
+                    self.cache.put(key, data)
+                    # Served from memory: the file just written may already be evicted again
+                    f = io.BytesIO(data)
+                else:
+                    self._count('hits')
+        else:
+            self._count('hits')
+
+        mimetype = sniff_type(f.read(16)) or 'application/octet-stream'
+        f.seek(0)
+        return f, mimetype
+
+    def stats(self):
+        with self._stats_lock:
+            counters = dict(self._counters)
+        counters.update(self.cache.stats())
+        counters['pillow'] = Image is not None
+        return counters
+
@@ -4,6 +4,13 @@ import re
 import pyodbc
 import os
 import random
+import threading
+import queue
+
+from catalog_cache import bump_catalog_version
+from categories import sync_categories_bulk
+from recommendations import refresh_recommendations
+from http_cache import ResponseCache, CachedSession
 
 # ---------- CONFIG ----------
 SQL_CONFIG = {
@@ -25,6 +32,86 @@ def get_conn():
     )
     return pyodbc.connect(conn_str)
 
+# Concurrent import settings (overridable through the environment)
+IMPORT_CONFIG = {
+    "CONCURRENCY": int(os.environ.get("IMPORT_CONCURRENCY", 4)),      # worker threads
+    "RATE": float(os.environ.get("IMPORT_RATE", 1.0)),                # Steam API requests per second
+    "BURST": int(os.environ.get("IMPORT_BURST", 4)),                  # token bucket capacity
+    "MAX_ATTEMPTS": int(os.environ.get("IMPORT_MAX_ATTEMPTS", 5)),    # tries per app before giving up
+    "BATCH_SIZE": int(os.environ.get("IMPORT_BATCH_SIZE", 50)),       # games written per transaction
+}
+
+PROGRESS_FILE = "import_progress.txt"
+
+# Local cache of Steam responses (appdetails JSON + cover HEAD checks)
+HTTP_CACHE_CONFIG = {
+    "ENABLED": os.environ.get("STEAM_CACHE", "1") != "0",
+    "PATH": os.environ.get("STEAM_CACHE_PATH", "steam_cache.sqlite3"),
+    "TTL": int(os.environ.get("STEAM_CACHE_TTL", 86400)),            # seconds before revalidating
+    "OFFLINE": os.environ.get("STEAM_CACHE_OFFLINE", "0") == "1",     # replay from cache, no network
+}
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15'
+]
+
+# ---------- RATE LIMITER ----------
+class TokenBucket:
+    """
+    Shared token bucket for Steam API calls with adaptive backoff.
+    A 429/403 pauses every worker and halves the rate; each success nudges it back up.
+    """
+
+    def __init__(self, rate, capacity, min_rate=0.1):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def backoff(self, pause):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.updated = time.monotonic()
+
+    def reward(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+def make_session():
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Referer': 'https://store.steampowered.com/'
+    })
+    return session
+
 # ---------- HELPERS ----------
 def clean_html(text):
     if not text:
@@ -54,12 +141,13 @@ def safe(value, default=""):
     return value if value not in (None, "") else default
 
 # ---------- CORE LOGIC ----------
-def process_game(app_id, gd, section, conn, session):
+def parse_game(app_id, gd, section, session, limiter=None):
     """
-    Process a single game's data and insert/update it in the database.
+    Turn one appdetails payload into a game record ready for write_games().
+    Network lookups (vertical cover check, DLC details) happen here, not while holding a transaction.
+    With a plain requests.Session, pass the import's TokenBucket as limiter so the DLC lookups
+    respect the shared rate (a CachedSession carries its own limiter).
     """
-    cur = conn.cursor()
-    
     # --- 1. Basic Fields ---
     title = clean_html(safe(gd.get("name"), f"Unknown Game {app_id}"))
     print(f"[+] Processing: {title}...")
@@ -74,10 +162,7 @@ def process_game(app_id, gd, section, conn, session):
         if not trailer:
             trailer = m.get("dash_h264") or m.get("hls_h264") or ""
 
-    # --- 3. Upsert Game ---
-    cur.execute("SELECT id FROM dbo.games WHERE title = ?", (title,))
-    row = cur.fetchone()
-
+    # --- 3. Price ---
     # Manual Price Overrides (for games like GTA V that don't return price)
     MANUAL_PRICES = {
         271590: 29.99
@@ -132,47 +217,36 @@ def process_game(app_id, gd, section, conn, session):
             # Steam doesn't give percentage directly, so we'll use a default rating
             # You can enhance this by fetching review data separately
             rating = 7.5  # Default for games with reviews
-    
-    if row:
-        game_id = row[0]
-        cur.execute("""
-            UPDATE dbo.games 
-            SET price=?, original_price=?, image=?, trailer=?, description=?, genre=?, section=?, release_date=?, rating=?, stock_quantity=?
-            WHERE id=?
-        """, (price, original_price, image, trailer, description, genre, section, release_date, rating, 100, game_id))
-    else:
-        cur.execute("""
-            INSERT INTO dbo.games (title, price, original_price, image, trailer, description, genre, rating, section, release_date, stock_quantity)
-            OUTPUT INSERTED.id
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (title, price, original_price, image, trailer, description, genre, rating, section, release_date, 100))
-        row = cur.fetchone()
-        if not row:
-            print(f"   [X] Failed to insert {title}")
-            return
-        game_id = row[0]
 
-    # --- 4. Refresh Related Data ---
-    cur.execute("DELETE FROM dbo.game_specs WHERE game_id = ?", (game_id,))
-    cur.execute("DELETE FROM dbo.game_dlcs WHERE game_id = ?", (game_id,))
-    cur.execute("DELETE FROM dbo.game_editions WHERE game_id = ?", (game_id,))
-    cur.execute("DELETE FROM dbo.game_screenshots WHERE game_id = ?", (game_id,))
-    
+    record = {
+        "app_id": app_id,
+        "title": title,
+        "price": price,
+        "original_price": original_price,
+        "image": image,
+        "trailer": trailer,
+        "description": description,
+        "genre": genre,
+        "rating": rating,
+        "section": section,
+        "release_date": release_date,
+        "stock_quantity": 100,
+        "specs": None,
+        "dlcs": [],
+        "editions": [],
+        "screenshots": [],
+    }
+
+    # --- 4. Related Data ---
     # Specs
     pc_reqs = gd.get("pc_requirements", {})
     if isinstance(pc_reqs, dict) and (pc_reqs.get("minimum") or pc_reqs.get("recommended")):
         min_specs = parse_specs_block(pc_reqs.get("minimum", ""))
         rec_specs = parse_specs_block(pc_reqs.get("recommended", ""))
-        cur.execute("""
-            INSERT INTO dbo.game_specs 
-            (game_id, min_os, min_cpu, min_ram, min_gpu, min_storage,
-             rec_os, rec_cpu, rec_ram, rec_gpu, rec_storage)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            game_id,
+        record["specs"] = (
             min_specs["os"], min_specs["cpu"], min_specs["ram"], min_specs["gpu"], min_specs["storage"],
             rec_specs["os"], rec_specs["cpu"], rec_specs["ram"], rec_specs["gpu"], rec_specs["storage"]
-        ))
+        )
 
     # DLCs (Fetch using session)
     if isinstance(gd.get("dlc"), list):
@@ -180,6 +254,8 @@ def process_game(app_id, gd, section, conn, session):
         if dlc_ids:
             for dlc_id in dlc_ids:
                 try:
+                    if limiter:
+                        limiter.acquire()
                     dresp = session.get(f"https://store.steampowered.com/api/appdetails?appids={dlc_id}&l=english", timeout=5)
                     dj = dresp.json()
                     if dj.get(str(dlc_id), {}).get("success"):
@@ -188,11 +264,7 @@ def process_game(app_id, gd, section, conn, session):
                         d_price = d_price_overview.get("final", 0) / 100 if d_price_overview else 0.0
                         d_orig_price = d_price_overview.get("initial", 0) / 100 if d_price_overview else 0.0
                         
-                        cur.execute("""
-                            INSERT INTO dbo.game_dlcs (game_id, title, price, original_price, description, image)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            game_id,
+                        record["dlcs"].append((
                             clean_html(safe(d.get("name"))),
                             d_price,
                             d_orig_price,
@@ -213,11 +285,7 @@ def process_game(app_id, gd, section, conn, session):
                 else:
                     sub_orig_price = sub_price
 
-                cur.execute("""
-                    INSERT INTO dbo.game_editions (game_id, title, price, original_price, description, image)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    game_id,
+                record["editions"].append((
                     clean_html(safe(sub.get("option_text"), "Edition")).split(' - $')[0],
                     sub_price,
                     round(sub_orig_price, 2),
@@ -230,81 +298,324 @@ def process_game(app_id, gd, section, conn, session):
         for ss in gd["screenshots"][:5]:
             url = ss.get("path_full")
             if url:
-                cur.execute("INSERT INTO dbo.game_screenshots (game_id, image_url) VALUES (?, ?)", (game_id, url))
+                record["screenshots"].append(url)
+
+    return record
+
+def write_games(conn, records):
+    """
+    Upsert a batch of parsed game records in one transaction.
+    Games are staged into a temp table and MERGEd by title; child rows are replaced set-wise.
+    Returns {title: game_id}.
+    """
+    if not records:
+        return {}
+
+    # Last record wins if the same title shows up twice in a batch
+    by_title = {}
+    for rec in records:
+        by_title[rec["title"]] = rec
+    records = list(by_title.values())
+
+    cur = conn.cursor()
+    cur.fast_executemany = True
+
+    # --- 1. Stage + Upsert Games ---
+    cur.execute("""
+        SET NOCOUNT ON;
+        IF OBJECT_ID('tempdb..#import_games') IS NOT NULL DROP TABLE #import_games;
+        CREATE TABLE #import_games (
+            title nvarchar(255) NOT NULL PRIMARY KEY,
+            price decimal(10, 2) NULL,
+            original_price decimal(10, 2) NULL,
+            image nvarchar(500) NULL,
+            trailer nvarchar(500) NULL,
+            description nvarchar(max) NULL,
+            genre nvarchar(255) NULL,
+            rating decimal(3, 1) NULL,
+            section nvarchar(50) NULL,
+            release_date nvarchar(50) NULL,
+            stock_quantity int NULL
+        );
+    """)
+    cur.executemany("""
+        INSERT INTO #import_games (title, price, original_price, image, trailer, description, genre, rating, section, release_date, stock_quantity)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (r["title"], r["price"], r["original_price"], r["image"], r["trailer"], r["description"],
+         r["genre"], r["rating"], r["section"], r["release_date"], r["stock_quantity"])
+        for r in records
+    ])
+    cur.execute("""
+        MERGE dbo.games WITH (HOLDLOCK) AS t
+        USING #import_games AS s ON t.title = s.title
+        WHEN MATCHED THEN
+            UPDATE SET price=s.price, original_price=s.original_price, image=s.image, trailer=s.trailer,
+                       description=s.description, genre=s.genre, section=s.section, release_date=s.release_date,
+                       rating=s.rating, stock_quantity=s.stock_quantity
+        WHEN NOT MATCHED THEN
+            INSERT (title, price, original_price, image, trailer, description, genre, rating, section, release_date, stock_quantity)
+            VALUES (s.title, s.price, s.original_price, s.image, s.trailer, s.description, s.genre, s.rating, s.section, s.release_date, s.stock_quantity)
+        OUTPUT inserted.id, inserted.title;
+    """)
+    game_ids = {}
+    for game_id, title in sorted(cur.fetchall()):
+        game_ids.setdefault(title, game_id)
+
+    # Curated shelves/genre lookups are evaluated here, once per write
+    sync_categories_bulk(cur, [(game_ids[r["title"]], r["title"], r["genre"]) for r in records if r["title"] in game_ids])
+
+    # --- 2. Replace Related Data ---
+    cur.execute("""
+        SET NOCOUNT ON;
+        DELETE FROM dbo.game_specs WHERE game_id IN (SELECT g.id FROM dbo.games g JOIN #import_games s ON g.title = s.title);
+        DELETE FROM dbo.game_dlcs WHERE game_id IN (SELECT g.id FROM dbo.games g JOIN #import_games s ON g.title = s.title);
+        DELETE FROM dbo.game_editions WHERE game_id IN (SELECT g.id FROM dbo.games g JOIN #import_games s ON g.title = s.title);
+        DELETE FROM dbo.game_screenshots WHERE game_id IN (SELECT g.id FROM dbo.games g JOIN #import_games s ON g.title = s.title);
+    """)
+
+    spec_rows, dlc_rows, edition_rows, shot_rows = [], [], [], []
+    for r in records:
+        game_id = game_ids.get(r["title"])
+        if game_id is None:
+            print(f"   [X] Failed to upsert {r['title']}")
+            continue
+        if r["specs"]:
+            spec_rows.append((game_id,) + tuple(r["specs"]))
+        dlc_rows.extend((game_id,) + tuple(d) for d in r["dlcs"])
+        edition_rows.extend((game_id,) + tuple(e) for e in r["editions"])
+        shot_rows.extend((game_id, url) for url in r["screenshots"])
+
+    if spec_rows:
+        cur.executemany("""
+            INSERT INTO dbo.game_specs 
+            (game_id, min_os, min_cpu, min_ram, min_gpu, min_storage,
+             rec_os, rec_cpu, rec_ram, rec_gpu, rec_storage)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, spec_rows)
+    if dlc_rows:
+        cur.executemany("""
+            INSERT INTO dbo.game_dlcs (game_id, title, price, original_price, description, image)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, dlc_rows)
+    if edition_rows:
+        cur.executemany("""
+            INSERT INTO dbo.game_editions (game_id, title, price, original_price, description, image)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, edition_rows)
+    if shot_rows:
+        cur.executemany("INSERT INTO dbo.game_screenshots (game_id, image_url) VALUES (?, ?)", shot_rows)
+
+    # Denormalized landscape image used by the storefront cards (first edition header)
+    cur.execute("""
+        SET NOCOUNT ON;
+        UPDATE g
+        SET landscape_image = (SELECT TOP 1 e.image FROM dbo.game_editions e WHERE e.game_id = g.id ORDER BY e.id)
+        FROM dbo.games g
+        JOIN #import_games s ON g.title = s.title;
+        DROP TABLE #import_games;
+    """)
 
     conn.commit()
+    # Tell the running store that its cached shelves are stale
+    bump_catalog_version()
+    return game_ids
+
+def process_game(app_id, gd, section, conn, session, limiter=None):
+    """
+    Process a single game's data and insert/update it in the database.
+    """
+    return write_games(conn, [parse_game(app_id, gd, section, session, limiter)])
 
-def import_batch(games_map):
+def import_batch(games_map, concurrency=None, rate=None, batch_size=None):
+    """
+    Import every app in games_map ({app_id: section}) with a bounded pool of workers.
+    Rate-limited apps are re-queued (up to MAX_ATTEMPTS) instead of being skipped.
+    Workers only fetch and parse; parsed games are staged and written batch_size at a time.
+    """
     app_ids = list(games_map.keys())
-    ids_str = ",".join(str(x) for x in app_ids)
-    
-    print(f"Fetching batch: {ids_str} ...")
-    
-    try:
-        # 1. Open Session and DB Connection
-        USER_AGENTS = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15'
-        ]
-
-        with requests.Session() as session:
-            session.headers.update({
-                'User-Agent': random.choice(USER_AGENTS),
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Referer': 'https://store.steampowered.com/'
-            })
-            conn = get_conn()
-            
-            # 2. Process each game sequentially
-            for app_id in app_ids:
-                print(f"Fetching {app_id} ...")
+    concurrency = max(1, concurrency or IMPORT_CONFIG["CONCURRENCY"])
+    limiter = TokenBucket(rate or IMPORT_CONFIG["RATE"], IMPORT_CONFIG["BURST"])
+    max_attempts = IMPORT_CONFIG["MAX_ATTEMPTS"]
+    batch_size = max(1, batch_size or IMPORT_CONFIG["BATCH_SIZE"])
+
+    print(f"Importing {len(app_ids)} games with {concurrency} workers at {limiter.rate:.2f} req/s, {batch_size} per write batch ...")
+
+    offline = HTTP_CACHE_CONFIG["OFFLINE"]
+    cache = ResponseCache(HTTP_CACHE_CONFIG["PATH"]) if HTTP_CACHE_CONFIG["ENABLED"] or offline else None
+    if offline:
+        print(f"[!] Offline mode: replaying responses from {HTTP_CACHE_CONFIG['PATH']}")
+    cache_counts = {"hits": 0, "misses": 0}
+
+    jobs = queue.Queue()
+    for app_id in app_ids:
+        jobs.put((app_id, 1))
+
+    stats = {"imported": 0, "failed": 0, "rate_limited": 0, "requeued": 0, "batches": 0}
+    stats_lock = threading.Lock()
+
+    def count(key, n=1):
+        with stats_lock:
+            stats[key] += n
+
+    # Parsed games wait here until a full batch can be written in one transaction
+    staged = []
+    stage_lock = threading.Lock()
+    write_lock = threading.Lock()
+    writer_conn = None
+
+    def flush(batch):
+        if not batch:
+            return
+        with write_lock:
+            try:
+                write_games(writer_conn, batch)
+            except Exception as e:
+                try:
+                    writer_conn.rollback()
+                except Exception:
+                    pass
+                if len(batch) == 1:
+                    print(f"[X] Error writing {batch[0]['app_id']}: {e}")
+                    count("failed")
+                    return
+                # Don't let one bad row sink the whole batch
+                print(f"[X] Batch write failed ({e}). Retrying {len(batch)} games one at a time...")
+                fallback = True
+            else:
+                fallback = False
+                count("batches")
+                count("imported", len(batch))
+                # Log success only once the batch is committed
+                with open(PROGRESS_FILE, "a") as f:
+                    f.writelines(f"{rec['app_id']}\n" for rec in batch)
+        if fallback:
+            for rec in batch:
+                flush([rec])
+
+    def stage(record):
+        with stage_lock:
+            staged.append(record)
+            if len(staged) < batch_size:
+                return
+            batch = staged[:]
+            staged.clear()
+        flush(batch)
+
+    def retry_later(app_id, attempt, reason):
+        if attempt < max_attempts:
+            count("requeued")
+            jobs.put((app_id, attempt + 1))
+        else:
+            print(f"[X] Giving up on {app_id} after {attempt} attempts ({reason})")
+            count("failed")
+
+    def worker():
+        # Each worker owns its HTTP session (not safe to share between threads).
+        # The cached session only spends rate-limit tokens on real Steam API requests.
+        session = CachedSession(make_session(), cache, ttl=HTTP_CACHE_CONFIG["TTL"], offline=offline, limiter=limiter)
+        try:
+            while True:
+                job = jobs.get()
+                if job is None:
+                    jobs.task_done()
+                    return
+                app_id, attempt = job
                 try:
+                    print(f"Fetching {app_id} (attempt {attempt}) ...")
                     # Added cc=us to force USD currency
                     resp = session.get(f"https://store.steampowered.com/api/appdetails?appids={app_id}&l=english&cc=us", timeout=15)
-                    
-                    if resp.status_code == 429:
-                        print(f"[!] Rate limited (429). Pausing for 10 seconds...")
-                        time.sleep(10)
+
+                    if resp.status_code in (429, 403):
+                        count("rate_limited")
+                        # Exponential pause for 429s; a 403 usually means a longer temporary block
+                        pause = 60 if resp.status_code == 403 else min(120, 10 * 2 ** (attempt - 1))
+                        print(f"[!] HTTP {resp.status_code} for {app_id}. Pausing all workers for {pause} seconds and re-queueing...")
+                        limiter.backoff(pause)
+                        retry_later(app_id, attempt, f"HTTP {resp.status_code}")
                         continue
-                    
-                    if resp.status_code == 403:
-                        print(f"[!] Access Denied (403). You might be temporarily blocked. Pausing for 60 seconds...")
-                        time.sleep(60)
+
+                    if offline and resp.status_code == 504:
+                        print(f"[X] {app_id} is not in the response cache")
+                        count("failed")
                         continue
 
                     if resp.status_code != 200:
                         print(f"[X] HTTP Error {resp.status_code} for {app_id}")
-                        time.sleep(3) # Wait a bit even on other errors
+                        retry_later(app_id, attempt, f"HTTP {resp.status_code}")
                         continue
-                        
-                    data = resp.json()
-                    if not data or not data.get(str(app_id), {}).get("success"):
+
+                    data = resp.json() if resp.content.strip() else None
+                    if not data:
+                        # Steam's other rate-limit answer: 200 with a null/empty body (never cached)
+                        count("rate_limited")
+                        pause = min(120, 10 * 2 ** (attempt - 1))
+                        print(f"[!] Empty response for {app_id}. Pausing all workers for {pause} seconds and re-queueing...")
+                        limiter.backoff(pause)
+                        retry_later(app_id, attempt, "empty response")
+                        continue
+
+                    if not data.get(str(app_id), {}).get("success"):
                         print(f"[X] Failed to fetch data for {app_id}")
-                        time.sleep(3)
+                        count("failed")
                         continue
-                        
+
+                    limiter.reward()
                     section = games_map.get(app_id, "trending")
-                    process_game(app_id, data[str(app_id)]["data"], section, conn, session)
-                    
-                    # Log success
-                    with open("import_progress.txt", "a") as f:
-                        f.write(f"{app_id}\n")
-
-                    # Increased delay to 3 seconds to be very safe
-                    time.sleep(3) 
-                    
+                    stage(parse_game(app_id, data[str(app_id)]["data"], section, session))
+
                 except Exception as e:
                     print(f"[X] Error processing {app_id}: {e}")
-            
-            conn.close()
-            print("Import completed.")
-            
+                    count("failed")
+                finally:
+                    jobs.task_done()
+        finally:
+            with stats_lock:
+                cache_counts["hits"] += session.hits
+                cache_counts["misses"] += session.misses
+            session.close()
+
+    started = time.time()
+    try:
+        # Open the writer connection up front so a DB problem fails fast instead of after fetching
+        writer_conn = get_conn()
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for t in workers:
+            t.start()
+        jobs.join()
+        for _ in workers:
+            jobs.put(None)
+        for t in workers:
+            t.join()
+
+        # Write whatever is left over from the last partial batch
+        flush(staged[:])
+        staged.clear()
+
+        # Rebuild "Recommended Games" against the updated catalog
+        if stats["imported"]:
+            try:
+                written = refresh_recommendations(writer_conn)
+                bump_catalog_version()
+                print(f"Recommendations refreshed ({written} rows).")
+            except Exception as e:
+                print(f"[X] Recommendation refresh failed: {e}")
+
+        writer_conn.close()
+        print("Import completed.")
     except Exception as e:
         print(f"[X] Batch Error: {e}")
+    finally:
+        if cache:
+            cache.close()
+
+    # Throughput summary
+    elapsed = time.time() - started
+    per_min = stats["imported"] / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Imported: {stats['imported']} in {stats['batches']} write batches | Failed: {stats['failed']} | Rate limited: {stats['rate_limited']} | Re-queued: {stats['requeued']}")
+    print(f"Elapsed: {elapsed:.1f}s | Throughput: {per_min:.1f} games/min | Final rate: {limiter.rate:.2f} req/s")
+    print(f"HTTP cache: {cache_counts['hits']} hits | {cache_counts['misses']} network requests")
+    return stats
 
 # ---------- RUN ----------
 if __name__ == "__main__":
@@ -365,9 +676,10 @@ if __name__ == "__main__":
     
     print(f"Loaded {len(custom_ids)} games from file. Total games to process: {len(DEFAULTS)}")
     
-    # Filter out already processed games
-    PROGRESS_FILE = "import_progress.txt"
-    if os.path.exists(PROGRESS_FILE):
+    # Filter out already processed games (an offline replay re-parses everything)
+    if HTTP_CACHE_CONFIG["OFFLINE"]:
+        processed_ids = set()
+    elif os.path.exists(PROGRESS_FILE):
         with open(PROGRESS_FILE, 'r') as f:
             processed_ids = set(int(line.strip()) for line in f if line.strip().isdigit())
         print(f"Found {len(processed_ids)} already imported games. Skipping them.")
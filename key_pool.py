@@ -0,0 +1,111 @@
+# key_pool.py
+# Pool of pre-generated product keys. Checkout claims keys from dbo.product_keys inside its
+# own transaction; a background refill tops up every game that dropped below the low watermark.
+import secrets
+import string
+import threading
+
+KEY_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def generate_product_key():
+    """Cryptographically random key in the XXXX-XXXX-XXXX-XXXX format."""
+    return "-".join(''.join(secrets.choice(KEY_ALPHABET) for _ in range(4)) for _ in range(4))
+
+
+def pool_depths(cur):
+    """{game_id: unclaimed keys} for every sellable game (games with no keys report 0)."""
+    cur.execute("""
+        SELECT g.id, COUNT(k.id)
+        FROM dbo.games g
+        LEFT JOIN dbo.product_keys k ON k.game_id = g.id
+        WHERE g.stock_quantity IS NULL OR g.stock_quantity > 0
+        GROUP BY g.id
+    """)
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def refill(conn, low_watermark=5, target=20, chunk_size=1000):
+    """
+    Top up every game whose pool is below low_watermark back to target keys (commits).
+    Keys that collide with the pool are dropped by the IGNORE_DUP_KEY index, keys that collide
+    with sold orders are filtered out. Returns the number of keys added.
+    """
+    cur = conn.cursor()
+    depths = pool_depths(cur)
+    rows = [(game_id, generate_product_key())
+            for game_id, depth in depths.items() if depth < low_watermark
+            for _ in range(target - depth)]
+    if not rows:
+        return 0
+
+    cur.execute("CREATE TABLE #new_keys (game_id INT NOT NULL, [key] NVARCHAR(100) NOT NULL)")
+    cur.fast_executemany = True
+    added = 0
+    try:
+        for i in range(0, len(rows), chunk_size):
+            cur.executemany("INSERT INTO #new_keys (game_id, [key]) VALUES (?, ?)", rows[i:i + chunk_size])
+        cur.execute("""
+            SET NOCOUNT ON;
+            INSERT INTO dbo.product_keys (game_id, [key])
+            SELECT n.game_id, n.[key]
+            FROM #new_keys n
+            WHERE NOT EXISTS (SELECT 1 FROM dbo.orders o WHERE o.[key] = n.[key]);
+            SELECT @@ROWCOUNT;
+        """)
+        added = cur.fetchone()[0]
+    finally:
+        cur.execute("DROP TABLE #new_keys")
+    conn.commit()
+    return added
+
+
+class KeyPoolMetrics:
+    """Counters for /admin/key_pool; shared by checkout and the refill thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.claimed = 0        # keys served from the pool
+        self.fallbacks = 0      # keys generated inline because a game's pool was empty
+        self.generated = 0      # keys added by refills
+        self.refills = 0
+        self.last_refill_error = None
+
+    def record_checkout(self, claimed, fallbacks):
+        with self._lock:
+            self.claimed += claimed
+            self.fallbacks += fallbacks
+
+    def record_refill(self, added=0, error=None):
+        with self._lock:
+            self.refills += 1
+            self.generated += added
+            self.last_refill_error = str(error) if error else None
+
+    def stats(self, depths=None):
+        with self._lock:
+            stats = {
+                'claimed': self.claimed,
+                'fallbacks': self.fallbacks,
+                'generated': self.generated,
+                'refills': self.refills,
+                'last_refill_error': self.last_refill_error,
+            }
+        if depths is not None:
+            stats.update({
+                'games': len(depths),
+                'keys_in_pool': sum(depths.values()),
+                'min_depth': min(depths.values(), default=0),
+                'empty_games': sum(1 for d in depths.values() if d == 0),
+            })
+        return stats
+
+
+if __name__ == "__main__":
+    # Fill the pool for every game: python key_pool.py
+    from import_steam import get_conn
+
+    conn = get_conn()
+    added = refill(conn)
+    conn.close()
+    print(f"Added {added} product keys to the pool.")
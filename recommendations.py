@@ -0,0 +1,302 @@
+# recommendations.py
+# Offline "Recommended Games" engine. Related games are scored once per catalog change
+# and stored in dbo.game_recommendations, so the detail page only does a keyed lookup.
+from collections import defaultdict
+
+from categories import NON_BASE_GENRES, split_genres
+from search_index import trigrams
+
+TOP_N = 5
+# Highest-rated games kept per genre as candidates (keeps a rebuild near O(n) on big catalogs)
+GENRE_CANDIDATES = 50
+
+# Score weights: a series match always outranks genre/rating, as on the old detail page
+SERIES_WEIGHT = 100.0
+MAIN_GENRE_WEIGHT = 5.0
+GENRE_OVERLAP_WEIGHT = 10.0
+RATING_WEIGHT = 0.5
+CO_PURCHASE_WEIGHT = 2.0
+CO_PURCHASE_CAP = 10
+
+
+def series_key(title):
+    """First 2 words of a title (or the whole title if short), e.g. 'call of' for 'Call of Duty'."""
+    parts = (title or '').lower().split()
+    return " ".join(parts[:2])
+
+
+def _rating(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RecommendationIndex:
+    """Candidate indexes over the catalog; scores any game against any other."""
+
+    def __init__(self, games, co_purchases=None):
+        self.games = [g for g in games if g.get('title')]
+        base_games = [g for g in self.games if (g.get('genre') or '') not in NON_BASE_GENRES]
+
+        self.genres_of = {g['id']: {x.lower() for x in split_genres(g.get('genre'))} for g in self.games}
+        self.titles = {g['id']: g['title'].lower() for g in self.games}
+        self.by_id = {g['id']: g for g in base_games}
+
+        # Candidate indexes: title trigrams (for series matches), top rated games per genre, co-purchases
+        self.base_games = base_games
+        self.by_trigram = defaultdict(list)
+        self.by_genre = defaultdict(list)
+        self._series_matches = {}
+        for g in base_games:
+            for gram in trigrams(self.titles[g['id']], pad=False):
+                self.by_trigram[gram].append(g)
+            for genre in self.genres_of[g['id']]:
+                self.by_genre[genre].append(g)
+        # Full per-genre ranking kept aside so an incremental refresh can see who got pushed out
+        self.genre_ranking = {}
+        for genre, bucket in self.by_genre.items():
+            bucket.sort(key=lambda x: _rating(x.get('rating')), reverse=True)
+            self.genre_ranking[genre] = bucket[:]
+            del bucket[GENRE_CANDIDATES:]
+        self.genre_top = {genre: {g['id'] for g in bucket} for genre, bucket in self.by_genre.items()}
+
+        self.bought_with = defaultdict(dict)
+        for (game_id, other_id), count in (co_purchases or {}).items():
+            self.bought_with[game_id][other_id] = count
+
+    def series_matches(self, series):
+        """Base games whose title contains series anywhere, like the old detail page's LIKE '%series%'."""
+        matches = self._series_matches.get(series)
+        if matches is None:
+            grams = trigrams(series, pad=False)
+            if grams:
+                # Every match contains all of the key's trigrams; scan the shortest posting list
+                pool = min((self.by_trigram.get(gram, []) for gram in grams), key=len)
+            else:
+                pool = self.base_games   # keys under 3 characters
+            matches = self._series_matches[series] = [g for g in pool if series in self.titles[g['id']]]
+        return matches
+
+    def candidates(self, game):
+        series = series_key(game['title'])
+        candidates = {}
+        for g in self.series_matches(series) if series else []:
+            candidates[g['id']] = g
+        for genre in self.genres_of[game['id']]:
+            for g in self.by_genre.get(genre, []):
+                candidates[g['id']] = g
+        for other_id in self.bought_with.get(game['id'], {}):
+            if other_id in self.by_id:
+                candidates[other_id] = self.by_id[other_id]
+        candidates.pop(game['id'], None)
+        return candidates
+
+    def is_candidate(self, game, cand):
+        """Whether cand would be among game's candidates (same rules as candidates())."""
+        if cand['id'] == game['id'] or cand['id'] not in self.by_id or not game.get('genre'):
+            return False
+        series = series_key(game['title'])
+        if series and series in self.titles[cand['id']]:
+            return True
+        if any(cand['id'] in self.genre_top.get(genre, ()) for genre in self.genres_of[game['id']]):
+            return True
+        return cand['id'] in self.bought_with.get(game['id'], {})
+
+    def profile(self, game):
+        """(series key, genre set, main genre) of game, shared by all of its candidates' scores."""
+        my_genres = self.genres_of[game['id']]
+        main_genre = split_genres(game['genre'])[0].lower() if my_genres else ''
+        return series_key(game['title']), my_genres, main_genre
+
+    def score(self, game, cand, profile=None):
+        series, my_genres, main_genre = profile or self.profile(game)
+        cand_genres = self.genres_of[cand['id']]
+        score = 0.0
+        if series and series in self.titles[cand['id']]:
+            score += SERIES_WEIGHT
+        if main_genre and main_genre in cand_genres:
+            score += MAIN_GENRE_WEIGHT
+        union = my_genres | cand_genres
+        if union:
+            score += GENRE_OVERLAP_WEIGHT * len(my_genres & cand_genres) / len(union)
+        score += RATING_WEIGHT * _rating(cand.get('rating'))
+        score += CO_PURCHASE_WEIGHT * min(self.bought_with.get(game['id'], {}).get(cand['id'], 0), CO_PURCHASE_CAP)
+        return score
+
+    def recommend(self, game, top_n=TOP_N):
+        if not game.get('genre'):
+            return []
+        profile = self.profile(game)
+        scored = [(self.score(game, cand, profile), cand_id) for cand_id, cand in self.candidates(game).items()]
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [(cand_id, round(score, 3)) for score, cand_id in scored[:top_n]]
+
+
+def compute_recommendations(games, co_purchases=None, top_n=TOP_N, game_ids=None):
+    """
+    Score related games for every game in the catalog (or only for game_ids).
+
+    games: iterable of dicts with id, title, genre, rating.
+    co_purchases: optional {(game_id, other_id): buyer_count}.
+    Returns {game_id: [(recommended_id, score), ...]} best first.
+    """
+    index = RecommendationIndex(games, co_purchases)
+    targets = index.games if game_ids is None else [g for g in index.games if g['id'] in game_ids]
+    return {game['id']: index.recommend(game, top_n) for game in targets}
+
+
+def inputs_changed(old, new):
+    """Whether an edit touched anything the scores depend on (title, genre, rating)."""
+    return ((old.get('title') or '') != (new.get('title') or '')
+            or (old.get('genre') or '') != (new.get('genre') or '')
+            or _rating(old.get('rating')) != _rating(new.get('rating')))
+
+
+def _chunks(ids, size=1000):
+    # SQL Server takes at most 2100 parameters per statement
+    ids = sorted(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def load_co_purchases(cur, game_ids=None):
+    """Count distinct buyers for every pair of games bought by the same user (first game in game_ids, if given)."""
+    sql = """
+        SELECT a.game_id, b.game_id, COUNT(DISTINCT a.user_id)
+        FROM dbo.orders a
+        JOIN dbo.orders b ON a.user_id = b.user_id AND a.game_id <> b.game_id
+        {where}
+        GROUP BY a.game_id, b.game_id
+    """
+    if game_ids is None:
+        cur.execute(sql.format(where=""))
+        return {(row[0], row[1]): row[2] for row in cur.fetchall()}
+    pairs = {}
+    for chunk in _chunks(game_ids):
+        cur.execute(sql.format(where=f"WHERE a.game_id IN ({', '.join('?' * len(chunk))})"), chunk)
+        pairs.update({(row[0], row[1]): row[2] for row in cur.fetchall()})
+    return pairs
+
+
+def _listers(cur, game_ids):
+    """Games whose stored list recommends any of game_ids."""
+    found = set()
+    for chunk in _chunks(game_ids):
+        cur.execute(
+            f"SELECT DISTINCT game_id FROM dbo.game_recommendations WHERE recommended_id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        found.update(row[0] for row in cur.fetchall())
+    return found
+
+
+def affected_games(cur, games, changed_ids, top_n=TOP_N, previous=None):
+    """
+    Games whose recommendation list can differ after changed_ids were added, edited or deleted:
+    the changed games themselves, games listing one of them, games a changed game (or a game
+    that moved into a genre's candidate pool because of it) now scores into, and games listing
+    a game that moved out of a pool. Everything else keeps its stored list.
+
+    previous: {game_id: row before the change} for every changed game that existed before
+    (new games have no entry). It limits the pool checks to the genres involved; without it
+    every genre's pool is checked.
+    """
+    changed = set(changed_ids)
+    # Co-purchase counts are symmetric, so pairs starting at a changed game give bought_with for the others
+    co_purchases = {(other_id, game_id): count
+                    for (game_id, other_id), count in load_co_purchases(cur, changed).items()}
+    index = RecommendationIndex(games, co_purchases)
+
+    # Without the old rows we can't tell which pool boundaries moved; with k changed games at most
+    # k games crossed each cutoff, so the k on either side of it are treated as changed too
+    k = len(changed)
+    if previous is None:
+        genres = set(index.genre_ranking)
+    else:
+        genres = {genre for game_id in changed for genre in index.genres_of.get(game_id, ())}
+        genres.update(genre.lower() for row in previous.values() for genre in split_genres(row.get('genre')))
+    entrants = {}
+    pushed_out = set()
+    for genre in genres:
+        ranking = index.genre_ranking.get(genre, [])
+        if len(ranking) > GENRE_CANDIDATES:
+            entrants[genre] = ranking[max(0, GENRE_CANDIDATES - k):GENRE_CANDIDATES]
+            pushed_out.update(g['id'] for g in ranking[GENRE_CANDIDATES:GENRE_CANDIDATES + k])
+
+    affected = {game_id for game_id in changed if game_id in index.genres_of}
+    affected |= _listers(cur, changed | pushed_out)
+
+    # Last-ranked stored row per game: a new candidate that would sort ahead of it (or fills a
+    # short list) gets in. Distinct scores differ by far more than the stored 3 decimals, so
+    # comparing rounded scores and then ids follows the same order as recommend().
+    cur.execute("""
+        SELECT r.game_id, r.rank, r.recommended_id, r.score
+        FROM dbo.game_recommendations r
+        JOIN (SELECT game_id, MAX(rank) AS last_rank FROM dbo.game_recommendations GROUP BY game_id) m
+          ON m.game_id = r.game_id AND m.last_rank = r.rank
+    """)
+    last_rows = {row[0]: (row[1], -float(row[3] or 0), row[2]) for row in cur.fetchall()}
+    changed_games = [index.by_id[game_id] for game_id in changed if game_id in index.by_id]
+    for game in index.games:
+        if game['id'] in affected or not game.get('genre'):
+            continue
+        count, *last = last_rows.get(game['id'], (0, 0.0, 0))
+        new_candidates = changed_games + [g for genre in index.genres_of[game['id']] for g in entrants.get(genre, ())]
+        for cand in new_candidates:
+            if not index.is_candidate(game, cand):
+                continue
+            if count < top_n or (-round(index.score(game, cand), 3), cand['id']) < tuple(last):
+                affected.add(game['id'])
+                break
+    return affected
+
+
+def refresh_recommendations(conn, top_n=TOP_N, changed_ids=None, extra_ids=(), previous=None):
+    """
+    Rebuild dbo.game_recommendations in one transaction. Returns the number of rows written.
+
+    With changed_ids (games added, edited or deleted since the last refresh) only the rows of
+    affected_games() are recomputed; extra_ids are recomputed regardless (e.g. games that listed
+    a deleted game whose rows had to be removed first). Without it the whole table is rebuilt.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT id, title, genre, rating FROM dbo.games")
+    cols = [col[0] for col in cur.description]
+    games = [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    if changed_ids is None:
+        recs = compute_recommendations(games, load_co_purchases(cur), top_n)
+        cur.execute("DELETE FROM dbo.game_recommendations")
+    else:
+        existing = {g['id'] for g in games}
+        targets = (affected_games(cur, games, changed_ids, top_n, previous) | set(extra_ids)) & existing
+        if not targets:
+            conn.commit()
+            return 0
+        recs = compute_recommendations(games, load_co_purchases(cur, targets), top_n, game_ids=targets)
+        for chunk in _chunks(targets):
+            cur.execute(f"DELETE FROM dbo.game_recommendations WHERE game_id IN ({', '.join('?' * len(chunk))})", chunk)
+
+    rows = [(game_id, rec_id, rank, score)
+            for game_id, items in recs.items()
+            for rank, (rec_id, score) in enumerate(items, start=1)]
+    if rows:
+        cur.fast_executemany = True
+        cur.executemany(
+            "INSERT INTO dbo.game_recommendations (game_id, recommended_id, rank, score) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+    conn.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from import_steam import get_conn
+    from catalog_cache import bump_catalog_version
+
+    conn = get_conn()
+    written = refresh_recommendations(conn)
+    conn.close()
+    bump_catalog_version()
+    print(f"Stored {written} recommendations.")
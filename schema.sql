@@ -36,7 +36,8 @@ BEGIN
         [rating] [decimal](3, 1) NULL,
         [stock_quantity] [int] DEFAULT 0,
         [section] [nvarchar](50) NULL,
-        [release_date] [nvarchar](50) NULL
+        [release_date] [nvarchar](50) NULL,
+        [landscape_image] [nvarchar](500) NULL
     );
 END
 GO
@@ -120,3 +121,94 @@ BEGIN
     );
 END
 GO
+
+-- Game Genres Table (one row per genre in games.genre, maintained by categories.sync_game_categories)
+IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[game_genres]') AND type in (N'U'))
+BEGIN
+    CREATE TABLE [dbo].[game_genres](
+        [game_id] [int] NOT NULL,
+        [genre] [nvarchar](100) NOT NULL,
+        PRIMARY KEY ([genre], [game_id]),
+        FOREIGN KEY([game_id]) REFERENCES [dbo].[games] ([id]) ON DELETE CASCADE
+    );
+    CREATE INDEX [IX_game_genres_game_id] ON [dbo].[game_genres] ([game_id]);
+END
+GO
+
+-- Game Categories Table (curated shelves such as 'Survival Horror' and 'Open World')
+IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[game_categories]') AND type in (N'U'))
+BEGIN
+    CREATE TABLE [dbo].[game_categories](
+        [game_id] [int] NOT NULL,
+        [category] [nvarchar](50) NOT NULL,
+        PRIMARY KEY ([category], [game_id]),
+        FOREIGN KEY([game_id]) REFERENCES [dbo].[games] ([id]) ON DELETE CASCADE
+    );
+    CREATE INDEX [IX_game_categories_game_id] ON [dbo].[game_categories] ([game_id]);
+END
+GO
+
+-- Shelf lookups filter on genre and sort by title
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_games_genre_title' AND object_id = OBJECT_ID(N'[dbo].[games]'))
+BEGIN
+    CREATE INDEX [IX_games_genre_title] ON [dbo].[games] ([genre], [title]);
+END
+GO
+
+-- Denormalized card image (first edition header), maintained by import_steam.py
+IF COL_LENGTH('dbo.games', 'landscape_image') IS NULL
+BEGIN
+    ALTER TABLE [dbo].[games] ADD [landscape_image] [nvarchar](500) NULL;
+END
+GO
+
+UPDATE g
+SET landscape_image = (SELECT TOP 1 e.image FROM dbo.game_editions e WHERE e.game_id = g.id ORDER BY e.id)
+FROM dbo.games g
+WHERE g.landscape_image IS NULL;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_game_editions_game_id' AND object_id = OBJECT_ID(N'[dbo].[game_editions]'))
+BEGIN
+    CREATE INDEX [IX_game_editions_game_id] ON [dbo].[game_editions] ([game_id], [id]) INCLUDE ([image]);
+END
+GO
+
+-- Precomputed "Recommended Games" (rebuilt by recommendations.py after catalog changes)
+IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[game_recommendations]') AND type in (N'U'))
+BEGIN
+    CREATE TABLE [dbo].[game_recommendations](
+        [game_id] [int] NOT NULL,
+        [rank] [int] NOT NULL,
+        [recommended_id] [int] NOT NULL,
+        [score] [decimal](9, 3) NULL,
+        PRIMARY KEY ([game_id], [rank]),
+        FOREIGN KEY([game_id]) REFERENCES [dbo].[games] ([id]) ON DELETE CASCADE,
+        FOREIGN KEY([recommended_id]) REFERENCES [dbo].[games] ([id])
+    );
+    CREATE INDEX [IX_game_recommendations_recommended_id] ON [dbo].[game_recommendations] ([recommended_id]);
+END
+GO
+
+-- Pre-generated product keys, claimed by checkout and refilled in the background (key_pool.py)
+IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[product_keys]') AND type in (N'U'))
+BEGIN
+    CREATE TABLE [dbo].[product_keys](
+        [id] [int] IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        [game_id] [int] NOT NULL,
+        [key] [nvarchar](100) NOT NULL,
+        [created_at] [datetime] DEFAULT GETDATE(),
+        FOREIGN KEY([game_id]) REFERENCES [dbo].[games] ([id]) ON DELETE CASCADE
+    );
+    -- A generated key that collides with a pooled one is silently dropped instead of failing the batch
+    CREATE UNIQUE INDEX [UX_product_keys_key] ON [dbo].[product_keys] ([key]) WITH (IGNORE_DUP_KEY = ON);
+    CREATE INDEX [IX_product_keys_game_id] ON [dbo].[product_keys] ([game_id], [id]);
+END
+GO
+
+-- Keys are unique across everything ever sold (fails if legacy orders already contain duplicates; fix those first)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'UX_orders_key' AND object_id = OBJECT_ID(N'[dbo].[orders]'))
+BEGIN
+    CREATE UNIQUE INDEX [UX_orders_key] ON [dbo].[orders] ([key]);
+END
+GO
@@ -0,0 +1,147 @@
+# search_index.py
+# In-memory title search for the header search box: word-prefix lookups plus a
+# trigram index for substring and typo-tolerant matches, ranked by match quality then rating.
+import bisect
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+MIN_FUZZY_SCORE = 0.35
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def trigrams(text, pad=True):
+    """Set of 3-character slices of text (padded with a space at each end by default)."""
+    if pad:
+        text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _rating(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def dice(a, b):
+    """Dice similarity of two trigram sets, 0.0 to 1.0."""
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+class SearchIndex:
+    """Thread-safe title index. Documents are dicts with at least id and title."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}                    # id -> (doc, normalized title, words, trigrams)
+        self._grams = defaultdict(set)     # trigram -> ids
+        self._words = []                   # sorted (word, id) pairs for prefix lookups
+        self.version = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, docs, version=None):
+        with self._lock:
+            self._docs.clear()
+            self._grams.clear()
+            self._words = []
+            for doc in docs:
+                self._add(doc)
+            self._words.sort()
+            self.version = version
+
+    def _add(self, doc, keep_sorted=False):
+        norm = normalize(doc.get('title'))
+        words = norm.split()
+        grams = trigrams(norm)
+        self._docs[doc['id']] = (doc, norm, words, grams)
+        for gram in grams:
+            self._grams[gram].add(doc['id'])
+        for word in set(words):
+            if keep_sorted:
+                bisect.insort(self._words, (word, doc['id']))
+            else:
+                self._words.append((word, doc['id']))
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        _, _, words, grams = entry
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._grams[gram]
+        for word in set(words):
+            i = bisect.bisect_left(self._words, (word, doc_id))
+            if i < len(self._words) and self._words[i] == (word, doc_id):
+                del self._words[i]
+
+    def upsert(self, doc):
+        """Add or replace one document without rebuilding the whole index."""
+        with self._lock:
+            self._remove(doc['id'])
+            self._add(doc, keep_sorted=True)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _prefix_ids(self, prefix):
+        i = bisect.bisect_left(self._words, (prefix,))
+        ids = set()
+        while i < len(self._words) and self._words[i][0].startswith(prefix):
+            ids.add(self._words[i][1])
+            i += 1
+        return ids
+
+    def search(self, query, limit=8):
+        """Return up to limit documents, best match first."""
+        q = normalize(query)
+        if not q:
+            return []
+        q_words = q.split()
+        q_word_grams = [trigrams(w) for w in q_words]
+
+        with self._lock:
+            candidates = set()
+            for word in q_words:
+                candidates |= self._prefix_ids(word)
+            for gram in trigrams(q, pad=False):
+                candidates |= self._grams.get(gram, set())
+
+            scored = []
+            for doc_id in candidates:
+                doc, norm, words, grams = self._docs[doc_id]
+                if norm == q:
+                    score = 100.0
+                elif norm.startswith(q):
+                    score = 80.0
+                elif all(any(w.startswith(qw) for w in words) for qw in q_words):
+                    score = 60.0
+                elif q in norm:
+                    score = 50.0
+                else:
+                    # Typo tolerance: each query word vs its closest title word (Dice similarity of trigrams)
+                    similarity = sum(
+                        max((dice(qg, trigrams(w)) for w in words), default=0.0) for qg in q_word_grams
+                    ) / len(q_word_grams)
+                    if similarity < MIN_FUZZY_SCORE:
+                        continue
+                    score = 40.0 * similarity
+                # Rating breaks ties between equally good matches
+                scored.append((score + _rating(doc.get('rating')) / 2, norm, doc))
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [doc for _, _, doc in scored[:limit]]
@@ -153,72 +153,84 @@ document.addEventListener("DOMContentLoaded", () => {
     const searchInput = document.getElementById('search-input');
     const searchResults = document.getElementById('search-results');
 
-    // Scrape game data from the DOM
-    let gamesData = [];
-
-    // Fetch games from API for global search
-    fetch('/api/games')
-        .then(response => response.json())
-        .then(data => {
-            if (Array.isArray(data)) {
-                gamesData = data;
-                console.log("Loaded " + gamesData.length + " games for search.");
+    // Matches come from the server-side index (/api/search); only the top few are downloaded
+    const SEARCH_LIMIT = 8;
+    let searchTimer = null;
+    let searchController = null;
+
+    const escapeHtml = (text) => String(text).replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    }[ch]));
+
+    const hideSearchResults = () => {
+        searchResults.classList.remove('show');
+        setTimeout(() => {
+            if (!searchResults.classList.contains('show')) {
+                searchResults.style.display = 'none';
             }
-        })
-        .catch(error => console.error("Error loading search data:", error));
+        }, 300); // Wait for animation
+    };
+
+    const renderSearchResults = (searchTerm, games) => {
+        searchResults.innerHTML = ''; // Clear previous results
+
+        if (games.length === 0) {
+            hideSearchResults();
+            return;
+        }
+
+        // Highlight logic (escape the term so characters like "(" don't break the regex)
+        const pattern = searchTerm.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+        const regex = new RegExp(`(${pattern})`, 'gi');
+
+        games.forEach((game, index) => {
+            const item = document.createElement('a');
+            item.className = 'search-result-item';
+            item.href = game.link;
+            item.style.animationDelay = `${index * 0.05}s`; // Staggered animation
+
+            const highlightedTitle = escapeHtml(game.title).replace(regex, '<span class="highlight">$1</span>');
+
+            item.innerHTML = `
+                <img src="${escapeHtml(game.image || '')}" class="search-result-img" alt="${escapeHtml(game.title)}">
+                <div class="search-result-info">
+                    <h4>${highlightedTitle}</h4>
+                    <p>Click to view details</p>
+                </div>
+            `;
+            searchResults.appendChild(item);
+        });
+        searchResults.style.display = 'block';
+        // Small delay to allow display:block to apply before adding class for transition
+        requestAnimationFrame(() => {
+            searchResults.classList.add('show');
+        });
+    };
 
     if (searchInput && searchResults) {
         searchInput.addEventListener('input', (e) => {
-            const searchTerm = e.target.value.toLowerCase();
-            searchResults.innerHTML = ''; // Clear previous results
+            const searchTerm = e.target.value.trim();
+            clearTimeout(searchTimer);
 
             if (searchTerm.length === 0) {
-                searchResults.classList.remove('show');
-                setTimeout(() => {
-                    if (!searchResults.classList.contains('show')) {
-                        searchResults.style.display = 'none';
-                    }
-                }, 300); // Wait for animation
+                if (searchController) searchController.abort();
+                searchResults.innerHTML = '';
+                hideSearchResults();
                 return;
             }
 
-            const filteredGames = gamesData.filter(game =>
-                game.title.toLowerCase().includes(searchTerm)
-            );
-
-            if (filteredGames.length > 0) {
-                filteredGames.forEach((game, index) => {
-                    const item = document.createElement('a');
-                    item.className = 'search-result-item';
-                    item.href = game.link;
-                    item.style.animationDelay = `${index * 0.05}s`; // Staggered animation
-
-                    // Highlight logic
-                    const regex = new RegExp(`(${searchTerm})`, 'gi');
-                    const highlightedTitle = game.title.replace(regex, '<span class="highlight">$1</span>');
-
-                    item.innerHTML = `
-                        <img src="${game.image}" class="search-result-img" alt="${game.title}">
-                        <div class="search-result-info">
-                            <h4>${highlightedTitle}</h4>
-                            <p>Click to view details</p>
-                        </div>
-                    `;
-                    searchResults.appendChild(item);
-                });
-                searchResults.style.display = 'block';
-                // Small delay to allow display:block to apply before adding class for transition
-                requestAnimationFrame(() => {
-                    searchResults.classList.add('show');
-                });
-            } else {
-                searchResults.classList.remove('show');
-                setTimeout(() => {
-                    if (!searchResults.classList.contains('show')) {
-                        searchResults.style.display = 'none';
-                    }
-                }, 300);
-            }
+            // Debounce keystrokes and drop responses for outdated queries
+            searchTimer = setTimeout(() => {
+                if (searchController) searchController.abort();
+                searchController = new AbortController();
+
+                fetch(`/api/search?q=${encodeURIComponent(searchTerm)}&limit=${SEARCH_LIMIT}`, { signal: searchController.signal })
+                    .then(response => response.json())
+                    .then(data => renderSearchResults(searchTerm, Array.isArray(data) ? data : []))
+                    .catch(error => {
+                        if (error.name !== 'AbortError') console.error("Search error:", error);
+                    });
+            }, 150);
         });
 
         // Hide results when clicking outside
@@ -351,6 +363,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
 // Chat History (Reset on page load)
 chatHistory = [];
+// In-flight streamed reply, aborted if another message is sent
+let chatAbortController = null;
 
 function toggleChat() {
     const chatWindow = document.getElementById('chatWindow');
@@ -391,37 +405,86 @@ async function sendMessage() {
     loadingDiv.id = 'loadingMsg';
     chatBody.appendChild(loadingDiv);
 
+    // Cancel a reply that is still streaming when the next message is sent
+    if (chatAbortController) chatAbortController.abort();
+    chatAbortController = new AbortController();
+
     try {
-        // 3. Send Message AND History to Flask Backend
+        // 3. Send Message AND History to Flask Backend (streamed as Server-Sent Events)
         const response = await fetch('/chat', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
             body: JSON.stringify({
                 message: message,
-                history: chatHistory
-            })
+                history: chatHistory,
+                stream: true
+            }),
+            signal: chatAbortController.signal
         });
 
-        const data = await response.json();
-
-        // 4. Remove Loading
-        document.getElementById('loadingMsg').remove();
+        let reply = '';
+        const botDiv = document.createElement('div');
+        botDiv.className = 'bot-message';
+        const renderReply = (text) => {
+            botDiv.innerHTML = text
+                .replace(/\*\*(.*?)\*\*/g, '<b>$1</b>') // Bold
+                .replace(/\n/g, '<br>'); // Line breaks
+            chatBody.scrollTop = chatBody.scrollHeight;
+        };
+
+        const isStream = (response.headers.get('Content-Type') || '').startsWith('text/event-stream');
+        if (!isStream || !response.body) {
+            const data = await response.json();
+            reply = data.reply;
+        } else {
+            // 4. Replace "Thinking..." with the reply as soon as the first chunk arrives
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let finished = false;
+            while (!finished) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const frames = buffer.split('\n\n');
+                buffer = frames.pop();
+                for (const frame of frames) {
+                    const event = (frame.match(/^event: (.*)$/m) || [])[1] || 'message';
+                    const dataLine = (frame.match(/^data: (.*)$/m) || [])[1];
+                    const payload = dataLine ? JSON.parse(dataLine) : {};
+                    if (event === 'done') {
+                        finished = true;
+                    } else if (event === 'error') {
+                        reply += payload.error;
+                        finished = true;
+                    } else if (payload.text) {
+                        reply += payload.text;
+                    }
+                    if (loadingDiv.isConnected) {
+                        loadingDiv.replaceWith(botDiv);
+                    }
+                    renderReply(reply);
+                }
+            }
+        }
 
         // 5. Add Bot Response to UI
-        let botText = data.reply
-            .replace(/\*\*(.*?)\*\*/g, '<b>$1</b>') // Bold
-            .replace(/\n/g, '<br>'); // Line breaks
-        chatBody.innerHTML += `<div class="bot-message">${botText}</div>`;
+        if (loadingDiv.isConnected) {
+            loadingDiv.replaceWith(botDiv);
+        }
+        renderReply(reply);
 
         // 6. UPDATE HISTORY MEMORY
         chatHistory.push({ role: "user", parts: [{ text: message }] });
-        chatHistory.push({ role: "model", parts: [{ text: data.reply }] });
+        chatHistory.push({ role: "model", parts: [{ text: reply }] });
 
         // 7. SAVE TO SESSION STORAGE
 
     } catch (error) {
-        if (document.getElementById('loadingMsg')) document.getElementById('loadingMsg').remove();
-        chatBody.innerHTML += `<div class="bot-message" style="color:red;">Connection Error.</div>`;
+        loadingDiv.remove();
+        if (error.name !== 'AbortError') {
+            chatBody.innerHTML += `<div class="bot-message" style="color:red;">Connection Error.</div>`;
+        }
     }
 
     chatBody.scrollTop = chatBody.scrollHeight;
@@ -537,6 +600,8 @@ async function addToCart(gameId) {
             updateCartCounter(data.cart_count);
         } else if (data.status === 'exists') {
             showToast("Item is already in cart!");
+        } else if (data.message) {
+            showToast(data.message);
         }
 
     } catch (error) {
@@ -694,6 +759,57 @@ function initScrollAnimation() {
 
     let hoverTimeout;
 
+    // Screenshot lists for the popup slideshow, prefetched for cards as they scroll into view
+    // (one /api/screenshots?ids=... request per batch instead of one request per hovered card)
+    const screenshotCache = new Map();
+    const pendingScreenshotIds = new Set();
+    const SCREENSHOT_BATCH_SIZE = 100;
+    let screenshotFlushTimer;
+
+    function flushScreenshotPrefetch() {
+        const ids = [...pendingScreenshotIds];
+        pendingScreenshotIds.clear();
+        for (let i = 0; i < ids.length; i += SCREENSHOT_BATCH_SIZE) {
+            const batch = ids.slice(i, i + SCREENSHOT_BATCH_SIZE);
+            const request = fetch(`/api/screenshots?ids=${batch.join(',')}`)
+                .then(response => response.ok ? response.json() : {})
+                .catch(() => ({}));
+            // Hovers that land before the response arrive share the in-flight request
+            batch.forEach(id => {
+                screenshotCache.set(id, request.then(lists => {
+                    if (!lists[id]) screenshotCache.delete(id);
+                    return lists[id];
+                }));
+            });
+        }
+    }
+
+    function queueScreenshotPrefetch(id) {
+        if (!id || screenshotCache.has(id) || pendingScreenshotIds.has(id)) return;
+        pendingScreenshotIds.add(id);
+        clearTimeout(screenshotFlushTimer);
+        screenshotFlushTimer = setTimeout(flushScreenshotPrefetch, 100);
+    }
+
+    function getScreenshots(gameId) {
+        const cached = screenshotCache.get(String(gameId));
+        return (cached || Promise.resolve()).then(screenshots => {
+            if (screenshots) return screenshots;
+            return fetch(`/api/game/${gameId}/screenshots`).then(response => response.json());
+        });
+    }
+
+    const prefetchObserver = new IntersectionObserver((entries, obs) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                queueScreenshotPrefetch(entry.target.dataset.id);
+                obs.unobserve(entry.target);
+            }
+        });
+    }, { rootMargin: '200px' });
+
+    document.querySelectorAll('.game-card[data-id]').forEach(card => prefetchObserver.observe(card));
+
     document.querySelectorAll('.game-card').forEach(card => {
         card.addEventListener('mouseenter', (e) => {
             hoverTimeout = setTimeout(() => {
@@ -758,12 +874,8 @@ function initScrollAnimation() {
                     popupImage.style.opacity = 1;
                     popupImage.src = defaultImage; // Show cover immediately
 
-                    // Fetch screenshots
-                    fetch(`/api/game/${gameId}/screenshots`)
-                        .then(response => {
-                            console.log('API Response Status:', response.status);
-                            return response.json();
-                        })
+                    // Prefetched for visible cards; falls back to a single-game fetch
+                    getScreenshots(gameId)
                         .then(screenshots => {
                             if (!card.isHovered) return; // Stop if user left
 
@@ -0,0 +1,409 @@
+# static_assets.py
+# Build step for the site's own static files: script.js and style.css are minified, every bundled
+# file is written under static/dist/ with its content hash in the name, and .gz/.br copies are
+# precompressed next to it. manifest.json maps source names to built files; the app's asset_url()
+# helper reads it and /dist/<name> serves the smallest encoding the browser accepts with immutable
+# cache headers. brotli is in requirements.txt; without it only .gz copies are written.
+#   python static_assets.py          build (also done on app start when the sources changed)
+#   python static_assets.py --check  exit 1 if the build is missing or stale
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+try:
+    import brotli  # in requirements.txt; .br copies are skipped without it
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('gamerz.assets')
+
+# Files under static/ that templates reference through asset_url()
+BUNDLE = ('script.js', 'style.css', 'favicon.ico', 'assets/Logo.png', 'assets/profile.jpg')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+# A precompressed copy is only kept when it saves at least this much (PNG/JPEG never do)
+MIN_SAVING = 0.1
+# Built files dropped from the manifest stay this long for pages rendered before a rebuild
+STALE_GRACE = 24 * 3600
+ENCODINGS = ('br', 'gzip')
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+# ---------- MINIFIERS ----------
+# Conservative, dependency-free: comments and redundant whitespace go, everything else
+# (identifiers, strings, template literals, regex literals) is copied verbatim.
+
+_WORD = re.compile(r'[\w$\\\u0080-\uffff]')
+# A '/' after one of these starts a regex literal, otherwise it is division
+_REGEX_AFTER_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                      'throw', 'case', 'do', 'else', 'yield', 'await'}
+# A line break may be dropped after these (the statement can't end there) ...
+_JOINS_NEXT = set('{([,;:=&|?*%<>!~^.')
+# ... or before these (they can't start a statement). '+', '-', '/', '(', '[' and '`' are
+# left out on purpose: a break before them can change how the code parses.
+_JOINS_PREV = set(')]},;.?:=&|*%<>^')
+
+
+def _is_word(ch):
+    return bool(ch) and _WORD.match(ch) is not None
+
+
+def _skip_string(src, i):
+    """Index just past the '...' or "..." literal starting at src[i]."""
+    quote = src[i]
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == quote:
+            return i + 1
+        if ch == '\n':
+            raise ValueError(f"Unterminated string literal at offset {i}")
+        i += 1
+    raise ValueError("Unterminated string literal")
+
+
+def _skip_template(src, i):
+    """Index just past the `...` literal starting at src[i], ${...} substitutions included."""
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif ch == '$' and src.startswith('${', i):
+            i = _skip_substitution(src, i + 2)
+        else:
+            i += 1
+    raise ValueError("Unterminated template literal")
+
+
+def _skip_substitution(src, i):
+    """Index just past the '}' closing a ${...} substitution, nested literals included."""
+    depth = 0
+    while i < len(src):
+        ch = src[i]
+        if ch in '\'"':
+            i = _skip_string(src, i)
+            continue
+        if ch == '`':
+            i = _skip_template(src, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    raise ValueError("Unterminated template substitution")
+
+
+def _skip_regex(src, i):
+    """Index just past the regex literal starting at src[i], or None if it isn't one."""
+    i += 1
+    in_class = False
+    while i < len(src):
+        ch = src[i]
+        if ch == '\n':
+            return None
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(src) and _is_word(src[i]):   # flags
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+def _regex_allowed(out):
+    text = ''.join(out[-12:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in _REGEX_AFTER_CHARS:
+        return True
+    match = re.search(r'[\w$]+$', text)
+    return match is not None and match.group(0) in _REGEX_AFTER_WORDS
+
+
+def minify_js(src):
+    out = []
+    i = 0
+    n = len(src)
+    pending = None   # None, ' ' or '\n': whitespace seen since the last token
+
+    def emit(token):
+        nonlocal pending
+        if pending is not None and out:
+            prev, nxt = out[-1][-1], token[0]
+            if pending == '\n' and prev not in _JOINS_NEXT and nxt not in _JOINS_PREV:
+                out.append('\n')
+            elif (_is_word(prev) and _is_word(nxt)) or (prev == nxt and prev in '+-/'):
+                out.append(' ')
+        pending = None
+        out.append(token)
+
+    while i < n:
+        ch = src[i]
+        if ch in ' \t\r\n\f\v\ufeff':
+            if ch == '\n':
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            i += 1
+        elif src.startswith('//', i):
+            end = src.find('\n', i)
+            i = n if end == -1 else end
+        elif src.startswith('/*', i):
+            end = src.find('*/', i + 2)
+            if end == -1:
+                raise ValueError("Unterminated comment")
+            if '\n' in src[i:end]:
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            i = end + 2
+        elif ch in '\'"':
+            end = _skip_string(src, i)
+            emit(src[i:end])
+            i = end
+        elif ch == '`':
+            end = _skip_template(src, i)
+            emit(src[i:end])
+            i = end
+        elif ch == '/' and _regex_allowed(out):
+            end = _skip_regex(src, i)
+            if end is None:   # not a regex after all: plain division
+                end = i + 1
+            emit(src[i:end])
+            i = end
+        else:
+            j = i + 1
+            if _is_word(ch):
+                while j < n and _is_word(src[j]):
+                    j += 1
+            emit(src[i:j])
+            i = j
+    return ''.join(out).strip() + '\n'
+
+
+# Spaces around these can go in CSS. Not ':' before (descendant ":hover" selectors),
+# not '+'/'-' (calc()), not '(' (media query "and (").
+_CSS_TRIM = re.compile(r'\s*([{};,>~])\s*')
+_CSS_SPECIAL = re.compile(r'/\*|[\'"]')
+
+
+def _minify_css_chunk(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = _CSS_TRIM.sub(r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}')
+
+
+def minify_css(src):
+    parts = []
+    code = []   # pieces outside string literals, comments replaced by a space
+    i = 0
+    while True:
+        match = _CSS_SPECIAL.search(src, i)
+        if match is None:
+            code.append(src[i:])
+            break
+        start = match.start()
+        code.append(src[i:start])
+        if match.group(0) == '/*':
+            end = src.find('*/', start + 2)
+            if end == -1:
+                raise ValueError("Unterminated comment")
+            code.append(' ')
+            i = end + 2
+        else:
+            end = _skip_string(src, start)
+            parts.append(_minify_css_chunk(''.join(code)))
+            parts.append(src[start:end])
+            code = []
+            i = end
+    parts.append(_minify_css_chunk(''.join(code)))
+    return ''.join(parts).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+# ---------- BUILD ----------
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _source_digests(static_dir, bundle):
+    digests = {}
+    for name in bundle:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            digests[name] = _digest(f.read())
+    return digests
+
+
+def read_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(static_dir, manifest, bundle=BUNDLE):
+    if manifest is None:
+        return True
+    # Built before brotli was installed: rebuild to add the .br copies
+    if brotli is not None and not manifest.get('brotli'):
+        return True
+    built = manifest.get('files', {})
+    return {name: entry.get('source') for name, entry in built.items()} != _source_digests(static_dir, bundle)
+
+
+def build(static_dir, bundle=BUNDLE, prune_after=STALE_GRACE):
+    """
+    Minify, fingerprint and precompress bundle (paths relative to static_dir) into
+    static_dir/dist and write the manifest last, so readers never see a half-built set.
+    Returns the manifest: {'files': {name: {'path', 'source', 'sizes': {encoding: bytes}}}}.
+    """
+    dist = os.path.join(static_dir, DIST_DIR)
+    if brotli is None:
+        logger.warning("brotli is not installed: building .gz copies only (pip install brotli)")
+    files = {}
+    for name in bundle:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            raw = f.read()
+        root, ext = os.path.splitext(name)
+        minify = MINIFIERS.get(ext)
+        data = minify(raw.decode('utf-8')).encode('utf-8') if minify else raw
+        path = f"{root}.{_digest(data)[:HASH_LENGTH]}{ext}"
+
+        sizes = {'identity': len(data)}
+        variants = {'identity': data, 'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+        for encoding, blob in variants.items():
+            if encoding != 'identity' and len(blob) > len(data) * (1 - MIN_SAVING):
+                continue
+            target = os.path.join(dist, path + SUFFIXES.get(encoding, ''))
+            # Content-addressed: an unchanged file from an earlier build is already right
+            if not os.path.exists(target):
+                _write_atomic(target, blob)
+            sizes[encoding] = len(blob)
+        files[name] = {'path': path, 'source': _digest(raw), 'sizes': sizes}
+
+    manifest = {'built': int(time.time()), 'brotli': brotli is not None, 'files': files}
+    _write_atomic(os.path.join(dist, MANIFEST_NAME),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _prune(dist, manifest, prune_after)
+    return manifest
+
+
+def _prune(dist, manifest, grace):
+    keep = {MANIFEST_NAME}
+    for entry in manifest['files'].values():
+        keep.update(entry['path'] + SUFFIXES.get(encoding, '') for encoding in entry['sizes'])
+    cutoff = time.time() - grace
+    for root, _, names in os.walk(dist):
+        for file_name in names:
+            path = os.path.join(root, file_name)
+            if os.path.relpath(path, dist).replace(os.sep, '/') in keep:
+                continue
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+
+class AssetManifest:
+    """
+    Lookup side used by the app. Without a build, asset_url() falls back to the plain
+    /static/ URL, so a fresh checkout still renders.
+    """
+
+    def __init__(self, static_dir, manifest=None):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        self.manifest = manifest or {'files': {}}
+        self.by_path = {entry['path']: entry for entry in self.manifest['files'].values()}
+
+    @classmethod
+    def load(cls, static_dir, auto_build=True, bundle=BUNDLE):
+        manifest = read_manifest(static_dir)
+        try:
+            stale = is_stale(static_dir, manifest, bundle)
+        except OSError as e:
+            logger.warning("Asset sources missing (%s); serving unbuilt files", e)
+            return cls(static_dir)
+        if stale:
+            if not auto_build:
+                logger.warning("Asset build is missing or stale; run python static_assets.py")
+                return cls(static_dir)
+            manifest = build(static_dir, bundle)
+            logger.info("Built %d static assets into %s", len(manifest['files']), DIST_DIR)
+        return cls(static_dir, manifest)
+
+    def path(self, name):
+        """Built file name for a source name, or None if it isn't part of the build."""
+        entry = self.manifest['files'].get(name)
+        return entry['path'] if entry else None
+
+    def choose(self, path, accepted):
+        """
+        (file to send, Content-Encoding or None) for a built path; accepted(encoding) tells
+        whether the client takes that encoding. Picks the smallest acceptable copy.
+        """
+        entry = self.by_path.get(path)
+        if entry is None:
+            return None, None
+        sizes = entry['sizes']
+        candidates = [enc for enc in ENCODINGS if enc in sizes and accepted(enc)]
+        encoding = min(candidates, key=sizes.get) if candidates else 'identity'
+        file_path = os.path.join(self.dist_dir, path + SUFFIXES.get(encoding, ''))
+        return file_path, None if encoding == 'identity' else encoding
+
+    def stats(self):
+        totals = {}
+        for entry in self.manifest['files'].values():
+            for encoding, size in entry['sizes'].items():
+                totals[encoding] = totals.get(encoding, 0) + size
+        return {'built': self.manifest.get('built'), 'files': len(self.manifest['files']),
+                'bytes': totals, 'brotli': brotli is not None}
+
+
+if __name__ == '__main__':
+    import sys
+
+    static = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    if '--check' in sys.argv:
+        stale = is_stale(static, read_manifest(static))
+        print("Asset build is stale" if stale else "Asset build is up to date")
+        sys.exit(1 if stale else 0)
+    result = build(static)
+    for source, built in sorted(result['files'].items()):
+        sizes = ', '.join(f"{enc} {size:,}" for enc, size in sorted(built['sizes'].items()))
+        print(f"{source:<22} -> {DIST_DIR}/{built['path']} ({sizes})")
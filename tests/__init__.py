@@ -0,0 +1,3 @@
+# tests
+# pytest suite: python -m pytest. Route tests run the Flask app against the SQLite stand-in
+# (benchmarks/standin.py) and skip when Flask or pyodbc can't be imported.
@@ -0,0 +1,69 @@
+# tests/conftest.py
+# Shared fixtures: a small synthetic catalog in the SQLite stand-in database and the Flask app
+# wired to it, the same way `python -m benchmarks.run routes` does.
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Read when app.py / catalog_cache.py are imported: keep the tests away from the real
+# version stamp, carts, image cache and static build
+_DATA_DIR = tempfile.mkdtemp(prefix='gamerz-tests-')
+os.environ['CATALOG_VERSION_FILE'] = os.path.join(_DATA_DIR, 'catalog_version.txt')
+os.environ['CART_STORE'] = 'memory'
+os.environ['IMAGE_CACHE_DIR'] = os.path.join(_DATA_DIR, 'image_cache')
+os.environ['ASSETS_AUTO_BUILD'] = '0'
+os.environ.pop('GEMINI_API_KEY', None)
+
+from benchmarks import standin  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+CATALOG_SIZE = 120
+
+
+@pytest.fixture
+def standin_path(tmp_path):
+    path = str(tmp_path / 'standin.sqlite3')
+    standin.create_standin(path, generate_catalog(CATALOG_SIZE, seed=7))
+    return path
+
+
+@pytest.fixture
+def standin_db(standin_path):
+    """Direct sqlite3 connection to the stand-in, for arranging and checking rows."""
+    db = sqlite3.connect(standin_path)
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope='session')
+def gamerz():
+    """The app module (imported once); skips when Flask or pyodbc can't be imported."""
+    pytest.importorskip('flask')
+    pytest.importorskip('pyodbc', exc_type=ImportError)   # also skips when the ODBC driver manager is missing
+    os.chdir(ROOT)   # UPLOAD_FOLDER is relative to the working directory
+    import app as gamerz
+    gamerz.app.config['TESTING'] = True
+    return gamerz
+
+
+@pytest.fixture
+def client(gamerz, standin_path, monkeypatch):
+    """Test client with the app's pool pointed at a fresh stand-in database and empty caches."""
+    from db_pool import ConnectionPool
+
+    pool = ConnectionPool(lambda: standin.connect(standin_path), min_size=0, max_size=8)
+    monkeypatch.setattr(gamerz, 'db_pool', pool)
+    gamerz.catalog_cache.invalidate()
+    gamerz.chat_reply_cache.clear()
+    with gamerz.app.test_client() as test_client:
+        yield test_client
+    pool.close_all()
+
+
+def log_in(client, user_id):
+    """Sign the test client in as user_id (user 1 is the admin)."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
@@ -0,0 +1,21 @@
+# tests/test_admin_stats.py
+# The admin dashboard aggregates (admin_stats.py) against the SQLite stand-in, checked against
+# the Python loop they replaced.
+from admin_stats import DASHBOARD_GENRES, load_admin_stats
+from benchmarks import standin
+
+
+def test_genre_counts_match_the_old_case_sensitive_python_check(standin_path, standin_db):
+    standin_db.executemany("UPDATE games SET genre = ? WHERE id = ?",
+                           [('action', 1), ('ACTION, rpg', 2), ('Action, RPG', 3), ('Indie Adventure', 4), (None, 5)])
+    standin_db.commit()
+    genres = [row[0] for row in standin_db.execute("SELECT genre FROM games")]
+
+    stats = load_admin_stats(standin.connect(standin_path).cursor())
+
+    expected = {genre: sum(1 for g in genres if g and genre in g) for genre in DASHBOARD_GENRES}
+    assert stats['genre_stats'] == expected
+    assert stats['action_games'] == expected['Action']
+    assert stats['rpg_games'] == expected['RPG']
+    assert stats['total_games'] == len(genres)
+    assert sum(stats['rating_dist'].values()) <= len(genres)
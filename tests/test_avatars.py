@@ -0,0 +1,121 @@
+# tests/test_avatars.py
+# Profile photo pipeline (avatars.py) and the /profile upload and /avatars routes: uploads are
+# inspected once, served as uploaded until the thumbnails exist, and shared files survive.
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import avatars
+from avatars import AvatarPipeline, Image, content_digest, inspect, variant_files
+
+from .conftest import log_in
+
+needs_pillow = pytest.mark.skipif(Image is None, reason="Pillow is not installed")
+
+
+def make_png(colour=(200, 20, 20)):
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 48), colour).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def write_variants(pipeline, photo):
+    for name in variant_files(photo):
+        with open(os.path.join(pipeline.directory, name), 'wb') as f:
+            f.write(b'x')
+
+
+def exists(pipeline, photo):
+    return all(os.path.exists(os.path.join(pipeline.directory, name)) for name in variant_files(photo))
+
+
+def wait_idle(pipeline, timeout=5):
+    deadline = time.monotonic() + timeout
+    while pipeline.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not pipeline.stats()['pending'], "upload still processing"
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    (tmp_path / 'avatars').mkdir()
+    return AvatarPipeline(str(tmp_path / 'avatars'), workers=1)
+
+
+@needs_pillow
+def test_original_is_available_until_the_thumbnails_exist(pipeline, monkeypatch):
+    data = make_png()
+    monkeypatch.setattr(avatars, 'inspect', lambda data: pytest.fail("inspected twice"))
+    release = threading.Event()
+
+    key = pipeline.submit(data, 'png', on_done=lambda key: release.wait(5), inspected=inspect(data))
+
+    name = f"{content_digest(data)}_sm.webp"
+    assert pipeline.pending_upload(name) == (data, 'image/png')
+    assert pipeline.pending_upload('0' * 16 + '_sm.webp') is None
+    release.set()
+    wait_idle(pipeline)
+    assert pipeline.pending_upload(name) is None
+    assert exists(pipeline, key)
+
+
+@pytest.fixture
+def avatar_app(gamerz, client, pipeline, monkeypatch):
+    monkeypatch.setattr(gamerz, 'avatar_pipeline', pipeline)
+    monkeypatch.setattr(gamerz, '_latest_avatar', {})
+    return gamerz
+
+
+@needs_pillow
+def test_avatar_route_serves_the_upload_while_it_is_processing(avatar_app, client, monkeypatch):
+    data = make_png()
+    inspected = []
+    monkeypatch.setattr(avatar_app, 'inspect_image', lambda data: inspected.append(data) or inspect(data))
+    monkeypatch.setattr(avatars, 'inspect', avatar_app.inspect_image)
+    release = threading.Event()
+    render = avatars.render_variants
+    monkeypatch.setattr(avatars, 'render_variants', lambda data: release.wait(5) and render(data))
+    log_in(client, 2)
+
+    resp = client.post('/profile', data={'profile_photo': (io.BytesIO(data), 'me.png')},
+                       content_type='multipart/form-data')
+    assert resp.status_code == 200
+    assert len(inspected) == 1
+
+    name = f"{content_digest(data)}_sm.webp"
+    started = time.monotonic()
+    resp = client.get(f'/avatars/{name}')
+    assert time.monotonic() - started < 1, "route waited for the worker"
+    assert resp.status_code == 200
+    assert resp.data == data and resp.mimetype == 'image/png'
+    assert resp.headers['Cache-Control'] == 'no-store'
+
+    release.set()
+    wait_idle(avatar_app.avatar_pipeline)
+    resp = client.get(f'/avatars/{name}')
+    assert resp.mimetype == 'image/webp'
+    assert 'immutable' in resp.headers['Cache-Control']
+    assert client.get(f"/avatars/{'0' * 16}_sm.webp").status_code == 404
+
+
+def test_replaced_photo_is_kept_while_another_upload_of_it_is_in_flight(avatar_app, pipeline, standin_db):
+    shared, new = 'avatars/' + 'a' * 16, 'avatars/' + 'b' * 16
+    write_variants(pipeline, shared)
+    write_variants(pipeline, new)
+    standin_db.execute("UPDATE users SET profile_photo = ? WHERE id = 2", (shared,))
+    standin_db.commit()
+
+    # User 3 uploaded the same picture; their worker hasn't saved it to the DB yet
+    avatar_app._latest_avatar.update({2: new, 3: shared})
+    avatar_app.save_profile_photo(2, new)
+    assert exists(pipeline, shared)
+    assert standin_db.execute("SELECT profile_photo FROM users WHERE id = 2").fetchone()[0] == new
+    assert avatar_app._latest_avatar == {3: shared}
+
+    # Nobody else has the next one it replaces
+    avatar_app._latest_avatar[2] = 'avatars/' + 'c' * 16
+    avatar_app.save_profile_photo(2, 'avatars/' + 'c' * 16)
+    assert not exists(pipeline, new)
@@ -0,0 +1,41 @@
+# tests/test_cart.py
+# /add_to_cart and /checkout around the per-order cap (checkout.MAX_CART_ITEMS).
+import pytest
+
+from tests.conftest import log_in
+
+
+@pytest.fixture
+def in_stock(standin_db):
+    rows = standin_db.execute("SELECT id FROM games WHERE stock_quantity > 0 ORDER BY id LIMIT 10").fetchall()
+    return [row[0] for row in rows]
+
+
+def test_add_to_cart_stops_at_the_order_cap(gamerz, client, in_stock, monkeypatch):
+    monkeypatch.setattr(gamerz, 'MAX_CART_ITEMS', 3)
+    log_in(client, 2)
+
+    statuses = [client.post('/add_to_cart', json={'game_id': game_id}) for game_id in in_stock[:4]]
+
+    assert [r.get_json()['status'] for r in statuses[:3]] == ['success'] * 3
+    assert statuses[3].status_code == 400
+    assert statuses[3].get_json()['status'] == 'cart_full'
+    with client.session_transaction() as sess:
+        cart_id = sess['cart_id']
+    assert gamerz.cart_store.items(cart_id) == in_stock[:3]
+
+
+def test_checkout_of_an_oversized_cart_goes_back_to_the_cart(gamerz, client, in_stock, monkeypatch):
+    monkeypatch.setattr(gamerz, 'MAX_CART_ITEMS', 3)
+    log_in(client, 2)
+    with client.session_transaction() as sess:
+        sess['cart_id'] = 'oversized'
+    gamerz.cart_store.replace('oversized', in_stock[:5])
+
+    resp = client.get('/checkout')
+
+    assert resp.status_code == 302
+    assert resp.headers['Location'].endswith('/cart')
+    with client.session_transaction() as sess:
+        assert any('limited to 3 games' in message for _, message in sess['_flashes'])
+    assert gamerz.cart_store.items('oversized') == in_stock[:5]
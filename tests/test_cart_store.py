@@ -0,0 +1,48 @@
+# tests/test_cart_store.py
+# The cart backends behind app.cart_store (Redis needs a server and is not covered here).
+import pytest
+
+from cart_store import MemoryCartStore, SQLiteCartStore, make_cart_store
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return make_cart_store(request.param, str(tmp_path / 'carts.sqlite3'))
+
+
+def test_add_remove_replace_clear(store):
+    assert store.add('c1', 10) == (True, 1)
+    assert store.add('c1', 20) == (True, 2)
+    assert store.add('c1', 10) == (False, 2)
+    assert store.items('c1') == [10, 20]
+
+    store.remove('c1', 10, 99)
+    assert store.items('c1') == [20]
+
+    store.replace('c1', [3, 1, 2, 1])
+    assert store.items('c1') == [3, 1, 2]
+    assert store.count('c1') == 3
+    assert store.items('other') == []
+
+    store.clear('c1')
+    assert store.items('c1') == []
+
+
+def test_failed_replace_rolls_back_and_keeps_the_store_usable(tmp_path):
+    store = SQLiteCartStore(str(tmp_path / 'carts.sqlite3'))
+    store.replace('c1', [1, 2])
+
+    with pytest.raises(Exception):
+        store.replace('c1', [3, object()])   # the second row can't be bound
+
+    assert store.items('c1') == [1, 2], "half-applied replace"
+    assert not store._db.in_transaction
+    store.replace('c1', [4])
+    assert store.add('c2', 5) == (True, 1)
+    assert store.items('c1') == [4]
+
+
+def test_expired_carts_are_empty(monkeypatch, tmp_path):
+    for store in (MemoryCartStore(ttl=-1), SQLiteCartStore(str(tmp_path / 'carts.sqlite3'), ttl=-1)):
+        store.add('c1', 1)
+        assert store.items('c1') == []
@@ -0,0 +1,127 @@
+# tests/test_chat_route.py
+# POST /chat through the Flask test client with the Gemini model replaced by a stub:
+# reply cache keys, catalog-version flushes, follow-ups, prompt trimming and model errors.
+import pytest
+
+from chat_context import MAX_CONTEXT_GAMES
+
+
+class StubReply:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Stands in for genai.GenerativeModel: records every prompt, replies "reply #n"."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+        self.histories = []
+
+    @property
+    def calls(self):
+        return len(self.prompts)
+
+    def start_chat(self, history=None):
+        self.histories.append(history)
+        return self
+
+    def send_message(self, message, stream=False):
+        self.prompts.append(message)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        text = f"reply #{self.calls}"
+        if stream:
+            return iter([StubReply(text[:6]), StubReply(text[6:])])
+        return StubReply(text)
+
+
+@pytest.fixture
+def model(gamerz, client, monkeypatch):
+    stub = StubGenerativeModel()
+    monkeypatch.setattr(gamerz, 'model', stub)
+    return stub
+
+
+@pytest.fixture
+def titles(standin_db):
+    rows = standin_db.execute("SELECT title FROM games WHERE genre NOT IN ('DLC', 'Edition') ORDER BY id").fetchall()
+    return [row[0] for row in rows]
+
+
+def ask(client, message, history=None, **extra):
+    resp = client.post('/chat', json={'message': message, 'history': history or [], **extra})
+    assert resp.status_code == 200
+    return resp
+
+
+def test_repeat_and_near_duplicate_questions_reach_the_model_once(client, model, titles):
+    first = ask(client, f"price of {titles[0]}").get_json()['reply']
+    assert first == "reply #1"
+
+    assert ask(client, f"price of {titles[0]}").get_json()['reply'] == first
+    assert ask(client, f"Price of {titles[0].upper()}?").get_json()['reply'] == first
+    assert ask(client, f"whats the price of {titles[0]}").get_json()['reply'] == first
+    assert model.calls == 1
+
+
+def test_different_game_is_not_answered_from_the_cache(client, model, titles):
+    ask(client, f"price of {titles[0]}")
+    assert ask(client, f"price of {titles[1]}").get_json()['reply'] == "reply #2"
+    assert model.calls == 2
+
+
+def test_catalog_change_flushes_cached_replies(gamerz, client, model, titles):
+    ask(client, f"price of {titles[0]}")
+    gamerz.catalog_cache.invalidate()
+    assert ask(client, f"price of {titles[0]}").get_json()['reply'] == "reply #2"
+    assert model.calls == 2
+
+
+def test_prompt_holds_only_the_relevant_games(client, model, titles):
+    ask(client, f"price of {titles[0]}")
+    games_in_prompt = [line for line in model.prompts[0].splitlines() if line.startswith("Title: ")]
+    assert 0 < len(games_in_prompt) <= MAX_CONTEXT_GAMES
+    assert games_in_prompt[0].startswith(f"Title: {titles[0]} |")
+    assert model.prompts[0].endswith(f"User Query: price of {titles[0]}")
+
+
+def test_follow_ups_skip_the_cache_and_keep_their_subject(client, model, titles):
+    history = [{'role': 'user', 'parts': [f"tell me about {titles[2]}"]},
+               {'role': 'model', 'parts': ["It is a game."]}]
+    ask(client, "how much is it", history)
+    ask(client, "how much is it", history)
+
+    assert model.calls == 2
+    assert model.histories[-1] == history
+    assert f"Title: {titles[2]} |" in model.prompts[-1]
+
+
+def test_model_errors_are_reported_and_not_cached(client, model, titles):
+    model.fail = True
+    reply = ask(client, f"price of {titles[0]}").get_json()['reply']
+    assert reply == "Technical Error: quota exceeded"
+
+    model.fail = False
+    assert ask(client, f"price of {titles[0]}").get_json()['reply'] == "reply #2"
+
+
+def test_streamed_reply_is_cached_for_the_next_asker(client, model, titles):
+    resp = ask(client, f"price of {titles[0]}", stream=True)
+    assert resp.mimetype == 'text/event-stream'
+    assert resp.get_data(as_text=True) == (
+        'data: {"text": "reply "}\n\n'
+        'data: {"text": "#1"}\n\n'
+        'event: done\ndata: {}\n\n'
+    )
+
+    resp = ask(client, f"price of {titles[0]}", stream=True)
+    assert resp.get_data(as_text=True) == 'data: {"text": "reply #1"}\n\nevent: done\ndata: {}\n\n'
+    assert ask(client, f"price of {titles[0]}").get_json()['reply'] == "reply #1"
+    assert model.calls == 1
+
+
+def test_missing_model_is_reported(gamerz, client, monkeypatch):
+    monkeypatch.setattr(gamerz, 'model', None)
+    assert ask(client, "hello").get_json() == {"reply": "Error: AI Model failed to load."}
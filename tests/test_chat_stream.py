@@ -0,0 +1,100 @@
+# tests/test_chat_stream.py
+# The /chat SSE relay (chat_context.stream_chat_reply) against a fake streaming model.
+from chat_context import sse_event, stream_chat_reply
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """Iterates like a streamed GenerateContentResponse and records how far it got."""
+
+    def __init__(self, texts, fail_after=None):
+        self.texts = texts
+        self.fail_after = fail_after
+        self.pulled = 0
+        self.closed = False
+
+    def __iter__(self):
+        for text in self.texts:
+            if self.fail_after is not None and self.pulled >= self.fail_after:
+                raise RuntimeError("quota exceeded")
+            self.pulled += 1
+            yield FakeChunk(text)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeChatSession:
+    def __init__(self, stream):
+        self.stream = stream
+        self.sent = []
+
+    def send_message(self, message, stream=False):
+        assert stream, "streaming path must ask for stream=True"
+        self.sent.append(message)
+        return self.stream
+
+
+def test_sse_event_format():
+    assert sse_event({"text": "hi"}) == 'data: {"text": "hi"}\n\n'
+    assert sse_event({}, event="done") == 'event: done\ndata: {}\n\n'
+
+
+def test_full_reply_is_relayed_and_completed():
+    completed = []
+    stream = FakeStream(["Elden ", "Ring is ", "$59.99", ""])
+    session = FakeChatSession(stream)
+
+    frames = list(stream_chat_reply(session, "price of elden ring", completed.append))
+
+    assert frames == [
+        'data: {"text": "Elden "}\n\n',
+        'data: {"text": "Ring is "}\n\n',
+        'data: {"text": "$59.99"}\n\n',
+        'event: done\ndata: {}\n\n',
+    ]
+    assert session.sent == ["price of elden ring"]
+    assert completed == ["Elden Ring is $59.99"]
+    assert stream.closed
+
+
+def test_disconnect_closes_the_model_stream():
+    # The WSGI server closes the generator when the client goes away after the first frame
+    completed = []
+    stream = FakeStream(["one ", "two ", "three"])
+    relay = stream_chat_reply(FakeChatSession(stream), "hi", completed.append)
+
+    assert next(relay) == 'data: {"text": "one "}\n\n'
+    relay.close()
+
+    assert stream.closed
+    assert stream.pulled == 1, "kept generating after the client disconnected"
+    assert completed == [], "partial reply passed to on_complete"
+
+
+def test_model_error_ends_with_an_error_frame(capsys):
+    completed = []
+    stream = FakeStream(["partial ", "answer"], fail_after=1)
+
+    frames = list(stream_chat_reply(FakeChatSession(stream), "hi", completed.append))
+
+    assert frames == [
+        'data: {"text": "partial "}\n\n',
+        'event: error\ndata: {"error": "Technical Error: quota exceeded"}\n\n',
+    ]
+    assert completed == []
+    assert stream.closed
+    assert "quota exceeded" in capsys.readouterr().out
+
+
+def test_send_failure_is_reported():
+    class FailingSession:
+        def send_message(self, message, stream=False):
+            raise RuntimeError("model unavailable")
+
+    frames = list(stream_chat_reply(FailingSession(), "hi"))
+    assert frames == ['event: error\ndata: {"error": "Technical Error: model unavailable"}\n\n']
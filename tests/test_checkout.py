@@ -0,0 +1,145 @@
+# tests/test_checkout.py
+# checkout.place_order against a scripted connection, plus the oversell check, which needs a
+# real SQL Server (the batch uses table variables and OUTPUT): GAMERZ_TEST_SQLSERVER=1 python -m pytest
+import os
+import threading
+
+import pytest
+
+pyodbc = pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from checkout import MAX_CART_ITEMS, place_order  # noqa: E402
+
+
+class ScriptedConnection:
+    """Answers each checkout batch with the next scripted result (rows, or an exception to raise)."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.batches = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        self.batches.append((sql, params))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        self._rows = result
+
+    def fetchall(self):
+        return self._rows
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def keys():
+    counter = iter(range(1000))
+    return lambda: f"KEY-{next(counter)}"
+
+
+def test_order_commits_keys_and_reports_sold_out_games():
+    # (game_id, key, stock_left, reserved, key came from the pool)
+    conn = ScriptedConnection([(1, 'POOL-1', 4, 1, 1), (2, 'KEY-1', 0, 1, 0), (3, 'POOL-3', None, 1, 1)])
+
+    result = place_order(conn, 7, [1, 2, 3, 2], make_key=keys())
+
+    assert result == {'keys': {1: 'POOL-1', 2: 'KEY-1', 3: 'POOL-3'}, 'unavailable': [], 'sold_out': [2], 'pool_misses': 1}
+    sql, params = conn.batches[0]
+    assert params == [1, 'KEY-0', 2, 'KEY-1', 3, 'KEY-2', 7], "duplicate cart lines must be dropped"
+    assert (conn.commits, conn.rollbacks) == (1, 0)
+
+
+def test_unavailable_game_rolls_the_whole_order_back():
+    conn = ScriptedConnection([(1, 'KEY-0', 3, 1, 0), (2, 'KEY-1', None, 0, 0)])
+
+    result = place_order(conn, 7, [1, 2], make_key=keys())
+
+    assert result == {'keys': {}, 'unavailable': [2], 'sold_out': [], 'pool_misses': 0}
+    assert (conn.commits, conn.rollbacks) == (0, 1)
+
+
+def test_deadlock_is_retried_with_fresh_keys():
+    deadlock = pyodbc.Error('40001', 'Transaction was deadlocked (1205)')
+    conn = ScriptedConnection(deadlock, [(1, 'KEY-1', 2, 1, 0)])
+
+    result = place_order(conn, 7, [1], make_key=keys())
+
+    assert result['keys'] == {1: 'KEY-1'}
+    assert [params[1] for _, params in conn.batches] == ['KEY-0', 'KEY-1']
+    assert (conn.commits, conn.rollbacks) == (1, 1)
+
+
+def test_other_database_errors_are_raised():
+    conn = ScriptedConnection(pyodbc.Error('08S01', 'Communication link failure'))
+    with pytest.raises(pyodbc.Error):
+        place_order(conn, 7, [1], make_key=keys())
+    assert conn.rollbacks == 1
+
+
+def test_orders_over_the_cap_are_refused():
+    with pytest.raises(ValueError):
+        place_order(ScriptedConnection(), 7, range(MAX_CART_ITEMS + 1))
+    assert place_order(ScriptedConnection(), 7, []) == {'keys': {}, 'unavailable': [], 'sold_out': [], 'pool_misses': 0}
+
+
+@pytest.mark.skipif(os.environ.get('GAMERZ_TEST_SQLSERVER') != '1',
+                    reason="needs SQL Server (set GAMERZ_TEST_SQLSERVER=1 and point import_steam.SQL_CONFIG at a scratch database)")
+@pytest.mark.parametrize('buyers, stock', [(50, 10), (5, 10)])
+def test_concurrent_buyers_never_oversell(buyers, stock):
+    # buyers threads race for a scratch game with stock copies; exactly min(buyers, stock) may win
+    from import_steam import get_conn
+
+    user_id = int(os.environ.get('GAMERZ_TEST_USER_ID', 1))
+    setup = get_conn()
+    cur = setup.cursor()
+    cur.execute("""
+        INSERT INTO dbo.games (title, price, genre, stock_quantity)
+        OUTPUT INSERTED.id
+        VALUES ('Checkout Stress Test', 0, 'Edition', ?)
+    """, stock)
+    game_id = cur.fetchone()[0]
+    setup.commit()
+
+    results = []
+    results_lock = threading.Lock()
+    start = threading.Event()
+
+    def buyer():
+        conn = get_conn()
+        try:
+            start.wait()
+            outcome = place_order(conn, user_id, [game_id])
+            with results_lock:
+                results.append(not outcome['unavailable'])
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=buyer) for _ in range(buyers)]
+    for t in threads:
+        t.start()
+    start.set()
+    for t in threads:
+        t.join()
+
+    try:
+        cur.execute("SELECT stock_quantity FROM dbo.games WHERE id = ?", game_id)
+        stock_left = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM dbo.orders WHERE game_id = ?", game_id)
+        orders = cur.fetchone()[0]
+    finally:
+        cur.execute("DELETE FROM dbo.orders WHERE game_id = ?", game_id)
+        cur.execute("DELETE FROM dbo.games WHERE id = ?", game_id)
+        setup.commit()
+        setup.close()
+
+    expected = min(buyers, stock)
+    assert sum(results) == orders == expected
+    assert stock_left == stock - expected
@@ -0,0 +1,88 @@
+# tests/test_http_cache.py
+# CachedSession: what gets stored, what is replayed, and Steam's rate-limited 200 answers.
+import json
+
+import pytest
+
+from http_cache import CachedResponse, CachedSession, ResponseCache, is_definitive
+
+APPDETAILS = "https://store.steampowered.com/api/appdetails?appids=10&l=english&cc=us"
+
+
+class FakeSession:
+    """requests.Session stand-in answering from a queue of (status, body) pairs."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+        self.headers = {}
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.calls.append((method, url, kwargs))
+        status, body = self.answers.pop(0)
+        return CachedResponse(url, status, body, {'Content-Type': 'application/json'}, from_cache=False)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = ResponseCache(str(tmp_path / 'steam_cache.sqlite3'))
+    yield store
+    store.close()
+
+
+def appdetails(success):
+    return json.dumps({"10": {"success": success, "data": {"name": "Counter-Strike"}} if success else {"success": False}}).encode()
+
+
+@pytest.mark.parametrize('method, status, body, expected', [
+    ('GET', 200, appdetails(True), True),
+    ('GET', 200, appdetails(False), False),
+    ('GET', 200, b'null', False),
+    ('GET', 200, b'', False),
+    ('GET', 200, b'  null\n', False),
+    ('GET', 200, b'\xff\xd8\xff\xe0 jpeg bytes', True),
+    ('GET', 404, b'', True),
+    ('HEAD', 200, b'', True),
+    ('GET', 429, b'', False),
+    ('GET', 503, appdetails(True), False),
+])
+def test_is_definitive(method, status, body, expected):
+    assert is_definitive(method, status, body) is expected
+
+
+def test_rate_limited_null_body_is_not_cached(cache):
+    session = CachedSession(FakeSession((200, b'null'), (200, appdetails(True))), cache)
+
+    assert session.get(APPDETAILS).content == b'null'
+    assert cache.get('GET', APPDETAILS) is None
+
+    resp = session.get(APPDETAILS)
+    assert resp.json()["10"]["success"] is True
+    assert session.get(APPDETAILS).from_cache
+    assert len(session.session.calls) == 2
+
+
+def test_null_body_cached_by_an_older_version_is_refetched(cache):
+    cache.put('GET', APPDETAILS, 200, {}, b'null')
+    session = CachedSession(FakeSession((200, appdetails(True))), cache)
+
+    assert session.get(APPDETAILS).json()["10"]["success"] is True
+    assert len(session.session.calls) == 1
+
+
+def test_offline_mode_does_not_replay_a_null_body(cache):
+    cache.put('GET', APPDETAILS, 200, {}, b'null')
+    session = CachedSession(FakeSession(), cache, offline=True)
+    assert session.get(APPDETAILS).status_code == 504
+
+
+def test_head_is_cached_without_following_redirects(cache):
+    url = "https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/10/library_600x900_2x.jpg"
+    session = CachedSession(FakeSession((302, b'')), cache)
+
+    assert session.head(url).status_code == 302
+    assert session.session.calls[0][2]['allow_redirects'] is False
+    assert cache.get('HEAD', url) is None
@@ -0,0 +1,151 @@
+# tests/test_image_proxy.py
+# ImageProxy against a local stub CDN (no network): signed ids, one upstream fetch per image,
+# resized/WebP variants, the disk cache size cap and upstream failures.
+import http.server
+import io
+import os
+import threading
+
+import pytest
+
+from image_proxy import VARIANTS, Image, ImageProxy, UpstreamError, sniff_type
+
+needs_pillow = pytest.mark.skipif(Image is None, reason="Pillow is not installed")
+
+
+def make_image(width, height):
+    if Image is None:
+        return b'\xff\xd8\xff\xe0' + os.urandom(width * height // 50)
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), (30, 200, 60)).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+class StubCDN:
+    """Serves /apps/<i>/library_600x900_2x.jpg for i in 0..4 and records every request path."""
+
+    def __init__(self):
+        self.files = {f"/apps/{i}/library_600x900_2x.jpg": make_image(600, 900) for i in range(5)}
+        self.requests = []
+        cdn = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                cdn.requests.append(self.path)
+                body = cdn.files.get(self.path.split('?')[0])
+                self.send_response(200 if body else 404)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.end_headers()
+                self.wfile.write(body or b'not found')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.origin = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, i, query=''):
+        return f"https://shared.akamai.steamstatic.com/apps/{i}/library_600x900_2x.jpg{query}"
+
+
+@pytest.fixture
+def cdn():
+    stub = StubCDN()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def proxy(cdn, tmp_path):
+    one_original = len(next(iter(cdn.files.values())))
+    return ImageProxy(str(tmp_path / 'image_cache'), 'test-secret', max_bytes=one_original * 3, origin=cdn.origin)
+
+
+def test_ids_are_signed(proxy, cdn):
+    url = cdn.url(0, '?t=1')
+    image_id = proxy.image_id(url)
+    assert proxy.resolve(image_id) == url
+    assert proxy.resolve(image_id[:-1] + ('A' if image_id[-1] != 'A' else 'B')) is None, "forged id accepted"
+    assert proxy.image_id("https://evil.example.com/x.jpg") is None, "foreign host accepted"
+    assert proxy.image_id("/static/assets/profile.jpg") is None
+
+
+def test_original_is_fetched_once_for_every_variant(proxy, cdn):
+    url = cdn.url(0, '?t=1')
+    for variant in VARIANTS:
+        for webp in (False, True):
+            proxy.get(url, variant, webp)[0].close()
+    assert cdn.requests == ['/apps/0/library_600x900_2x.jpg?t=1']
+
+
+@needs_pillow
+def test_card_variant_is_resized_webp(proxy, cdn):
+    for _ in range(2):   # rendered on the first call, read back from the cache on the second
+        image, mimetype = proxy.get(cdn.url(0), 'card', webp=True)
+        assert mimetype == 'image/webp'
+        with image, Image.open(image) as card:
+            assert card.size[0] <= VARIANTS['card'][0] and card.size[1] <= VARIANTS['card'][1]
+
+    image, mimetype = proxy.get(cdn.url(0), 'card', webp=False)
+    image.close()
+    assert mimetype == 'image/jpeg'
+
+
+def test_cache_stays_under_its_cap(proxy, cdn):
+    for i in range(5):
+        proxy.get(cdn.url(i), 'card')[0].close()
+    stats = proxy.stats()
+    assert stats['bytes'] <= stats['max_bytes']
+    assert stats['evictions'] > 0
+
+
+def test_missing_upstream_image_raises_and_is_remembered(proxy, cdn):
+    url = "https://shared.akamai.steamstatic.com/apps/99/missing.jpg"
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            proxy.get(url, 'card')
+    assert cdn.requests == ['/apps/99/missing.jpg'], "failure not remembered for FAILURE_TTL"
+
+
+def test_file_evicted_after_the_lookup_is_a_miss(proxy, cdn):
+    # Another worker sharing the directory evicts the variant and the original behind our index
+    first, _ = proxy.get(cdn.url(0), 'card')
+    expected = first.read()
+    first.close()
+    for key in list(proxy.cache._index):
+        os.remove(proxy.cache.path(key))
+
+    image, mimetype = proxy.get(cdn.url(0), 'card')
+
+    with image:
+        assert image.read() == expected
+    assert len(cdn.requests) == 2, "original not fetched again"
+    assert proxy.stats()['misses'] == 2
+
+
+def test_open_handle_survives_eviction(proxy, cdn):
+    proxy.get(cdn.url(0), 'card')[0].close()
+    image, _ = proxy.get(cdn.url(0), 'card')   # cache hit: an open file on disk
+    assert not isinstance(image, io.BytesIO)
+    for i in range(1, 5):
+        proxy.get(cdn.url(i), 'card')[0].close()
+    assert not os.path.exists(image.name), "expected the first card to be evicted"
+
+    with image:
+        assert sniff_type(image.read(16)) is not None
+
+
+def test_route_serves_an_evicted_image_instead_of_failing(gamerz, client, proxy, cdn, monkeypatch):
+    monkeypatch.setattr(gamerz, 'image_proxy', proxy)
+    path = f"/img/card/{proxy.image_id(cdn.url(0))}"
+    assert client.get(path).status_code == 200
+    for key in list(proxy.cache._index):
+        os.remove(proxy.cache.path(key))
+
+    resp = client.get(path)
+
+    assert resp.status_code == 200
+    assert resp.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert sniff_type(resp.data[:16]) == resp.mimetype
@@ -0,0 +1,61 @@
+# tests/test_metrics.py
+# /metrics access and the DB instrumentation of work done on connections borrowed outside
+# get_db_connection() (lazily built indexes, background jobs).
+import pytest
+
+from db_metrics import MetricsRegistry
+from search_index import SearchIndex
+
+from .conftest import log_in
+
+
+@pytest.fixture
+def registry(gamerz, client, monkeypatch):
+    if gamerz.metrics is None:
+        pytest.skip("METRICS_ENABLED=0")
+    fresh = MetricsRegistry()
+    monkeypatch.setattr(gamerz, 'metrics', fresh)
+    monkeypatch.setitem(gamerz.METRICS_CONFIG, 'TOKEN', 's3cret')
+    return fresh
+
+
+def test_metrics_need_the_token_or_an_admin(client, registry):
+    # The test client connects from 127.0.0.1, which used to be enough
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    resp = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+
+    log_in(client, 2)
+    assert client.get('/metrics').status_code == 403
+    log_in(client, 1)
+    assert client.get('/metrics').status_code == 200
+
+
+def test_metrics_are_admin_only_without_a_token(gamerz, client, registry, monkeypatch):
+    monkeypatch.setitem(gamerz.METRICS_CONFIG, 'TOKEN', '')
+    assert client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 403
+
+
+def test_lazily_built_index_counts_towards_the_request(gamerz, client, registry, monkeypatch):
+    monkeypatch.setattr(gamerz, 'search_index', SearchIndex())
+    resp = client.get('/api/search?q=a')
+    assert resp.status_code == 200
+    assert '1 queries' in resp.headers['Server-Timing']
+
+
+def test_background_jobs_are_recorded(gamerz, client, registry, monkeypatch):
+    monkeypatch.setattr(gamerz, '_latest_avatar', {2: 'avatars/' + 'a' * 16})
+    gamerz.save_profile_photo(2, 'avatars/' + 'a' * 16)
+
+    with pytest.raises(RuntimeError):
+        with gamerz.pooled_connection('broken') as conn:
+            conn.cursor().execute('SELECT 1')
+            raise RuntimeError("job failed")
+
+    text = registry.render()
+    assert 'gamerz_jobs_total{job="avatar_save",outcome="ok"} 1' in text
+    assert 'gamerz_job_db_queries_sum{job="avatar_save"} 2.000000' in text
+    assert 'gamerz_jobs_total{job="broken",outcome="error"} 1' in text
+    assert gamerz.db_pool.stats()['in_use'] == 0
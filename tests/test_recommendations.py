@@ -0,0 +1,158 @@
+# tests/test_recommendations.py
+# The recommendation engine: series matching, and incremental refreshes after admin writes
+# leaving exactly the table a full rebuild would (SQLite stand-in database).
+import random
+
+import pytest
+
+import recommendations
+from benchmarks import standin
+from benchmarks.catalog import GENRES, generate_catalog
+from recommendations import compute_recommendations, load_co_purchases, refresh_recommendations, series_key
+
+
+def game(game_id, title, genre='Action', rating=5.0):
+    return {'id': game_id, 'title': title, 'genre': genre, 'rating': rating}
+
+
+def test_series_key_matches_anywhere_in_the_title():
+    games = [
+        game(1, 'Call of Duty'),
+        game(2, 'Call of Duty: Black Ops', genre='Puzzle', rating=1.0),
+        game(3, 'Warzone: CALL OF DUTY', genre='Puzzle', rating=1.0),
+        game(4, 'Call to Arms', genre='Puzzle', rating=9.0),
+        game(5, 'Recall of Memories', genre='Puzzle', rating=1.0),   # LIKE '%call of%' matched this too
+        game(6, 'Call of Duty: Season Pass', genre='DLC'),
+    ]
+    index = recommendations.RecommendationIndex(games)
+
+    assert series_key('Call of Duty') == 'call of'
+    assert {g['id'] for g in index.series_matches('call of')} == {1, 2, 3, 5}
+    assert set(index.candidates(games[0])) == {2, 3, 5}
+    assert [rec_id for rec_id, _ in index.recommend(games[0])] == [2, 3, 5]
+    assert index.is_candidate(games[0], games[2]) and not index.is_candidate(games[0], games[3])
+
+
+def test_short_series_keys_are_matched_too():
+    games = [game(1, 'Go'), game(2, 'Go Go Racer', genre='Puzzle'), game(3, 'Pong', genre='Puzzle')]
+    assert [rec_id for rec_id, _ in compute_recommendations(games)[1]] == [2]
+
+
+# ---------- incremental refresh vs full rebuild ----------
+
+def stored(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT game_id, rank, recommended_id, score FROM dbo.game_recommendations")
+    return sorted((row[0], row[1], row[2], round(float(row[3]), 3)) for row in cur.fetchall())
+
+
+def rebuilt(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT id, title, genre, rating FROM dbo.games")
+    games = [dict(zip(('id', 'title', 'genre', 'rating'), row)) for row in cur.fetchall()]
+    recs = compute_recommendations(games, load_co_purchases(cur))
+    return sorted((game_id, rank, rec_id, score) for game_id, items in recs.items()
+                  for rank, (rec_id, score) in enumerate(items, start=1))
+
+
+class AdminWrites:
+    """Random admin add/edit/delete writes, recorded the way app.catalog_changed() queues them."""
+
+    def __init__(self, conn, rng):
+        self.conn = conn
+        self.rng = rng
+        self.cur = conn.cursor()
+        self.changed = set()
+        self.extra = set()
+        self.previous = {}
+
+    def rows(self):
+        self.cur.execute("SELECT id, title, genre, rating FROM dbo.games")
+        return {row[0]: dict(zip(('id', 'title', 'genre', 'rating'), row)) for row in self.cur.fetchall()}
+
+    def new_title(self, rows):
+        # Reuse another game's series key, at the start of the title or in the middle of it
+        series = series_key(self.rng.choice(list(rows.values()))['title']).title()
+        return self.rng.choice([f"{series} Returns", f"The {series} Saga", f"{series}"]) + f" #{self.rng.randrange(10 ** 6)}"
+
+    def genre(self):
+        return self.rng.choice(GENRES + [', '.join(self.rng.sample(GENRES, 2)), 'DLC', 'Edition', ''])
+
+    def record(self, game_id, before):
+        self.changed.add(game_id)
+        if before is not None:
+            self.previous.setdefault(game_id, before)
+
+    def step(self):
+        rows = self.rows()
+        ids = list(rows)
+        kind = self.rng.choice(['rating', 'rating', 'genre', 'title', 'add', 'delete', 'noop'])
+        if kind == 'add':
+            self.cur.execute("INSERT INTO dbo.games (title, genre, rating) VALUES (?, ?, ?)",
+                             (self.new_title(rows), self.genre(), self.rng.choice([2.0, 7.5, 9.9])))
+            self.cur.execute("SELECT MAX(id) FROM dbo.games")
+            self.record(self.cur.fetchone()[0], None)
+        elif kind == 'delete':
+            # SQL Server refuses to delete games that have orders (dbo.orders has no cascade)
+            self.cur.execute("SELECT id FROM dbo.games WHERE id NOT IN (SELECT game_id FROM dbo.orders)")
+            game_id = self.rng.choice([row[0] for row in self.cur.fetchall()])
+            # As in admin_delete(); the game's own rows go with it through ON DELETE CASCADE
+            self.cur.execute("SELECT game_id FROM dbo.game_recommendations WHERE recommended_id = ?", (game_id,))
+            self.extra.update(row[0] for row in self.cur.fetchall())
+            self.cur.execute("DELETE FROM dbo.game_recommendations WHERE recommended_id = ? OR game_id = ?", (game_id, game_id))
+            self.cur.execute("DELETE FROM dbo.games WHERE id = ?", (game_id,))
+            self.record(game_id, rows[game_id])
+        else:
+            game_id = self.rng.choice(ids)
+            column, value = {
+                'rating': ('rating', self.rng.choice([0.5, 5.0, 8.8, 9.9, 10.0])),
+                'genre': ('genre', self.genre()),
+                'title': ('title', self.new_title(rows)),
+                'noop': ('rating', rows[game_id]['rating']),
+            }[kind]
+            self.cur.execute(f"UPDATE dbo.games SET {column} = ? WHERE id = ?", (value, game_id))
+            self.record(game_id, rows[game_id])
+        self.conn.commit()
+
+    def refresh(self, with_previous=True):
+        refresh_recommendations(self.conn, changed_ids=self.changed, extra_ids=self.extra,
+                                previous=self.previous if with_previous else None)
+        self.changed, self.extra, self.previous = set(), set(), {}
+
+
+@pytest.fixture
+def catalog_conn(tmp_path, monkeypatch):
+    # Small genre pools, so edits keep pushing games across the candidate cutoff
+    monkeypatch.setattr(recommendations, 'GENRE_CANDIDATES', 8)
+    path = str(tmp_path / 'recs.sqlite3')
+    standin.create_standin(path, generate_catalog(150, seed=3, n_users=40, orders_per_user=(0, 8)))
+    conn = standin.connect(path)
+    refresh_recommendations(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_refresh_matches_a_full_rebuild(catalog_conn, seed):
+    rng = random.Random(seed)
+    writes = AdminWrites(catalog_conn, rng)
+    for step in range(40):
+        # Bursts of edits coalesce into one refresh, as in app._run_recommendation_refresh()
+        for _ in range(rng.choice([1, 1, 1, 2, 4])):
+            writes.step()
+        changed = sorted(writes.changed)
+        writes.refresh(with_previous=rng.random() < 0.8)
+        assert stored(catalog_conn) == rebuilt(catalog_conn), f"step {step}: refresh after changing {changed}"
+
+
+def test_refresh_leaves_unaffected_rows_alone(catalog_conn):
+    cur = catalog_conn.cursor()
+    cur.execute("SELECT id, title, genre, rating FROM dbo.games WHERE genre NOT IN ('DLC', 'Edition') ORDER BY id")
+    before = dict(zip(('id', 'title', 'genre', 'rating'), cur.fetchone()))
+    cur.execute("UPDATE dbo.games SET rating = ? WHERE id = ?", (float(before['rating'] or 0) + 0.001, before['id']))
+    catalog_conn.commit()
+
+    written = refresh_recommendations(catalog_conn, changed_ids=[before['id']], previous={before['id']: before})
+
+    assert 0 < written < len(stored(catalog_conn)) // 4
+    assert stored(catalog_conn) == rebuilt(catalog_conn)